@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; ``retry_after`` is a hint in seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency limiter with a short, bounded FIFO wait queue.
+
+    Up to ``max_in_flight`` callers hold a slot at once. Up to ``max_queue`` more wait
+    for a slot, each for at most ``queue_timeout`` seconds; everyone else is rejected
+    straight away so an overload turns into fast 503s instead of growing latency.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int = 16, queue_timeout: float = 2.0):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Smoothed service time, used to suggest a Retry-After to rejected callers
+        self._service_time = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.completed = 0
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, max_in_flight: int, max_queue: int = 16,
+                 queue_timeout: float = 2.0) -> "AdmissionController":
+        """Build a controller whose limits can be overridden with <prefix>_MAX_IN_FLIGHT,
+        <prefix>_MAX_QUEUE and <prefix>_QUEUE_TIMEOUT"""
+        return cls(
+            name,
+            max_in_flight=int(os.getenv(f"{prefix}_MAX_IN_FLIGHT", str(max_in_flight))),
+            max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", str(max_queue))),
+            queue_timeout=float(os.getenv(f"{prefix}_QUEUE_TIMEOUT", str(queue_timeout)))
+        )
+
+    def _retry_after(self) -> int:
+        backlog = (len(self._waiters) + self._in_flight) / self.max_in_flight
+        return max(1, math.ceil(backlog * self._service_time))
+
+    async def acquire(self) -> float:
+        """Wait for a slot, returning the admission time; raises AdmissionRejected"""
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self.admitted += 1
+            return time.perf_counter()
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(f"{self.name}: wait queue is full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            # release() hands its slot straight to the oldest waiter
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_timeout += 1
+            raise AdmissionRejected(
+                f"{self.name}: no slot within {self.queue_timeout}s", self._retry_after()
+            ) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.admitted += 1
+        return time.perf_counter()
+
+    def release(self, admitted_at: float = None) -> None:
+        if admitted_at is not None:
+            elapsed = time.perf_counter() - admitted_at
+            self._service_time = elapsed if not self.completed else 0.8 * self._service_time + 0.2 * elapsed
+            self.completed += 1
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "completed": self.completed,
+            "avg_service_ms": round(1000 * self._service_time, 1)
+        }
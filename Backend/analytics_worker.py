@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from claims_cube import analyze_partners, build_claims_cube
+from claims_store import ClaimsStore
+from geo_index import GeoIndex
+from hospital_profiling import HospitalProfilingDataHandler
+from serializers import encode_json
+from snapshot import load_claims_dataset
+from utils import analyze_hospital_claims
+
+logger = logging.getLogger(__name__)
+
+
+class _WorkerState(NamedTuple):
+    claims_store: ClaimsStore
+    geo_index: Optional[GeoIndex]
+    claims_cube: object
+    claims_aggregates: object
+
+
+# Dataset state used by the task functions, by claims dataset version. The API process
+# points it at its own objects; process-pool workers load their own copy in init_worker.
+# The previous version is kept so tasks queued before a reload still finish on it.
+_states: Dict[int, _WorkerState] = {}
+_current: Optional[_WorkerState] = None
+# How a process worker loads a newer dataset: (excel_path, use_cube)
+_reload_args = None
+
+
+def configure(claims_store: ClaimsStore, geo_index: Optional[GeoIndex] = None, claims_cube=None,
+              claims_aggregates=None) -> None:
+    global _current, _states
+    state = _WorkerState(claims_store, geo_index, claims_cube, claims_aggregates)
+    states = {_current.claims_store.version: _current} if _current is not None else {}
+    states[claims_store.version] = state
+    _states, _current = states, state
+
+
+def init_worker(excel_path: str, profiling_path: str, use_cube: bool = False) -> None:
+    """Process-pool initializer: attach to the shared claims snapshot and build the indexes"""
+    global _reload_args
+    logging.basicConfig(level=logging.INFO)
+    claims_store = ClaimsStore(load_claims_dataset(excel_path, shared=True))
+    geo_index = GeoIndex.from_hospitals(HospitalProfilingDataHandler(profiling_path).get_hospital_summaries())
+    claims_cube = build_claims_cube(claims_store.df) if use_cube else None
+    configure(claims_store, geo_index, claims_cube)
+    _reload_args = (excel_path, use_cube)
+    logger.info(f"Analytics worker {os.getpid()} ready with {len(claims_store)} partners")
+
+
+def _state_for(version: Optional[int]) -> _WorkerState:
+    """State for a claims dataset version, catching a process worker up after a reload"""
+    if version is None:
+        return _current
+    state = _states.get(version)
+    if state is not None:
+        return state
+    if _reload_args is not None and version > _current.claims_store.version:
+        excel_path, use_cube = _reload_args
+        # The API process rebuilt the snapshot before publishing the version
+        claims_store = ClaimsStore(load_claims_dataset(excel_path, shared=True), version=version)
+        claims_cube = build_claims_cube(claims_store.df) if use_cube else None
+        configure(claims_store, _current.geo_index, claims_cube)
+        logger.info(f"Analytics worker {os.getpid()} reloaded claims dataset version {version}")
+    return _current
+
+
+def build_claims_response(partner_data, results):
+    """Combine hospital details and analysis sections into the claims-analysis payload.
+    Sections stay DataFrames and are encoded by DataFrameJSONResponse."""
+    hospital_data = partner_data.iloc[0]
+    hospital_info = {
+        'HOSPITAL': str(hospital_data['HOSPITAL']),
+        'TIER': str(hospital_data['HOSP_TYPE']),
+        'CATEGORY': 'Multi-Specialty',
+        'ADDRESS': f"{str(hospital_data['CITY'])}, {str(hospital_data['STATE'])} - {str(hospital_data['PIN'])}",
+        'INFRA_SCORE': round(float(np.random.uniform(3.5, 5.0)), 1)
+    }
+
+    return {
+        'hospital_info': hospital_info,
+        **results
+    }
+
+
+def claims_analysis_body(partner_id, sections: Optional[List[str]] = None, version: Optional[int] = None) -> bytes:
+    """Encoded claims-analysis payload for one partner, from the given claims dataset
+    version (the current one by default). Returning bytes keeps the result cheap to
+    send back from a worker process."""
+    claims_store, geo_index, claims_cube, claims_aggregates = _state_for(version)
+    if claims_aggregates is not None:
+        # Incremental mode: the aggregates also cover ingested batches
+        results = claims_aggregates.analyze(partner_id, sections, geo_index)
+        return encode_json(build_claims_response(claims_aggregates.hospital_rows(partner_id), results)).encode("utf-8")
+
+    partner_data = claims_store.get_partner_claims(partner_id)
+    logger.debug(f"Found {len(partner_data)} records for partner_id {partner_id}")
+
+    # Only the requested sections (all by default) are computed
+    if claims_cube is not None:
+        results = claims_cube.analyze(claims_store.df, partner_id, claims_store.peer_index, geo_index, sections)
+    else:
+        results = analyze_hospital_claims(claims_store.df, partner_id, claims_store, geo_index, sections)
+    return encode_json(build_claims_response(partner_data, results)).encode("utf-8")
+
+
+def claims_batch_body(partner_ids: Iterable, sections: Optional[List[str]] = None,
+                      version: Optional[int] = None) -> bytes:
+    """Encoded batch payload: results for known partners and the list of unknown ones"""
+    claims_store, geo_index, claims_cube, claims_aggregates = _state_for(version)
+    partner_ids = list(partner_ids)
+    if claims_aggregates is not None:
+        batch_results = {
+            partner_id: claims_aggregates.analyze(partner_id, sections, geo_index)
+            for partner_id in dict.fromkeys(partner_ids) if partner_id in claims_aggregates
+        }
+        hospital_rows = claims_aggregates.hospital_rows
+    else:
+        # One grouped pass over the requested partners' rows, or lookups into the cube
+        batch_results = analyze_partners(
+            claims_store,
+            partner_ids,
+            sections=sections,
+            geo_index=geo_index,
+            claims_cube=claims_cube
+        )
+        hospital_rows = claims_store.get_partner_claims
+    return encode_json({
+        'results': {
+            str(partner_id): build_claims_response(hospital_rows(partner_id), results)
+            for partner_id, results in batch_results.items()
+        },
+        'not_found': [partner_id for partner_id in dict.fromkeys(partner_ids) if partner_id not in batch_results]
+    }).encode("utf-8")
+
+
+async def _benchmark(pool, task, partner_ids: List, requests: int, concurrency: int) -> dict:
+    """Fire claims-analysis tasks at the pool while timing a trivial probe on the event loop"""
+    from worker_pool import PoolSaturatedError
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, rejected = [], 0
+
+    async def one(i):
+        nonlocal rejected
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await pool.run(task, partner_ids[i % len(partner_ids)])
+            except PoolSaturatedError:
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - started)
+
+    probe_delays = []
+    done = asyncio.Event()
+
+    async def probe():
+        # Stands in for a lightweight endpoint such as /auth/status
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            probe_delays.append(time.perf_counter() - started - 0.01)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    latencies.sort()
+    return {
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(1000 * latencies[len(latencies) // 2], 1) if latencies else None,
+        "p95_ms": round(1000 * latencies[int(len(latencies) * 0.95)], 1) if latencies else None,
+        "rejected": rejected,
+        "max_loop_delay_ms": round(1000 * max(probe_delays, default=0.0), 1)
+    }
+
+
+if __name__ == '__main__':
+    # Use the importable module so process workers resolve the same functions and state
+    import analytics_worker as worker
+    from worker_pool import WorkerPool
+
+    parser = argparse.ArgumentParser(description="Benchmark claims analysis on thread and process pools")
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument("--excel", default=os.path.join(current_dir, "hospital_data_v1.xlsx"))
+    parser.add_argument("--profiling", default=os.path.join(current_dir, "hospital_profiling_data.json"))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sizes", default="1,2,4")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    worker.init_worker(args.excel, args.profiling)
+    partners = worker._current.claims_store.partner_ids
+    for kind in ("thread", "process"):
+        for size in [int(size) for size in args.sizes.split(",")]:
+            initializer = (worker.init_worker, (args.excel, args.profiling)) if kind == "process" else (None, ())
+            benchmark_pool = WorkerPool(kind, max_workers=size, queue_depth=args.concurrency,
+                                        initializer=initializer[0], initargs=initializer[1], name="bench")
+            # Warm every worker up before timing
+            asyncio.run(_benchmark(benchmark_pool, worker.claims_analysis_body, partners, size * 2, size))
+            result = asyncio.run(_benchmark(benchmark_pool, worker.claims_analysis_body, partners,
+                                            args.requests, args.concurrency))
+            benchmark_pool.shutdown()
+            print(f"{kind:>7} x{size}: {result}")
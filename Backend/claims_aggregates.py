@@ -0,0 +1,526 @@
+import bisect
+import io
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from claims_cube import CUBE_SECTIONS
+from claims_store import ROW_COLUMN, PeerIndex
+from utils import (
+    ANALYSIS_SECTIONS,
+    ANALYSIS_YEARS,
+    CLAIM_TYPE_SPLIT,
+    MEDICAL_SURGICAL_SPLIT,
+    _percentage_pivot,
+    get_similar_hospitals,
+)
+
+logger = logging.getLogger(__name__)
+
+# Columns an appended claims batch must carry
+INGEST_COLUMNS = [
+    'PARTNER_ID', 'CLAIM_NO', 'CLAIM_YEAR', 'CLAIM_TYPE', 'MEDICAL_OR_SURGICAL', 'ROOM_CATEGORY',
+    'FINAL_DIAGNOSIS', 'APPROVED_AMT', 'CLAIMED_AMT', 'HOSPITAL', 'HOSP_TYPE', 'CITY', 'STATE', 'PIN'
+]
+NUMERIC_COLUMNS = ['PARTNER_ID', 'CLAIM_YEAR', 'APPROVED_AMT', 'CLAIMED_AMT']
+# Columns kept from a partner's first row for the hospital_info block of the response
+HOSPITAL_COLUMNS = ['HOSPITAL', 'HOSP_TYPE', 'CITY', 'STATE', 'PIN']
+
+# Table name -> (group columns after the partner, summed columns, recent years only).
+# Every table is additive, so a batch's partial sums fold into the running totals. Missing
+# group values are kept under None and left out when rendering, as pandas would drop them.
+TABLES = {
+    'claim_type': (['claim_type'], ['approved', 'has_claim'], False),
+    'medical_surgical': (['medical_surgical'], ['approved', 'has_claim', 'has_approved'], False),
+    'revision': (['year'], ['ratio', 'has_ratio'], False),
+    'claim_type_year': (['year', 'claim_type'], ['rows', 'has_claim', 'approved'], True),
+    'medical_surgical_year': (['year', 'medical_surgical'], ['has_claim', 'approved'], True),
+    'kind': (['kind'], ['approved', 'claimed'], True),
+    'room': (['room'], ['has_claim'], True),
+    'diagnosis': (['diagnosis'], ['has_claim', 'approved', 'claimed'], True)
+}
+# MEDICAL_OR_SURGICAL values whose distinct CLAIM_NOs are counted per year
+DISTINCT_CLAIM_VALUES = ('Medical', 'Surgical')
+
+
+def clean_key(value):
+    """Dictionary-safe group key: None for missing values, ints for integral floats"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _key_column(series: pd.Series) -> pd.Series:
+    """Group-key column whose values come back from a group-by already clean, without a
+    per-row conversion: integral float IDs become integers"""
+    if pd.api.types.is_float_dtype(series) and series.notna().all() and (series % 1 == 0).all():
+        return series.astype('int64')
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(object)
+    return series
+
+
+def _mean(total: float, count: int) -> np.float64:
+    return np.float64(total / count) if count else np.float64(np.nan)
+
+
+def _sort_keys(keys: Iterable) -> List:
+    """Keys in the order a pandas group-by would list them"""
+    return sorted(keys, key=lambda key: (isinstance(key, str), key))
+
+
+def distinct_claim_rows(batch: pd.DataFrame) -> pd.DataFrame:
+    """(partner, year, medical_surgical, claim) of the claims counted by the distinct
+    Medical/Surgical CLAIM_NO counts"""
+    counted = batch[
+        batch['PARTNER_ID'].notna()
+        & batch['CLAIM_YEAR'].isin(ANALYSIS_YEARS)
+        & batch['MEDICAL_OR_SURGICAL'].isin(DISTINCT_CLAIM_VALUES)
+        & batch['CLAIM_NO'].notna()
+    ]
+    return pd.DataFrame({
+        'partner': _key_column(counted['PARTNER_ID']),
+        'year': _key_column(counted['CLAIM_YEAR']),
+        'medical_surgical': counted['MEDICAL_OR_SURGICAL'].astype(object),
+        'claim': counted['CLAIM_NO'].astype(object)
+    })
+
+
+class PartnerAggregates:
+    """Running totals behind one partner's claims-analysis sections"""
+
+    def __init__(self, hospital: pd.DataFrame):
+        # First claim row, as ClaimsStore.get_partner_claims(...).iloc[:1] would return
+        self.hospital = hospital
+        self.tables: Dict[str, Dict[tuple, List[float]]] = {name: {} for name in TABLES}
+        self.distinct_claims: Dict[tuple, set] = {}
+        # Final distinct counts, for aggregates built without tracking the CLAIM_NO sets
+        self.distinct_counts: Dict[tuple, int] = {}
+        self.rows = 0
+
+    def distinct_count(self, key: tuple) -> int:
+        if key in self.distinct_counts:
+            return self.distinct_counts[key]
+        return len(self.distinct_claims.get(key, ()))
+
+    def _sums(self, table: str, key: tuple, width: int) -> List[float]:
+        return self.tables[table].get(key, [0] * width)
+
+    def claims_summary(self) -> pd.DataFrame:
+        claim_type, medical_surgical = self.tables['claim_type'], self.tables['medical_surgical']
+        rows = [
+            ('cashless', claim_type.get(('CASHLESS',), [0, 0])),
+            ('reimbursement', claim_type.get(('REIMBURSEMENT',), [0, 0])),
+            ('medical', medical_surgical.get(('Medical',), [0, 0, 0])),
+            ('surgical', medical_surgical.get(('Surgical',), [0, 0, 0]))
+        ]
+        return pd.DataFrame({
+            'Type': [name for name, _ in rows],
+            'Amount': [float(sums[0]) for _, sums in rows],
+            'Count': [int(sums[1]) for _, sums in rows]
+        })
+
+    def average_claim_cost(self) -> pd.DataFrame:
+        medical_surgical = self.tables['medical_surgical']
+        total = [sum(sums[0] for sums in medical_surgical.values()), sum(sums[2] for sums in medical_surgical.values())]
+        averages = []
+        for sums, present in ((total, self.rows > 0),
+                              (medical_surgical.get(('Medical',)), ('Medical',) in medical_surgical),
+                              (medical_surgical.get(('Surgical',)), ('Surgical',) in medical_surgical)):
+            averages.append(round(_mean(sums[0], sums[-1])) if present else 0)
+        return pd.DataFrame({
+            'total_acs': [averages[0]],
+            'medical_acs': [averages[1]],
+            'surgical_acs': [averages[2]]
+        })
+
+    def cost_revision_ratio(self) -> pd.DataFrame:
+        years = _sort_keys(key[0] for key in self.tables['revision'] if key[0] is not None)
+        return pd.DataFrame({
+            'CLAIM_YEAR': years,
+            'cost_revision_ratio': [_mean(*self.tables['revision'][(year,)]) for year in years]
+        })
+
+    def yearly_split(self, table: str, split: List[Tuple[str, str, str, str]]) -> pd.DataFrame:
+        """Equivalent of utils.yearly_split_pivot over the partner's recent claims"""
+        sums = self.tables[table]
+        years = _sort_keys({year for year, _ in sums if year is not None})
+        columns = {'claim_year': years}
+        for value, count_column, _, mode in split:
+            if mode == 'rows':
+                columns[count_column] = [int(self._sums(table, (year, value), 3)[0]) for year in years]
+            else:
+                columns[count_column] = [self.distinct_count((year, value)) for year in years]
+        claim_column = 1 if table == 'claim_type_year' else 0
+        columns['Total_Claims'] = [
+            int(sum(totals[claim_column] for key, totals in sums.items() if key[0] == year)) for year in years
+        ]
+        for value, _, amount_column, _ in split:
+            columns[amount_column] = [float(self._sums(table, (year, value), 3)[-1]) for year in years]
+        columns['Total_Approved_Amount'] = [
+            float(sum(totals[-1] for key, totals in sums.items() if key[0] == year)) for year in years
+        ]
+        ordered = ['claim_year'] + [count_column for _, count_column, _, _ in split] + ['Total_Claims']
+        ordered += [amount_column for _, _, amount_column, _ in split] + ['Total_Approved_Amount']
+        return pd.DataFrame(columns)[ordered]
+
+    def percentage_analysis(self) -> pd.DataFrame:
+        kinds = _sort_keys(key[0] for key in self.tables['kind'] if key[0] is not None)
+        claims_by_type = pd.DataFrame({
+            'MEDICAL_OR_SURGICAL': kinds,
+            'APPROVED_AMT': [float(self.tables['kind'][(kind,)][0]) for kind in kinds],
+            'CLAIMED_AMT': [float(self.tables['kind'][(kind,)][1]) for kind in kinds]
+        })
+        return _percentage_pivot(claims_by_type)
+
+    def room_category_analysis(self) -> pd.DataFrame:
+        rooms = _sort_keys(key[0] for key in self.tables['room'] if key[0] is not None)
+        pivot4 = pd.DataFrame({
+            'ROOM_CATEGORY': rooms,
+            'Total_Claims': [int(self.tables['room'][(room,)][0]) for room in rooms]
+        })
+        return pivot4.sort_values('Total_Claims', ascending=False)
+
+    def diagnosis_analysis(self) -> pd.DataFrame:
+        diagnoses = _sort_keys(key[0] for key in self.tables['diagnosis'] if key[0] is not None)
+        sums = [self.tables['diagnosis'][(diagnosis,)] for diagnosis in diagnoses]
+        pivot5 = pd.DataFrame({
+            'FINAL_DIAGNOSIS': diagnoses,
+            'Total_Claims': [int(row[0]) for row in sums],
+            'Total_Approved_AMT': [float(row[1]) for row in sums],
+            'Total_Claimed_AMT': [float(row[2]) for row in sums]
+        })
+        return pivot5.sort_values('Total_Claims', ascending=False)
+
+
+class IncrementalPeerIndex(PeerIndex):
+    """PeerIndex that is extended batch by batch instead of built from the whole frame.
+
+    Peers stay ordered by their first row in the workbook (ROW_COLUMN when a batch
+    carries it), with rows of batches appended later counting as coming after it.
+    """
+
+    def __init__(self):
+        self.partner_keys: Dict[object, tuple] = {}
+        self.partner_acs: Dict[object, float] = {}
+        self.peers: Dict[tuple, List[tuple]] = {}
+        self._seen = set()
+        self._located_sums: Dict[object, List[float]] = {}
+        # Row position of each entry of peers, and the position the next appended row gets
+        self._peer_rows: Dict[tuple, List[int]] = {}
+        self._next_row = 0
+
+    def add(self, batch: pd.DataFrame) -> None:
+        if ROW_COLUMN in batch.columns:
+            rows = batch[ROW_COLUMN].to_numpy(dtype='int64')
+        else:
+            rows = np.arange(self._next_row, self._next_row + len(batch), dtype='int64')
+        if len(rows):
+            self._next_row = max(self._next_row, int(rows.max()) + 1)
+        located = batch.assign(**{ROW_COLUMN: rows}).dropna(subset=['PARTNER_ID', 'PIN', 'HOSP_TYPE'])
+        if located.empty:
+            return
+        located = located.sort_values(ROW_COLUMN, kind='mergesort')
+        # A partner's first row is also the first row of one of its hospital names
+        firsts = located.drop_duplicates(subset=['PARTNER_ID', 'HOSPITAL'])
+        for partner_id, hospital, pin, hosp_type, row in zip(
+            [clean_key(partner_id) for partner_id in firsts['PARTNER_ID'].tolist()],
+            firsts['HOSPITAL'].tolist(),
+            firsts['PIN'].tolist(),
+            firsts['HOSP_TYPE'].tolist(),
+            firsts[ROW_COLUMN].tolist()
+        ):
+            self.partner_keys.setdefault(partner_id, (pin, hosp_type))
+            if (partner_id, hospital) in self._seen:
+                continue
+            self._seen.add((partner_id, hospital))
+            peer_rows = self._peer_rows.setdefault((pin, hosp_type), [])
+            position = bisect.bisect_right(peer_rows, row)
+            peer_rows.insert(position, row)
+            self.peers.setdefault((pin, hosp_type), []).insert(position, (partner_id, hospital))
+
+        approved = pd.to_numeric(located['APPROVED_AMT'], errors='coerce').astype('float64')
+        sums = pd.DataFrame({
+            'approved': approved.fillna(0.0).to_numpy(),
+            'count': approved.notna().astype('int64').to_numpy()
+        }).groupby(_key_column(located['PARTNER_ID']).to_numpy()).sum()
+        for partner_id, (total, count) in zip(sums.index.tolist(), sums.to_numpy().tolist()):
+            partner_id = clean_key(partner_id)
+            running = self._located_sums.setdefault(partner_id, [0.0, 0])
+            running[0] += total
+            running[1] += count
+            self.partner_acs[partner_id] = float(np.round(_mean(*running)))
+
+
+def _batch_frame(batch: pd.DataFrame) -> pd.DataFrame:
+    """Per-row inputs of the aggregate tables, with missing amounts summing as zero"""
+    approved = pd.to_numeric(batch['APPROVED_AMT'], errors='coerce').astype('float64')
+    claimed = pd.to_numeric(batch['CLAIMED_AMT'], errors='coerce').astype('float64')
+    ratio = (claimed - approved).abs() / claimed
+    medical_surgical = batch['MEDICAL_OR_SURGICAL'].astype(object)
+    upper = medical_surgical.where(medical_surgical.isna(), medical_surgical.astype(str).str.upper())
+    kind = upper.mask(upper.str.startswith('MEDICAL', na=False), 'Medical')
+    kind = kind.mask(upper.str.startswith('SURGICAL', na=False), 'Surgical')
+    return pd.DataFrame({
+        'partner': _key_column(batch['PARTNER_ID']),
+        'year': _key_column(batch['CLAIM_YEAR']),
+        'claim_type': batch['CLAIM_TYPE'].astype(object),
+        'medical_surgical': medical_surgical,
+        'kind': kind,
+        'room': batch['ROOM_CATEGORY'].astype(object),
+        'diagnosis': batch['FINAL_DIAGNOSIS'].astype(object),
+        'claim': batch['CLAIM_NO'].astype(object),
+        'rows': np.ones(len(batch), dtype=np.int64),
+        'has_claim': batch['CLAIM_NO'].notna().astype('int64'),
+        'approved': approved.fillna(0.0),
+        'has_approved': approved.notna().astype('int64'),
+        'claimed': claimed.fillna(0.0),
+        'ratio': ratio.fillna(0.0),
+        'has_ratio': ratio.notna().astype('int64'),
+        'recent': batch['CLAIM_YEAR'].isin(ANALYSIS_YEARS)
+    }, index=batch.index)
+
+
+class ClaimsAggregates:
+    """Per-partner claims-analysis aggregates maintained incrementally.
+
+    Each appended batch is reduced with a few group-bys to partial sums and counts
+    (plus distinct CLAIM_NOs for the Medical/Surgical counts), which are folded into
+    running per-partner totals. Ingesting costs time proportional to the batch, not
+    to the history, and a partner's sections are rendered from its totals alone,
+    matching analyze_hospital_claims over the full table.
+
+    With ``track_distinct=False`` the CLAIM_NO sets are not kept; the distinct counts
+    must then be supplied through set_distinct_counts once all rows are in.
+    """
+
+    def __init__(self, track_distinct: bool = True):
+        self.track_distinct = track_distinct
+        self._lock = threading.RLock()
+        self.partners: Dict[object, PartnerAggregates] = {}
+        self.peer_index = IncrementalPeerIndex()
+        self.rows = 0
+        self.batches = 0
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ClaimsAggregates":
+        aggregates = cls()
+        aggregates.add(df)
+        return aggregates
+
+    def __contains__(self, partner_id) -> bool:
+        return partner_id in self.partners
+
+    def __len__(self) -> int:
+        return len(self.partners)
+
+    @property
+    def partner_ids(self) -> List:
+        return list(self.partners.keys())
+
+    def add(self, batch: pd.DataFrame) -> Dict[str, int]:
+        """Fold a batch of claim rows into the totals; returns the rows and partners it touched"""
+        batch = batch[batch['PARTNER_ID'].notna()].reset_index(drop=True)
+        if batch.empty:
+            return {"rows": 0, "partners": 0, "new_partners": 0}
+        frame = _batch_frame(batch)
+        recent = frame[frame['recent']]
+        partials = {}
+        for name, (keys, columns, recent_only) in TABLES.items():
+            source = recent if recent_only else frame
+            grouped = source.groupby(['partner', *keys], dropna=False, sort=False)[columns].sum()
+            partials[name] = zip(grouped.index.tolist(), grouped.to_numpy().tolist())
+        claim_sets = pd.Series(dtype=object)
+        if self.track_distinct:
+            distinct = distinct_claim_rows(batch)
+            claim_sets = distinct.groupby(['partner', 'year', 'medical_surgical'], sort=False)['claim'].unique()
+        row_counts = frame.groupby('partner', sort=False).size()
+        first_rows = frame.groupby('partner', sort=False).head(1).index
+
+        with self._lock:
+            new_partners = 0
+            for partner_id, position in zip(frame.loc[first_rows, 'partner'].tolist(), first_rows):
+                if partner_id not in self.partners:
+                    self.partners[partner_id] = PartnerAggregates(batch.loc[[position], HOSPITAL_COLUMNS])
+                    new_partners += 1
+            for partner_id, count in row_counts.items():
+                self.partners[partner_id].rows += int(count)
+            for name, rows in partials.items():
+                for key, sums in rows:
+                    table = self.partners[clean_key(key[0])].tables[name]
+                    group = tuple(clean_key(part) for part in key[1:])
+                    running = table.get(group)
+                    if running is None:
+                        table[group] = sums
+                    else:
+                        for i, value in enumerate(sums):
+                            running[i] += value
+            for (partner_id, year, value), claims in claim_sets.items():
+                key = (clean_key(year), value)
+                self.partners[clean_key(partner_id)].distinct_claims.setdefault(key, set()).update(claims.tolist())
+            self.peer_index.add(batch)
+            self.rows += len(batch)
+            self.batches += 1
+        return {"rows": len(batch), "partners": len(row_counts), "new_partners": new_partners}
+
+    def set_distinct_counts(self, counts: Dict[tuple, int]) -> None:
+        """Distinct Medical/Surgical CLAIM_NO counts keyed by (partner, year, value)"""
+        with self._lock:
+            for (partner_id, year, value), count in counts.items():
+                self.partners[partner_id].distinct_counts[(year, value)] = int(count)
+
+    def hospital_rows(self, partner_id) -> pd.DataFrame:
+        """The partner's first claim row, enough for build_claims_response's hospital_info"""
+        return self.partners[partner_id].hospital
+
+    def get(self, partner_id) -> Optional[Dict[str, pd.DataFrame]]:
+        """Partner-local sections, in the same shape as ClaimsCube.get"""
+        with self._lock:
+            partner = self.partners.get(partner_id)
+            if partner is None:
+                return None
+            return {
+                'Get_claims_summary': partner.claims_summary(),
+                'Average_Claim_Cost': partner.average_claim_cost(),
+                'Cost_Revision_Ratio': partner.cost_revision_ratio(),
+                'Claim_Type_Analysis': partner.yearly_split('claim_type_year', CLAIM_TYPE_SPLIT),
+                'Medical_Surgical_Analysis': partner.yearly_split('medical_surgical_year', MEDICAL_SURGICAL_SPLIT),
+                'Type_Percentage_Analysis': partner.percentage_analysis(),
+                'Room_Category_Analysis': partner.room_category_analysis(),
+                'Diagnosis_Analysis': partner.diagnosis_analysis()
+            }
+
+    def analyze(self, partner_id, sections: Optional[Iterable[str]] = None,
+                geo_index=None) -> Optional[Dict[str, pd.DataFrame]]:
+        """Aggregate-backed equivalent of analyze_hospital_claims"""
+        cached = self.get(partner_id)
+        if cached is None:
+            return None
+        wanted = ANALYSIS_SECTIONS if sections is None else [name for name in ANALYSIS_SECTIONS if name in sections]
+        return {
+            name: get_similar_hospitals(None, partner_id, self.peer_index, geo_index)
+            if name == 'Similar_Hospitals' else cached[name]
+            for name in wanted
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"partners": len(self.partners), "rows": self.rows, "batches": self.batches}
+
+
+BATCH_FORMATS = ("csv", "ndjson", "json")
+
+
+def batch_format_for(content_type: str) -> str:
+    """Batch format of a request body from its media type; CSV unless it is JSON"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return "ndjson"
+    if media_type == "application/json":
+        return "json"
+    return "csv"
+
+
+def parse_claims_batch(body: bytes, batch_format: str = "csv") -> pd.DataFrame:
+    """Parse an appended claims batch: CSV, NDJSON (one row object per line) or a JSON
+    array of row objects. Raises ValueError on bad input."""
+    if batch_format not in BATCH_FORMATS:
+        raise ValueError(f"Unknown claims batch format {batch_format!r}, expected one of {BATCH_FORMATS}")
+    try:
+        if batch_format == "ndjson":
+            batch = pd.read_json(io.BytesIO(body), lines=True, dtype=False)
+        elif batch_format == "json":
+            rows = json.loads(body)
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValueError("expected a JSON array of claim row objects")
+            batch = pd.DataFrame.from_records(rows)
+        else:
+            batch = pd.read_csv(io.BytesIO(body))
+    except Exception as e:
+        raise ValueError(f"Could not parse claims batch: {e}")
+    return normalize_claims_batch(batch)
+
+
+def normalize_claims_batch(batch: pd.DataFrame) -> pd.DataFrame:
+    """Check a batch's columns and coerce the numeric ones; raises ValueError"""
+    missing = [column for column in INGEST_COLUMNS if column not in batch.columns]
+    if missing:
+        raise ValueError(f"Missing required columns in claims batch: {missing}")
+    for column in NUMERIC_COLUMNS:
+        batch[column] = pd.to_numeric(batch[column], errors='coerce')
+    if batch['PARTNER_ID'].isna().any():
+        raise ValueError("Every claim row needs a numeric PARTNER_ID")
+    batch['PARTNER_ID'] = batch['PARTNER_ID'].astype('int64')
+    return batch
+
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class ClaimsIngestLog:
+    """Appended batches kept as numbered NDJSON files next to the workbook, so a restart or
+    a reload of the workbook replays them on top of it.
+
+    Each file starts with a header line naming the batch's columns and dtypes, followed by
+    one row object per line; values keep their JSON types and floats their full precision,
+    so a replayed batch is the parsed batch that was applied, whatever format it came in.
+    Files from older builds, logged as CSV, are still replayed.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _files(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("batch-") and name.endswith((".ndjson", ".csv"))
+        )
+
+    def append(self, batch: pd.DataFrame) -> str:
+        files = self._files()
+        sequence = int(os.path.splitext(files[-1])[0][len("batch-"):]) + 1 if files else 1
+        path = os.path.join(self.directory, f"batch-{sequence:08d}.ndjson")
+        tmp_path = f"{path}.tmp"
+        batch = batch[INGEST_COLUMNS]
+        header = {"columns": INGEST_COLUMNS, "dtypes": {column: str(dtype) for column, dtype in batch.dtypes.items()}}
+        rows = batch.astype(object).where(batch.notna(), None).to_dict(orient="records")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header) + "\n")
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, allow_nan=False, default=_json_value) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return path
+
+    def remove(self, path: str) -> None:
+        """Drop a logged batch that could not be applied, so it is not replayed"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _read(path: str) -> pd.DataFrame:
+        with open(path, 'rb') as f:
+            if path.endswith(".csv"):
+                return parse_claims_batch(f.read())
+            header = json.loads(f.readline())
+            rows = [json.loads(line) for line in f if line.strip()]
+        batch = pd.DataFrame.from_records(rows, columns=header["columns"])
+        return batch.astype(header["dtypes"])
+
+    def replay(self) -> Iterator[pd.DataFrame]:
+        for name in self._files():
+            yield self._read(os.path.join(self.directory, name))
@@ -0,0 +1,259 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from claims_store import build_partner_slices
+from utils import (
+    ANALYSIS_SECTIONS,
+    ANALYSIS_YEARS,
+    CLAIM_TYPE_SPLIT,
+    MEDICAL_SURGICAL_SPLIT,
+    calculate_average_claim_cost,
+    calculate_cost_revision_ratio,
+    claim_type_analysis,
+    diagnosis_analysis,
+    get_claims_summary,
+    get_similar_hospitals,
+    medical_surgical_analysis,
+    percentage_analysis,
+    room_category_analysis,
+    yearly_split_pivot,
+)
+
+logger = logging.getLogger(__name__)
+
+# Sections that depend on more than the partner's own claims are computed per request
+CUBE_SECTIONS = [section for section in ANALYSIS_SECTIONS if section != 'Similar_Hospitals']
+
+# Sections whose rows are ordered by a count, where ties have no meaningful order
+_COUNT_SORTED_SECTIONS = {
+    'Room_Category_Analysis': 'ROOM_CATEGORY',
+    'Diagnosis_Analysis': 'FINAL_DIAGNOSIS',
+}
+
+
+class ClaimsCube:
+    """Materialized claims-analysis sections for every partner.
+
+    Each section is held as a single frame sorted by PARTNER_ID together with a
+    partner -> (start, stop) map, so a lookup is a dictionary probe and a slice.
+    """
+
+    def __init__(self, sections: Dict[str, pd.DataFrame], partner_ids: Iterable):
+        self.sections = sections
+        self.section_slices = {
+            name: build_partner_slices(frame['PARTNER_ID']) for name, frame in sections.items()
+        }
+        self.partner_ids = set(partner_ids)
+
+    def __contains__(self, partner_id) -> bool:
+        return partner_id in self.partner_ids
+
+    def __len__(self) -> int:
+        return len(self.partner_ids)
+
+    def get(self, partner_id) -> Optional[Dict[str, pd.DataFrame]]:
+        """Return the precomputed sections for a partner, or None if it is unknown"""
+        if partner_id not in self.partner_ids:
+            return None
+        results = {}
+        for name, frame in self.sections.items():
+            start, stop = self.section_slices[name].get(partner_id, (0, 0))
+            results[name] = frame.iloc[start:stop].drop(columns='PARTNER_ID').reset_index(drop=True)
+        return results
+
+    def analyze(self, df: pd.DataFrame, partner_id, peer_index=None, geo_index=None,
+                sections: Optional[Iterable[str]] = None) -> Optional[Dict[str, pd.DataFrame]]:
+        """Cube-backed equivalent of analyze_hospital_claims, optionally limited to some sections"""
+        cached = self.get(partner_id)
+        if cached is None:
+            return None
+        wanted = ANALYSIS_SECTIONS if sections is None else [name for name in ANALYSIS_SECTIONS if name in sections]
+        return {
+            name: get_similar_hospitals(df, partner_id, peer_index, geo_index) if name == 'Similar_Hospitals' else cached[name]
+            for name in wanted
+        }
+
+
+def _sort_by_partner(frame: pd.DataFrame, *by: str, ascending: Optional[List[bool]] = None) -> pd.DataFrame:
+    columns = ['PARTNER_ID', *by]
+    if ascending is None:
+        ascending = [True] * len(columns)
+    return frame.sort_values(columns, ascending=ascending, kind='mergesort').reset_index(drop=True)
+
+
+def _claims_summary(df: pd.DataFrame, partners: pd.Index) -> pd.DataFrame:
+    blocks = []
+    for column, values in (('CLAIM_TYPE', ['CASHLESS', 'REIMBURSEMENT']),
+                           ('MEDICAL_OR_SURGICAL', ['Medical', 'Surgical'])):
+        stats = df.groupby(['PARTNER_ID', column], observed=True).agg(
+            Amount=('APPROVED_AMT', 'sum'),
+            Count=('CLAIM_NO', 'count')
+        )
+        block = stats.reindex(pd.MultiIndex.from_product([partners, values]), fill_value=0)
+        block.index.names = ['PARTNER_ID', 'Type']
+        blocks.append(block.reset_index())
+
+    summary = pd.concat(blocks, ignore_index=True)
+    order = {'CASHLESS': 0, 'REIMBURSEMENT': 1, 'Medical': 2, 'Surgical': 3}
+    summary['_order'] = summary['Type'].map(order)
+    summary['Type'] = summary['Type'].str.lower()
+    summary['Amount'] = summary['Amount'].astype(float)
+    summary['Count'] = summary['Count'].astype(int)
+    return _sort_by_partner(summary, '_order').drop(columns='_order')
+
+
+def _average_claim_cost(df: pd.DataFrame, partners: pd.Index) -> pd.DataFrame:
+    total = df.groupby('PARTNER_ID')['APPROVED_AMT'].mean()
+    by_type = df.groupby(['PARTNER_ID', 'MEDICAL_OR_SURGICAL'], observed=True)['APPROVED_AMT'].mean().unstack()
+    acs = pd.DataFrame({
+        'total_acs': total.reindex(partners),
+        'medical_acs': by_type.get('Medical', pd.Series(dtype=float)).reindex(partners),
+        'surgical_acs': by_type.get('Surgical', pd.Series(dtype=float)).reindex(partners),
+    }).fillna(0).round()
+    acs.index.name = 'PARTNER_ID'
+    return acs.reset_index()
+
+
+def _cost_revision_ratio(df: pd.DataFrame) -> pd.DataFrame:
+    ratio = (df['CLAIMED_AMT'] - df['APPROVED_AMT']).abs() / df['CLAIMED_AMT']
+    yearly = ratio.groupby([df['PARTNER_ID'], df['CLAIM_YEAR']]).mean()
+    return _sort_by_partner(yearly.reset_index(name='cost_revision_ratio'), 'CLAIM_YEAR')
+
+
+def _percentage_analysis(recent: pd.DataFrame, partners: pd.Index) -> pd.DataFrame:
+    upper = recent['MEDICAL_OR_SURGICAL'].str.upper()
+    kind = upper.mask(upper.str.startswith('MEDICAL', na=False), 'Medical')
+    kind = kind.mask(upper.str.startswith('SURGICAL', na=False), 'Surgical')
+    sums = recent[['APPROVED_AMT', 'CLAIMED_AMT']].groupby(
+        [recent['PARTNER_ID'], kind.rename('MEDICAL_OR_SURGICAL')]
+    ).sum().reset_index()
+
+    totals = sums.groupby('PARTNER_ID')[['APPROVED_AMT', 'CLAIMED_AMT']].transform('sum')
+    sums['Sum_of_Approved_Amt_Percentage'] = (sums['APPROVED_AMT'] / totals['APPROVED_AMT'] * 100).round(2)
+    sums['Sum_of_Claimed_Amt_Percentage'] = (sums['CLAIMED_AMT'] / totals['CLAIMED_AMT'] * 100).round(2)
+    sums['_order'] = 0
+
+    grand_total = pd.DataFrame({
+        'PARTNER_ID': partners,
+        'MEDICAL_OR_SURGICAL': 'Grand Total',
+        'Sum_of_Approved_Amt_Percentage': 100.00,
+        'Sum_of_Claimed_Amt_Percentage': 100.00,
+        '_order': 1
+    })
+    pivot = pd.concat([sums.drop(columns=['APPROVED_AMT', 'CLAIMED_AMT']), grand_total], ignore_index=True)
+    return _sort_by_partner(pivot, '_order').drop(columns='_order')
+
+
+def _room_category_analysis(recent: pd.DataFrame) -> pd.DataFrame:
+    counts = recent.groupby(['PARTNER_ID', 'ROOM_CATEGORY'], observed=True)['CLAIM_NO'].count().reset_index(name='Total_Claims')
+    return _sort_by_partner(counts, 'Total_Claims', ascending=[True, False])
+
+
+def _diagnosis_analysis(recent: pd.DataFrame) -> pd.DataFrame:
+    pivot = recent.groupby(['PARTNER_ID', 'FINAL_DIAGNOSIS'], observed=True).agg(
+        Total_Claims=('CLAIM_NO', 'count'),
+        Total_Approved_AMT=('APPROVED_AMT', 'sum'),
+        Total_Claimed_AMT=('CLAIMED_AMT', 'sum')
+    ).reset_index()
+    return _sort_by_partner(pivot, 'Total_Claims', ascending=[True, False])
+
+
+def build_claims_cube(df: pd.DataFrame, sections: Optional[Iterable[str]] = None) -> ClaimsCube:
+    """Compute partner-local claims-analysis sections for all partners in the frame in one pass"""
+    df = df[df['PARTNER_ID'].notna()]
+    recent = df[df['CLAIM_YEAR'].isin(ANALYSIS_YEARS)]
+    partners = pd.Index(np.sort(df['PARTNER_ID'].unique()), name='PARTNER_ID')
+
+    builders = {
+        'Get_claims_summary': lambda: _claims_summary(df, partners),
+        'Average_Claim_Cost': lambda: _average_claim_cost(df, partners),
+        'Cost_Revision_Ratio': lambda: _cost_revision_ratio(df),
+        'Claim_Type_Analysis': lambda: _sort_by_partner(
+            yearly_split_pivot(recent, 'CLAIM_TYPE', CLAIM_TYPE_SPLIT, by=['PARTNER_ID']), 'claim_year'
+        ),
+        'Medical_Surgical_Analysis': lambda: _sort_by_partner(
+            yearly_split_pivot(recent, 'MEDICAL_OR_SURGICAL', MEDICAL_SURGICAL_SPLIT, by=['PARTNER_ID']), 'claim_year'
+        ),
+        'Type_Percentage_Analysis': lambda: _percentage_analysis(recent, partners),
+        'Room_Category_Analysis': lambda: _room_category_analysis(recent),
+        'Diagnosis_Analysis': lambda: _diagnosis_analysis(recent),
+    }
+    wanted = CUBE_SECTIONS if sections is None else [name for name in CUBE_SECTIONS if name in sections]
+    cube = ClaimsCube({name: builders[name]() for name in wanted}, partners.tolist())
+    logger.info(f"Materialized claims cube for {len(cube)} partners")
+    return cube
+
+
+def analyze_partners(claims_store, partner_ids: Iterable, sections: Optional[Iterable[str]] = None,
+                     geo_index=None, claims_cube: Optional[ClaimsCube] = None) -> Dict[object, Dict[str, pd.DataFrame]]:
+    """
+    Claims analysis for many partners at once. Without a prebuilt cube, the sections are
+    computed in one grouped pass over just the requested partners' rows.
+    """
+    known = [partner_id for partner_id in dict.fromkeys(partner_ids) if partner_id in claims_store]
+    if claims_cube is None:
+        claims_cube = build_claims_cube(claims_store.get_claims_for_partners(known), sections)
+    return {
+        partner_id: claims_cube.analyze(claims_store.df, partner_id, claims_store.peer_index, geo_index, sections)
+        for partner_id in known
+    }
+
+
+def _per_request_sections(df: pd.DataFrame, partner_id) -> Dict[str, pd.DataFrame]:
+    summary = get_claims_summary(df, partner_id)
+    return {
+        'Get_claims_summary': pd.DataFrame({
+            'Type': list(summary.keys()),
+            'Amount': [values['amount'] for values in summary.values()],
+            'Count': [values['count'] for values in summary.values()]
+        }),
+        'Average_Claim_Cost': calculate_average_claim_cost(df, partner_id),
+        'Cost_Revision_Ratio': calculate_cost_revision_ratio(df, partner_id),
+        'Claim_Type_Analysis': claim_type_analysis(df, partner_id),
+        'Medical_Surgical_Analysis': medical_surgical_analysis(df, partner_id),
+        'Type_Percentage_Analysis': percentage_analysis(df, partner_id),
+        'Room_Category_Analysis': room_category_analysis(df, partner_id),
+        'Diagnosis_Analysis': diagnosis_analysis(df, partner_id),
+    }
+
+
+def _normalize_section(name: str, frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.reset_index(drop=True)
+    key = _COUNT_SORTED_SECTIONS.get(name)
+    if key is not None and not frame.empty:
+        # Only the count ordering is meaningful; break ties by key before comparing
+        frame = frame.sort_values(['Total_Claims', key], ascending=[False, True], kind='mergesort')
+        frame = frame.reset_index(drop=True)
+    return frame
+
+
+def verify_claims_cube(cube: ClaimsCube, df: pd.DataFrame, partner_ids=None, claims_store=None) -> List[str]:
+    """Compare cube sections against the per-request functions and describe any mismatch"""
+    if partner_ids is None:
+        partner_ids = sorted(cube.partner_ids)
+    mismatches = []
+    for partner_id in partner_ids:
+        if claims_store is not None:
+            partner_df = claims_store.get_partner_claims(partner_id)
+        else:
+            partner_df = df[df['PARTNER_ID'] == partner_id]
+        cached = cube.get(partner_id)
+        if cached is None:
+            mismatches.append(f"Partner {partner_id}: missing from cube")
+            continue
+        expected = _per_request_sections(partner_df.copy(), partner_id)
+        for name in CUBE_SECTIONS:
+            try:
+                pd.testing.assert_frame_equal(
+                    _normalize_section(name, cached[name]),
+                    _normalize_section(name, expected[name]),
+                    check_dtype=False,
+                    check_index_type=False,
+                    check_categorical=False
+                )
+            except AssertionError as e:
+                mismatches.append(f"Partner {partner_id}, {name}: {e}")
+    return mismatches
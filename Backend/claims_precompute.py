@@ -0,0 +1,195 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional, TextIO, Tuple
+
+import numpy as np
+import pandas as pd
+
+from claims_cube import build_claims_cube
+from claims_store import PeerIndex, build_partner_slices
+from geo_index import GeoIndex
+from hospital_profiling import HospitalProfilingDataHandler
+from serializers import encode_json
+from snapshot import load_claims_dataset, load_snapshot, read_manifest, snapshot_dir_for
+
+logger = logging.getLogger(__name__)
+
+# Shards per worker, so a worker that draws heavy partners does not hold up the others
+SHARDS_PER_WORKER = 4
+# Shards submitted per worker ahead of the writer, bounding buffered output
+SHARDS_IN_FLIGHT = 2
+
+
+class ClaimsShard(NamedTuple):
+    """A contiguous run of whole partners in the partner-sorted claims snapshot"""
+    index: int
+    start: int
+    stop: int
+    partners: int
+
+
+def plan_shards(partner_slices: Dict[object, Tuple[int, int]], shards: int) -> List[ClaimsShard]:
+    """Cut the partner row ranges into about ``shards`` contiguous shards of similar row
+    counts, never splitting a partner"""
+    bounds = sorted(partner_slices.values())
+    if not bounds:
+        return []
+    target = max(1, (bounds[-1][1] - bounds[0][0]) // max(1, shards))
+    planned, start, partners = [], bounds[0][0], 0
+    for _, stop in bounds:
+        partners += 1
+        if stop - start >= target:
+            planned.append(ClaimsShard(len(planned), start, stop, partners))
+            start, partners = stop, 0
+    if partners:
+        planned.append(ClaimsShard(len(planned), start, bounds[-1][1], partners))
+    return planned
+
+
+# Per-process state set up by _init_worker
+_df: Optional[pd.DataFrame] = None
+_peer_index: Optional[PeerIndex] = None
+_geo_index: Optional[GeoIndex] = None
+_sections: Optional[List[str]] = None
+
+
+def _init_worker(snapshot_dir: str, peer_index: PeerIndex, profiling_path: Optional[str],
+                 sections: Optional[List[str]]) -> None:
+    """Attach to the shared snapshot; shards are then views into its memory-mapped columns"""
+    global _df, _peer_index, _geo_index, _sections
+    _df = load_snapshot(snapshot_dir, shared=True)
+    _peer_index = peer_index
+    _geo_index = (
+        GeoIndex.from_hospitals(HospitalProfilingDataHandler(profiling_path).get_hospital_summaries())
+        if profiling_path else None
+    )
+    _sections = sections
+
+
+def _analyze_shard(shard: ClaimsShard) -> Tuple[int, str]:
+    """Claims analysis for every partner of a shard as NDJSON lines in partner order"""
+    rows = _df.iloc[shard.start:shard.stop]
+    claims_cube = build_claims_cube(rows, _sections)
+    lines = []
+    for partner_id in build_partner_slices(rows['PARTNER_ID']):
+        # Similar hospitals without coordinates get placeholder distances; seeding per
+        # partner keeps the output the same whichever worker or shard computes it
+        np.random.seed(zlib.crc32(str(partner_id).encode()))
+        results = claims_cube.analyze(rows, partner_id, _peer_index, _geo_index, _sections)
+        if results is not None:
+            lines.append(encode_json({"partner_id": partner_id, **results}) + "\n")
+    return shard.index, "".join(lines)
+
+
+def precompute_claims_analytics(path: str, out: TextIO, workers: Optional[int] = None,
+                                sections: Optional[List[str]] = None, profiling_path: Optional[str] = None,
+                                progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Claims analysis for every partner of a claims workbook (through its snapshot) or of
+    a snapshot directory, computed across a process pool and written to ``out`` as
+    NDJSON in partner order. Workers attach to the shared snapshot and receive only
+    (start, stop) bounds of their shard, never pickled frames; the peer index is built
+    once here and handed to each worker at start-up.
+    """
+    workers = workers or os.cpu_count() or 1
+    if os.path.isdir(path) and read_manifest(path) is not None:
+        snapshot_dir = path
+        df = load_snapshot(snapshot_dir, shared=True)
+    else:
+        snapshot_dir = snapshot_dir_for(path)
+        df = load_claims_dataset(path, shared=True)
+    partner_ids = df['PARTNER_ID']
+    if not partner_ids.iloc[:int(partner_ids.notna().sum())].is_monotonic_increasing:
+        raise ValueError(f"Claims snapshot {snapshot_dir} is not sorted by PARTNER_ID")
+    shards = plan_shards(build_partner_slices(df['PARTNER_ID']), workers * SHARDS_PER_WORKER)
+    initargs = (snapshot_dir, PeerIndex(df), profiling_path, sections)
+    del df
+
+    started = time.perf_counter()
+    status = {"shards": len(shards), "shards_done": 0, "partners": 0, "rows": 0, "workers": workers}
+
+    def finished(shard: ClaimsShard) -> None:
+        status["shards_done"] += 1
+        status["partners"] += shard.partners
+        status["rows"] += shard.stop - shard.start
+        status["seconds"] = round(time.perf_counter() - started, 1)
+        logger.debug(f"Precomputed claims shard: {status}")
+        if progress is not None:
+            progress(dict(status))
+
+    if workers == 1:
+        _init_worker(*initargs)
+        for shard in shards:
+            out.write(_analyze_shard(shard)[1])
+            finished(shard)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=initargs)
+        try:
+            queued = iter(shards)
+            running, done, next_index = {}, {}, 0
+            for shard in queued:
+                running[executor.submit(_analyze_shard, shard)] = shard
+                if len(running) >= workers * SHARDS_IN_FLIGHT:
+                    break
+            while running:
+                completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    shard = running.pop(future)
+                    index, lines = future.result()
+                    done[index] = lines
+                    finished(shard)
+                    following = next(queued, None)
+                    if following is not None:
+                        running[executor.submit(_analyze_shard, following)] = following
+                # Shards finish out of order; write them back in partner order
+                while next_index in done:
+                    out.write(done.pop(next_index))
+                    next_index += 1
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    status["seconds"] = round(elapsed, 2)
+    status["partners_per_second"] = round(status["partners"] / elapsed, 1) if elapsed else None
+    logger.info(f"Precomputed claims analytics: {status}")
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute claims analytics for every partner on all cores")
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument("--excel", default=os.path.join(current_dir, "hospital_data_v1.xlsx"),
+                        help="Claims workbook or claims snapshot directory")
+    parser.add_argument("--profiling", default=None, help="Hospital profiling JSON for geo-based similar hospitals")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--sections", default=None, help="Comma-separated analysis sections (default: all)")
+    parser.add_argument("--out", default="-", help="NDJSON output file, one partner per line (default: stdout)")
+    parser.add_argument("--quiet", action="store_true", help="Do not report progress on stderr")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    def report(status: Dict) -> None:
+        print(f"\r{status['shards_done']}/{status['shards']} shards, {status['partners']} partners, "
+              f"{status['rows']} rows, {status['seconds']}s", end="", file=sys.stderr, flush=True)
+
+    out = sys.stdout if args.out == "-" else open(args.out, 'w')
+    try:
+        result = precompute_claims_analytics(
+            args.excel,
+            out,
+            workers=args.workers,
+            sections=args.sections.split(",") if args.sections else None,
+            profiling_path=args.profiling,
+            progress=None if args.quiet else report
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"\n{result}", file=sys.stderr)
@@ -0,0 +1,252 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from claims_aggregates import ClaimsAggregates, ClaimsIngestLog
+from claims_cube import ClaimsCube, build_claims_cube, verify_claims_cube
+from claims_store import ClaimsStore
+from snapshot import load_claims_dataset
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['PARTNER_ID', 'HOSPITAL', 'HOSP_TYPE', 'CITY', 'STATE', 'PIN']
+
+
+class ClaimsDataset(NamedTuple):
+    """One load of the claims workbook with everything derived from it"""
+    version: int
+    store: ClaimsStore
+    cube: Optional[ClaimsCube]
+    # Incrementally maintained aggregates, including ingested batches (CLAIMS_INCREMENTAL)
+    aggregates: Optional[ClaimsAggregates] = None
+
+    def __contains__(self, partner_id) -> bool:
+        if self.aggregates is not None:
+            return partner_id in self.aggregates
+        return partner_id in self.store
+
+
+def ingest_dir_for(excel_path: str) -> str:
+    """Directory of ingested claim batches that sits next to the source workbook"""
+    return os.path.splitext(excel_path)[0] + ".ingest"
+
+
+def build_claims_dataset(excel_path: str, version: int, use_snapshot: bool = True, shared: bool = False,
+                         use_cube: bool = False, verify_cube: bool = False,
+                         incremental: bool = False) -> ClaimsDataset:
+    """Load the workbook (through its snapshot) and build the partner index, the optional cube
+    and, in incremental mode, the aggregates with every ingested batch replayed on top"""
+    df = load_claims_dataset(excel_path, use_snapshot=use_snapshot, shared=shared)
+    logger.info(f"Successfully loaded claims data with shape: {df.shape}")
+    logger.info(f"DataFrame columns: {df.columns.tolist()}")
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns in Excel file: {missing_columns}")
+
+    # Group claims by partner once so requests only touch their own rows
+    claims_store = ClaimsStore(df, version=version)
+    logger.info(f"Available Partner IDs: {claims_store.partner_ids}")
+
+    # Optionally materialize every partner's claims-analysis sections up front
+    claims_cube = None
+    if use_cube:
+        claims_cube = build_claims_cube(claims_store.df)
+        if verify_cube:
+            mismatches = verify_claims_cube(claims_cube, claims_store.df, claims_store=claims_store)
+            for mismatch in mismatches:
+                logger.warning(f"Claims cube mismatch: {mismatch}")
+            logger.info(f"Claims cube consistency check finished with {len(mismatches)} mismatches")
+
+    claims_aggregates = None
+    if incremental:
+        claims_aggregates = ClaimsAggregates.from_frame(claims_store.df)
+        replayed = 0
+        for batch in ClaimsIngestLog(ingest_dir_for(excel_path)).replay():
+            claims_aggregates.add(batch)
+            replayed += 1
+        logger.info(f"Built claims aggregates for {len(claims_aggregates)} partners, replaying {replayed} batches")
+    return ClaimsDataset(version, claims_store, claims_cube, claims_aggregates)
+
+
+def _file_fingerprint(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ClaimsReloader:
+    """Holds the current claims dataset and replaces it without a restart.
+
+    A reload builds the new dataset and its indexes on the calling thread while
+    requests keep reading ``current``; the finished dataset is then swapped in with
+    a single assignment under the next version number. Requests that already took
+    ``current`` finish on the old dataset, and caches keyed by the version stop
+    matching on their own. A failed reload leaves the current dataset in place.
+
+    In incremental mode appended claim batches are logged next to the workbook and
+    folded into the current aggregates, each publishing a new version; a reload
+    replays the logged batches on top of the workbook.
+    """
+
+    def __init__(self, excel_path: str, use_snapshot: bool = True, shared: bool = False,
+                 use_cube: bool = False, verify_cube: bool = False, incremental: bool = False):
+        self.excel_path = excel_path
+        self.use_snapshot = use_snapshot
+        self.shared = shared
+        self.use_cube = use_cube
+        self.verify_cube = verify_cube
+        self.incremental = incremental
+        self.ingest_log = ClaimsIngestLog(ingest_dir_for(excel_path)) if incremental else None
+        # Called with each newly swapped-in dataset
+        self.listeners: List[Callable[[ClaimsDataset], None]] = []
+        self._reload_lock = threading.Lock()
+        # Taken by ingestion and by a reload's build and swap, so no batch falls in between
+        self._ingest_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._fingerprint = _file_fingerprint(excel_path)
+        self.current = self._build(1)
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_reload_seconds: Optional[float] = None
+        self.ingested_batches = 0
+
+    def _build(self, version: int) -> ClaimsDataset:
+        return build_claims_dataset(self.excel_path, version, use_snapshot=self.use_snapshot, shared=self.shared,
+                                    use_cube=self.use_cube, verify_cube=self.verify_cube,
+                                    incremental=self.incremental)
+
+    @property
+    def reloading(self) -> bool:
+        return self._reload_lock.locked()
+
+    def _publish(self, dataset: ClaimsDataset) -> None:
+        self.current = dataset
+        for listener in self.listeners:
+            try:
+                listener(dataset)
+            except Exception as e:
+                logger.error(f"Claims reload listener failed: {e}")
+
+    def reload(self, reason: str = "manual") -> Optional[ClaimsDataset]:
+        """Build and swap in a fresh dataset. Returns None when another reload is already
+        running; raises when the build fails, keeping the old dataset."""
+        if not self._reload_lock.acquire(blocking=False):
+            return None
+        try:
+            with self._ingest_lock:
+                started = time.perf_counter()
+                fingerprint = _file_fingerprint(self.excel_path)
+                logger.info(f"Reloading claims dataset ({reason}) from {self.excel_path}")
+                try:
+                    dataset = self._build(self.current.version + 1)
+                except Exception as e:
+                    self.failures += 1
+                    self.last_error = str(e)
+                    logger.error(f"Claims reload failed, keeping version {self.current.version}: {e}")
+                    raise
+                self._fingerprint = fingerprint
+                self.reloads += 1
+                self.last_error = None
+                self.last_reload_seconds = round(time.perf_counter() - started, 2)
+                logger.info(f"Swapped in claims dataset version {dataset.version} "
+                            f"({len(dataset.store)} partners) in {self.last_reload_seconds}s")
+                self._publish(dataset)
+                return dataset
+        finally:
+            self._reload_lock.release()
+
+    def ingest(self, batch: pd.DataFrame) -> Dict:
+        """Log a parsed claims batch, fold it into the aggregates and publish the result
+        as a new version. Waits while a reload is running, and raises ValueError without
+        logging anything when the batch cannot be applied."""
+        if not self.incremental:
+            raise RuntimeError("Claims ingestion needs incremental mode")
+        # Fold into empty aggregates first: a batch that cannot be applied must never
+        # reach the log, or every later startup would fail replaying it
+        try:
+            ClaimsAggregates().add(batch)
+        except Exception as e:
+            raise ValueError(f"Claims batch cannot be applied: {e}")
+        with self._ingest_lock:
+            # Logged before it is applied, so a crash right after still replays it on restart
+            path = self.ingest_log.append(batch)
+            try:
+                counts = self.current.aggregates.add(batch)
+            except Exception:
+                self.ingest_log.remove(path)
+                raise
+            version = self.current.version + 1
+            dataset = self.current._replace(version=version, store=self.current.store.with_version(version))
+            self.ingested_batches += 1
+            self._publish(dataset)
+        logger.info(f"Ingested {counts['rows']} claim rows for {counts['partners']} partners "
+                    f"as version {dataset.version}")
+        return {**counts, "version": dataset.version}
+
+    def reload_in_background(self, reason: str = "manual") -> bool:
+        """Start a reload on its own thread; False when one is already running"""
+        if self.reloading:
+            return False
+
+        def run():
+            try:
+                self.reload(reason)
+            except Exception:
+                pass  # Already logged and recorded in last_error
+
+        threading.Thread(target=run, name="claims-reload", daemon=True).start()
+        return True
+
+    def watch(self, interval: float = 5.0) -> None:
+        """Poll the workbook and reload once a change has stayed put for a whole interval,
+        so a file that is still being copied is not picked up half-written"""
+        if self._watcher is not None:
+            return
+
+        def run():
+            pending = None
+            while not self._stop.wait(interval):
+                fingerprint = _file_fingerprint(self.excel_path)
+                if fingerprint is None or fingerprint == self._fingerprint:
+                    pending = None
+                elif fingerprint != pending:
+                    pending = fingerprint
+                else:
+                    pending = None
+                    try:
+                        self.reload("file changed")
+                    except Exception:
+                        # Retry only after the file changes again
+                        self._fingerprint = fingerprint
+
+        self._watcher = threading.Thread(target=run, name="claims-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Watching {self.excel_path} for changes every {interval}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.current.version,
+            "partners": len(self.current.store),
+            "rows": len(self.current.store.df),
+            "reloading": self.reloading,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_reload_seconds": self.last_reload_seconds,
+            "watching": self._watcher is not None,
+            "incremental": self.incremental,
+            "ingested_batches": self.ingested_batches,
+            "aggregates": self.current.aggregates.stats() if self.current.aggregates is not None else None
+        }
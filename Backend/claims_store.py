@@ -0,0 +1,229 @@
+import copy
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Low-cardinality string columns held as categoricals
+CATEGORICAL_COLUMNS = [
+    'CLAIM_TYPE', 'MEDICAL_OR_SURGICAL', 'ROOM_CATEGORY', 'FINAL_DIAGNOSIS',
+    'HOSPITAL', 'HOSP_TYPE', 'CITY', 'STATE'
+]
+# Identifier-like columns downcast to the narrowest integer type that fits
+INTEGER_COLUMNS = ['PARTNER_ID', 'CLAIM_NO', 'CLAIM_YEAR', 'PIN']
+# Money columns kept at paise precision
+AMOUNT_COLUMNS = ['APPROVED_AMT', 'CLAIMED_AMT']
+# Other string columns become categoricals below this distinct-to-rows ratio
+CATEGORICAL_MAX_RATIO = 0.5
+# Position of each row in the source workbook, kept through the sort by partner so
+# results that depend on workbook order (similar hospitals) do not change
+ROW_COLUMN = '_row'
+
+
+def _downcast_integer(series: pd.Series) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(series) or series.isna().any():
+        return series
+    if pd.api.types.is_float_dtype(series):
+        if not (series % 1 == 0).all():
+            return series
+        series = series.astype(np.int64)
+    return pd.to_numeric(series, downcast='integer')
+
+
+def _fixed_precision_amount(series: pd.Series) -> pd.Series:
+    if not pd.api.types.is_numeric_dtype(series):
+        return series
+    rounded = series.round(2)
+    info = np.iinfo(np.int32)
+    whole_rupees = (
+        rounded.notna().all()
+        and (rounded % 1 == 0).all()
+        and (len(rounded) == 0 or (rounded.min() >= info.min and rounded.max() <= info.max))
+    )
+    if whole_rupees:
+        return rounded.astype(np.int32)
+    return rounded.astype(np.float64)
+
+
+def compact_claims_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Convert a claims frame to compact dtypes: categoricals for low-cardinality strings,
+    downcast integer identifiers and fixed-precision amounts. Returns the new frame and
+    a per-column report of the memory saved.
+    """
+    compact = {}
+    for column in df.columns:
+        series = df[column]
+        if column in INTEGER_COLUMNS:
+            series = _downcast_integer(series)
+        elif column in AMOUNT_COLUMNS:
+            series = _fixed_precision_amount(series)
+        elif series.dtype == object and (
+            column in CATEGORICAL_COLUMNS or series.nunique() <= CATEGORICAL_MAX_RATIO * len(series)
+        ):
+            series = series.astype('category')
+        compact[column] = series
+    compact_df = pd.DataFrame(compact)
+
+    before = df.memory_usage(deep=True, index=False)
+    after = compact_df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'column': df.columns,
+        'dtype_before': [str(df[column].dtype) for column in df.columns],
+        'dtype_after': [str(compact_df[column].dtype) for column in df.columns],
+        'bytes_before': before.values,
+        'bytes_after': after.values,
+    })
+    report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+    return compact_df, report
+
+
+def log_memory_report(report: pd.DataFrame) -> None:
+    for row in report.itertuples(index=False):
+        logger.info(
+            f"Column {row.column}: {row.dtype_before} -> {row.dtype_after}, "
+            f"{row.bytes_before} -> {row.bytes_after} bytes ({row.bytes_saved} saved)"
+        )
+    logger.info(
+        f"Claims frame compacted from {report['bytes_before'].sum()} to "
+        f"{report['bytes_after'].sum()} bytes"
+    )
+
+
+def build_partner_slices(partner_ids: pd.Series) -> Dict[object, Tuple[int, int]]:
+    """Map each partner ID to the (start, stop) bounds of its rows in a frame sorted by partner"""
+    codes, uniques = pd.factorize(partner_ids, sort=False)
+    if len(codes) == 0:
+        return {}
+    keys = uniques.tolist()
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+    stops = np.concatenate((starts[1:], [len(codes)]))
+    slices = {}
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        code = codes[start]
+        # Rows without a partner ID are sorted last and are not addressable
+        if code == -1:
+            continue
+        slices[keys[code]] = (start, stop)
+    return slices
+
+
+def sort_claims_by_partner(df: pd.DataFrame) -> pd.DataFrame:
+    """Stably sort claims by PARTNER_ID, leaving frames that are already sorted untouched"""
+    partner_ids = df['PARTNER_ID']
+    valid = int(partner_ids.notna().sum())
+    already_sorted = (
+        partner_ids.iloc[:valid].notna().all()
+        and partner_ids.iloc[:valid].is_monotonic_increasing
+        and isinstance(df.index, pd.RangeIndex)
+        and df.index.start == 0
+        and df.index.step == 1
+    )
+    if already_sorted:
+        # Avoids copying frames whose columns are memory-mapped from a snapshot
+        return df
+    if ROW_COLUMN not in df.columns:
+        df = df.assign(**{ROW_COLUMN: _downcast_integer(pd.Series(np.arange(len(df)), index=df.index))})
+    return df.sort_values('PARTNER_ID', kind='mergesort', na_position='last').reset_index(drop=True)
+
+
+class ClaimsStore:
+    """Claims frame grouped by PARTNER_ID into contiguous row slices.
+
+    The frame is stably sorted by partner once at load time, so the claims of a
+    hospital can be fetched with a dictionary probe and a positional slice
+    instead of a boolean mask over the whole book.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: int = 1):
+        if 'PARTNER_ID' not in df.columns:
+            raise ValueError("Claims data must contain a PARTNER_ID column")
+        # Identifies this load of the dataset in response cache keys
+        self.version = version
+        self.df = sort_claims_by_partner(df)
+        self.partner_slices = build_partner_slices(self.df['PARTNER_ID'])
+        self.peer_index = PeerIndex(self.df)
+        logger.info(f"Indexed {len(self.partner_slices)} partners over {len(self.df)} claim rows")
+
+    def __contains__(self, partner_id) -> bool:
+        return partner_id in self.partner_slices
+
+    def with_version(self, version: int) -> 'ClaimsStore':
+        """The same rows and indexes under another dataset version, without copying them"""
+        store = copy.copy(self)
+        store.version = version
+        return store
+
+    def __len__(self) -> int:
+        return len(self.partner_slices)
+
+    @property
+    def partner_ids(self) -> List:
+        return list(self.partner_slices.keys())
+
+    def get_partner_claims(self, partner_id) -> pd.DataFrame:
+        """Return the claim rows of a single partner, or an empty frame if unknown"""
+        bounds = self.partner_slices.get(partner_id)
+        if bounds is None:
+            return self.df.iloc[0:0]
+        start, stop = bounds
+        return self.df.iloc[start:stop]
+
+    def get_claims_for_partners(self, partner_ids) -> pd.DataFrame:
+        """Return the claim rows of several partners in partner order, skipping unknown IDs"""
+        bounds = sorted(self.partner_slices[pid] for pid in set(partner_ids) if pid in self.partner_slices)
+        if not bounds:
+            return self.df.iloc[0:0]
+        positions = np.concatenate([np.arange(start, stop) for start, stop in bounds])
+        return self.df.take(positions)
+
+
+class PeerIndex:
+    """Hospitals grouped by (PIN, HOSP_TYPE) with each partner's ACS precomputed.
+
+    Candidates keep the row order of the source workbook (ROW_COLUMN when the frame
+    has been sorted by partner), so a lookup returns the same peers as filtering the
+    workbook by PIN and hospital type.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        located = df.dropna(subset=['PARTNER_ID', 'PIN', 'HOSP_TYPE'])
+        if ROW_COLUMN in located.columns:
+            located = located.sort_values(ROW_COLUMN, kind='mergesort')
+        firsts = located.drop_duplicates(subset=['PARTNER_ID'])
+        self.partner_keys = dict(zip(
+            firsts['PARTNER_ID'].tolist(),
+            zip(firsts['PIN'].tolist(), firsts['HOSP_TYPE'].tolist())
+        ))
+
+        acs = located.groupby('PARTNER_ID', observed=True)['APPROVED_AMT'].mean().round(0)
+        self.partner_acs = dict(zip(acs.index.tolist(), acs.tolist()))
+
+        candidates = located.drop_duplicates(subset=['PARTNER_ID', 'HOSPITAL'])
+        self.peers: Dict[tuple, List[tuple]] = {}
+        for partner_id, hospital, pin, hosp_type in zip(
+            candidates['PARTNER_ID'].tolist(),
+            candidates['HOSPITAL'].tolist(),
+            candidates['PIN'].tolist(),
+            candidates['HOSP_TYPE'].tolist()
+        ):
+            self.peers.setdefault((pin, hosp_type), []).append((partner_id, hospital))
+
+    def similar_hospitals(self, partner_id, limit: int = 5) -> Optional[List[tuple]]:
+        """Return up to `limit` (partner_id, hospital, hosp_type, acs) peers, or None if unknown"""
+        key = self.partner_keys.get(partner_id)
+        if key is None:
+            return None
+        results = []
+        seen = set()
+        for peer_id, hospital in self.peers.get(key, []):
+            if peer_id == partner_id or hospital in seen:
+                continue
+            seen.add(hospital)
+            results.append((peer_id, hospital, key[1], self.partner_acs.get(peer_id, 0)))
+            if len(results) == limit:
+                break
+        return results
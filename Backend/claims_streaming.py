@@ -0,0 +1,186 @@
+import argparse
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from claims_aggregates import INGEST_COLUMNS, ClaimsAggregates, clean_key, distinct_claim_rows, normalize_claims_batch
+from claims_store import ROW_COLUMN
+from serializers import encode_json
+from snapshot import load_snapshot, read_manifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+# Share of the budget one chunk of claim rows may take, leaving the rest for the frames
+# derived from it while it is folded in and for the running aggregates
+CHUNK_SHARE = 0.25
+# Derived frames built from a chunk, relative to the chunk's own size
+CHUNK_OVERHEAD = 4
+MIN_CHUNK_ROWS = 1000
+MAX_SPILL_PARTITIONS = 1024
+SPILL_COLUMNS = ['partner', 'year', 'medical_surgical', 'claim']
+
+
+def _is_snapshot(path: str) -> bool:
+    return os.path.isdir(path) and read_manifest(path) is not None
+
+
+def claims_sources(path: str) -> List[str]:
+    """CSV files and claims snapshots to stream from a path, in name order"""
+    if _is_snapshot(path) or (os.path.isfile(path) and path.endswith(".csv")):
+        return [path]
+    if os.path.isdir(path):
+        sources = [
+            os.path.join(path, name) for name in sorted(os.listdir(path))
+            if name.endswith(".csv") or _is_snapshot(os.path.join(path, name))
+        ]
+        if sources:
+            return sources
+    raise ValueError(f"Cannot stream {path}: expected a CSV file, a claims snapshot or a directory of them")
+
+
+def _source_bytes(source: str) -> int:
+    if os.path.isdir(source):
+        return sum(os.path.getsize(os.path.join(source, name)) for name in os.listdir(source))
+    return os.path.getsize(source)
+
+
+def chunk_rows_for(sample: pd.DataFrame, memory_budget: int) -> int:
+    """Rows per chunk so a chunk and its derived frames stay within the budget's chunk share"""
+    bytes_per_row = max(1.0, sample.memory_usage(deep=True).sum() / max(1, len(sample)))
+    return max(MIN_CHUNK_ROWS, int(memory_budget * CHUNK_SHARE / (bytes_per_row * CHUNK_OVERHEAD)))
+
+
+def iter_claim_chunks(source: str, memory_budget: int) -> Iterator[pd.DataFrame]:
+    """Claim rows of one CSV file or snapshot in chunks sized from the memory budget"""
+    if _is_snapshot(source):
+        # Every column stays memory-mapped; rows are sliced before the columns are
+        # selected, since selecting copies and should only ever copy one chunk
+        df = load_snapshot(source, shared=True)
+        missing = [column for column in INGEST_COLUMNS if column not in df.columns]
+        if missing:
+            raise ValueError(f"Missing required columns in {source}: {missing}")
+        # Workbook row positions keep similar hospitals in workbook order
+        columns = INGEST_COLUMNS + [ROW_COLUMN] if ROW_COLUMN in df.columns else INGEST_COLUMNS
+        rows = chunk_rows_for(df.iloc[:MIN_CHUNK_ROWS][columns], memory_budget)
+        for start in range(0, len(df), rows):
+            yield df.iloc[start:start + rows][columns]
+        return
+
+    try:
+        sample = pd.read_csv(source, nrows=MIN_CHUNK_ROWS, usecols=INGEST_COLUMNS)
+    except ValueError as e:
+        raise ValueError(f"Missing required columns in {source}: {e}")
+    for chunk in pd.read_csv(source, usecols=INGEST_COLUMNS, chunksize=chunk_rows_for(sample, memory_budget)):
+        yield normalize_claims_batch(chunk)
+
+
+class DistinctClaimSpill:
+    """Distinct Medical/Surgical CLAIM_NOs spilled to disk, hash-partitioned by partner.
+
+    Exact distinct counts need every claim number at once, which is what does not fit
+    in memory. Each chunk's (partner, year, type, claim) rows are appended to one of
+    ``partitions`` files instead, and the files are deduplicated one at a time; a
+    partner's rows always land in the same file.
+    """
+
+    def __init__(self, directory: str, partitions: int):
+        self.directory = directory
+        self.partitions = partitions
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, partition: int) -> str:
+        return os.path.join(self.directory, f"part-{partition:04d}.csv")
+
+    def add(self, batch: pd.DataFrame) -> None:
+        rows = distinct_claim_rows(batch).drop_duplicates()
+        if rows.empty:
+            return
+        partition_of = pd.util.hash_pandas_object(rows['partner'], index=False).to_numpy() % self.partitions
+        for partition, part in rows.groupby(partition_of, sort=False):
+            part.to_csv(self._path(partition), mode='a', header=False, index=False)
+
+    def counts(self) -> Dict[tuple, int]:
+        counts = {}
+        for partition in range(self.partitions):
+            path = self._path(partition)
+            if not os.path.exists(path):
+                continue
+            rows = pd.read_csv(path, names=SPILL_COLUMNS, header=None).drop_duplicates()
+            for key, count in rows.groupby(SPILL_COLUMNS[:3], sort=False).size().items():
+                counts[tuple(clean_key(part) for part in key)] = int(count)
+        return counts
+
+
+def stream_claims_aggregates(path: str, memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+                             spill_dir: Optional[str] = None,
+                             progress: Optional[Callable[[Dict], None]] = None) -> ClaimsAggregates:
+    """
+    Build the claims aggregates from CSV files or snapshots without loading them whole.
+    Chunks are folded into mergeable partial sums and counts as they are read, and the
+    distinct claim counts go through a partitioned spill on disk, so memory follows the
+    budget and the number of distinct groups (partners, diagnoses, room categories)
+    rather than the number of claim rows. Results match analyze_hospital_claims.
+    """
+    memory_budget = int(memory_budget_mb * 1024 * 1024)
+    sources = claims_sources(path)
+    total_bytes = sum(_source_bytes(source) for source in sources)
+    partitions = min(MAX_SPILL_PARTITIONS, max(1, math.ceil(total_bytes / (memory_budget * CHUNK_SHARE))))
+    aggregates = ClaimsAggregates(track_distinct=False)
+    spill_root = tempfile.mkdtemp(prefix="claims-spill-", dir=spill_dir)
+    started = time.perf_counter()
+    rows = chunks = 0
+    try:
+        spill = DistinctClaimSpill(spill_root, partitions)
+        for source in sources:
+            for chunk in iter_claim_chunks(source, memory_budget):
+                aggregates.add(chunk)
+                spill.add(chunk)
+                rows += len(chunk)
+                chunks += 1
+                status = {"source": source, "chunks": chunks, "rows": rows, "partners": len(aggregates),
+                          "seconds": round(time.perf_counter() - started, 1)}
+                logger.debug(f"Streamed claims chunk: {status}")
+                if progress is not None:
+                    progress(status)
+        aggregates.set_distinct_counts(spill.counts())
+    finally:
+        shutil.rmtree(spill_root, ignore_errors=True)
+    logger.info(f"Streamed {rows} claim rows in {chunks} chunks for {len(aggregates)} partners "
+                f"in {time.perf_counter() - started:.1f}s")
+    return aggregates
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Claims analysis over CSV files or snapshots larger than memory")
+    parser.add_argument("source", help="CSV file, claims snapshot directory, or a directory of them")
+    parser.add_argument("--budget-mb", type=float, default=DEFAULT_MEMORY_BUDGET_MB)
+    parser.add_argument("--spill-dir", default=None, help="Where to spill distinct claim numbers (default: temp dir)")
+    parser.add_argument("--partners", default=None, help="Comma-separated partner IDs (default: all)")
+    parser.add_argument("--sections", default=None, help="Comma-separated analysis sections (default: all)")
+    parser.add_argument("--out", default="-", help="NDJSON output file, one partner per line (default: stdout)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    claims_aggregates = stream_claims_aggregates(args.source, args.budget_mb, args.spill_dir)
+    if args.partners:
+        partner_ids = [clean_key(int(partner_id)) for partner_id in args.partners.split(",")]
+    else:
+        partner_ids = sorted(claims_aggregates.partner_ids)
+    sections = args.sections.split(",") if args.sections else None
+    out = sys.stdout if args.out == "-" else open(args.out, 'w')
+    try:
+        for partner_id in partner_ids:
+            results = claims_aggregates.analyze(partner_id, sections)
+            if results is not None:
+                out.write(encode_json({"partner_id": partner_id, **results}) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from due_dil_utils import ACCREDITATIONS, DueDiligenceDataHandler, is_accredited, validate_hospital_data
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hospitals (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    tier TEXT,
+    category TEXT,
+    jci INTEGER NOT NULL DEFAULT 0,
+    nabh INTEGER NOT NULL DEFAULT 0,
+    rohini INTEGER NOT NULL DEFAULT 0,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_hospitals_name_key ON hospitals (name_key);
+CREATE INDEX IF NOT EXISTS idx_hospitals_tier ON hospitals (tier);
+CREATE INDEX IF NOT EXISTS idx_hospitals_jci ON hospitals (jci);
+CREATE INDEX IF NOT EXISTS idx_hospitals_nabh ON hospitals (nabh);
+CREATE INDEX IF NOT EXISTS idx_hospitals_rohini ON hospitals (rohini);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', '0');
+"""
+
+
+def _row_values(record: Dict) -> tuple:
+    info = record["hospital_info"]
+    return (
+        str(info["ID"]),
+        str(info["HOSPITAL"]),
+        str(info["HOSPITAL"]).casefold(),
+        None if info.get("TIER") is None else str(info["TIER"]),
+        None if info.get("CATEGORY") is None else str(info["CATEGORY"]),
+        *(int(is_accredited(record, accreditation)) for accreditation in ACCREDITATIONS),
+        json.dumps(record, separators=(",", ":"))
+    )
+
+
+class SQLiteDueDiligenceRepository:
+    """Due-diligence records in SQLite, a drop-in alternative to DueDiligenceDataHandler.
+
+    The database runs in WAL mode, so readers never block the single writer, and
+    every write is one IMMEDIATE transaction that also bumps a version counter in
+    the ``meta`` table. Several API workers can share the file without losing
+    updates or drifting apart. ID, name, tier and accreditation flags are indexed
+    columns; the full record is stored as JSON.
+    """
+
+    def __init__(self, db_file: str = "due_diligence.db", import_from: Optional[str] = None):
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        self.db_file = os.path.join(current_dir, db_file)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        logger.info(f"Opened due-diligence database {self.db_file}")
+        if import_from:
+            self.migrate_from_json(import_from)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that created them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        """IMMEDIATE transaction that takes the write lock up front and bumps the version"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @property
+    def version(self) -> int:
+        """Shared across processes, so every worker sees every other worker's writes"""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0])
+
+    def get_all_hospitals(self) -> List[Dict]:
+        """Get all hospital data"""
+        rows = self._connection().execute("SELECT record FROM hospitals ORDER BY rowid")
+        return [json.loads(record) for record, in rows]
+
+    def get_hospital_by_id(self, hospital_id: int) -> Optional[Dict]:
+        """Get hospital data by ID"""
+        row = self._connection().execute("SELECT record FROM hospitals WHERE id = ?", (str(hospital_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_hospital_by_name(self, hospital_name: str) -> Optional[Dict]:
+        """Get hospital data by name"""
+        row = self._connection().execute(
+            "SELECT record FROM hospitals WHERE name_key = ? ORDER BY rowid LIMIT 1", (hospital_name.casefold(),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add_hospital(self, hospital_data: Dict) -> bool:
+        """Add new hospital data"""
+        if not validate_hospital_data(hospital_data):
+            return False
+        try:
+            with self._write() as conn:
+                conn.execute("INSERT INTO hospitals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", _row_values(hospital_data))
+        except sqlite3.IntegrityError:
+            # Hospital already exists
+            return False
+        return True
+
+    def update_hospital(self, hospital_id: int, hospital_data: Dict) -> bool:
+        """Update existing hospital data"""
+        if not validate_hospital_data(hospital_data):
+            return False
+        try:
+            with self._write() as conn:
+                cursor = conn.execute(
+                    "UPDATE hospitals SET id = ?, name = ?, name_key = ?, tier = ?, category = ?, "
+                    "jci = ?, nabh = ?, rohini = ?, record = ? WHERE id = ?",
+                    (*_row_values(hospital_data), str(hospital_id))
+                )
+                if cursor.rowcount == 0:
+                    raise LookupError(hospital_id)
+        except (LookupError, sqlite3.IntegrityError):
+            # Unknown hospital, or re-keying onto another hospital's ID
+            return False
+        return True
+
+    def delete_hospital(self, hospital_id: int) -> bool:
+        """Delete hospital data"""
+        try:
+            with self._write() as conn:
+                cursor = conn.execute("DELETE FROM hospitals WHERE id = ?", (str(hospital_id),))
+                if cursor.rowcount == 0:
+                    raise LookupError(hospital_id)
+        except LookupError:
+            return False
+        return True
+
+    def bulk_upsert(self, records: List[Dict]) -> Dict[str, int]:
+        """Insert or replace many validated records in one transaction"""
+        unique = {str(record["hospital_info"]["ID"]): record for record in records}
+        if not unique:
+            return {"inserted": 0, "updated": 0}
+        with self._write() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM hospitals").fetchone()[0]
+            self._upsert_many(conn, unique.values())
+            inserted = conn.execute("SELECT COUNT(*) FROM hospitals").fetchone()[0] - before
+        return {"inserted": inserted, "updated": len(unique) - inserted}
+
+    def _upsert_many(self, conn: sqlite3.Connection, records: Iterable[Dict]) -> None:
+        conn.executemany(
+            "INSERT INTO hospitals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+            "name = excluded.name, name_key = excluded.name_key, tier = excluded.tier, category = excluded.category, "
+            "jci = excluded.jci, nabh = excluded.nabh, rohini = excluded.rohini, record = excluded.record",
+            (_row_values(record) for record in records)
+        )
+
+    def migrate_from_json(self, json_file: str) -> int:
+        """
+        One-shot import of the JSON store (base file plus write-ahead log). Runs once
+        per database; later calls return 0 without touching it.
+        """
+        conn = self._connection()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+            return 0
+        json_handler = DueDiligenceDataHandler(json_file)
+        try:
+            records = [record for record in json_handler.get_all_hospitals() if validate_hospital_data(record)]
+        finally:
+            json_handler.close()
+        with self._write() as conn:
+            # Another worker may have migrated while this one was reading the JSON
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_from'").fetchone():
+                return 0
+            self._upsert_many(conn, records)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (json_handler.data_file,))
+        logger.info(f"Migrated {len(records)} hospitals from {json_handler.data_file} into {self.db_file}")
+        return len(records)
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    source = sys.argv[1] if len(sys.argv) > 1 else "due_diligence_data.json"
+    target = sys.argv[2] if len(sys.argv) > 2 else "due_diligence.db"
+    repository = SQLiteDueDiligenceRepository(target)
+    count = repository.migrate_from_json(source)
+    logger.info(f"Imported {count} hospitals" if count else f"{target} was already migrated")
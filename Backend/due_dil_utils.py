@@ -1,161 +1,418 @@
 import json
+import logging
 import os
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from listing import ListingSpec
+
+logger = logging.getLogger(__name__)
+
+ACCREDITATIONS = ("jci", "nabh", "rohini")
+
+
+def hospital_data_error(data: Dict) -> Optional[str]:
+    """Describe the first problem with a hospital record's structure, or None if it is valid"""
+    required_fields = {
+        "hospital_info": ["ID", "HOSPITAL", "ADDRESS", "CATEGORY", "TIER", "INFRA_SCORE"],
+        "hospital_score": ["score"],
+        "financial_assessment": ["gst_status", "pan_status", "epfo_status"],
+        "negative_legal": ["blacklist", "pmjay_status", "legal_status"],
+        "accreditation_status": ["jci", "nabh", "rohini", "none"]
+    }
+
+    try:
+        for section, fields in required_fields.items():
+            if section not in data:
+                return f"Missing section: {section}"
+            for field in fields:
+                if field not in data[section]:
+                    return f"Missing field {field} in section {section}"
+                
+        # Validate nested structures
+        if not isinstance(data["negative_legal"]["blacklist"], dict):
+            return "Invalid blacklist structure"
+        if "count" not in data["negative_legal"]["blacklist"]:
+            return "Missing blacklist count"
+        if "severity" not in data["negative_legal"]["blacklist"]:
+            return "Missing blacklist severity"
+            
+        legal_status = data["negative_legal"]["legal_status"]
+        for case_type in ["criminal_case", "civil_case"]:
+            if case_type not in legal_status:
+                return f"Missing {case_type}"
+            if not isinstance(legal_status[case_type], dict):
+                return f"Invalid {case_type} structure"
+            if "status" not in legal_status[case_type]:
+                return f"Missing status in {case_type}"
+            if "details" not in legal_status[case_type]:
+                return f"Missing details in {case_type}"
+                
+        for cert in ["jci", "nabh", "rohini"]:
+            cert_data = data["accreditation_status"][cert]
+            if not isinstance(cert_data, dict):
+                return f"Invalid {cert} structure"
+            if "status" not in cert_data:
+                return f"Missing status in {cert}"
+            if "label" not in cert_data:
+                return f"Missing label in {cert}"
+                
+        return None
+    except Exception as e:
+        return f"Validation error: {e}"
+
+
+def validate_hospital_data(data: Dict) -> bool:
+    """Validate hospital data structure"""
+    error = hospital_data_error(data)
+    if error:
+        print(error)
+        return False
+    return True
+
+
+def parse_bulk_payload(body: bytes, ndjson: bool = False) -> Tuple[List[Tuple[int, Dict]], List[Dict]]:
+    """
+    Split a bulk upload (a JSON array, or one JSON object per line) into valid records
+    and per-record errors. Records keep their position in the upload so errors can
+    point back at them; blank NDJSON lines are skipped. Raises ValueError if a JSON
+    array body cannot be parsed at all.
+    """
+    if ndjson:
+        items = []
+        for index, line in enumerate(body.splitlines()):
+            if not line.strip():
+                continue
+            try:
+                items.append((index, json.loads(line)))
+            except json.JSONDecodeError as e:
+                items.append((index, e))
+    else:
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Body is not valid JSON: {e}")
+        if not isinstance(payload, list):
+            raise ValueError("Body must be a JSON array of hospital records")
+        items = list(enumerate(payload))
+
+    records, errors = [], []
+    for index, item in items:
+        if isinstance(item, json.JSONDecodeError):
+            error = f"Invalid JSON: {item}"
+        elif not isinstance(item, dict):
+            error = "Record must be a JSON object"
+        else:
+            error = hospital_data_error(item)
+        if error:
+            errors.append({"index": index, "error": error})
+        else:
+            records.append((index, item))
+    return records, errors
+
+
+def _file_fingerprint(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def is_accredited(record: Dict, accreditation: str) -> bool:
+    status = ((record.get("accreditation_status") or {}).get(accreditation) or {}).get("status")
+    return isinstance(status, str) and status.strip().lower() == "accredited"
+
+
+def address_parts(record: Dict) -> Tuple[Optional[str], Optional[str]]:
+    """City and state from an ADDRESS of the form '..., City, State - PIN'"""
+    address = str(record["hospital_info"].get("ADDRESS") or "")
+    parts = [part.strip() for part in address.rsplit(" - ", 1)[0].split(",") if part.strip()]
+    if len(parts) < 2:
+        return None, parts[0] if parts else None
+    return parts[-2], parts[-1]
+
+
+# Server-side listing: filters, rating range (INFRA_SCORE) and short projection names
+DUE_DILIGENCE_LISTING = ListingSpec(
+    id=lambda record: record["hospital_info"]["ID"],
+    filters={
+        "tier": lambda record: [record["hospital_info"].get("TIER")],
+        "category": lambda record: [record["hospital_info"].get("CATEGORY")],
+        "city": lambda record: [address_parts(record)[0]],
+        "state": lambda record: [address_parts(record)[1]],
+        "accreditation": lambda record: [name for name in ACCREDITATIONS if is_accredited(record, name)]
+    },
+    rating=lambda record: record["hospital_info"].get("INFRA_SCORE"),
+    aliases={
+        "id": "hospital_info.ID",
+        "name": "hospital_info.HOSPITAL",
+        "address": "hospital_info.ADDRESS",
+        "category": "hospital_info.CATEGORY",
+        "tier": "hospital_info.TIER",
+        "rating": "hospital_info.INFRA_SCORE",
+        "score": "hospital_score.score"
+    }
+)
+
 
 class DueDiligenceDataHandler:
-    def __init__(self, data_file: str = "due_diligence_data.json"):
+    """Due-diligence records held in memory and indexed by ID and case-folded name.
+
+    The JSON file is the base image; every add, update and delete is appended to a
+    write-ahead log next to it and fsynced, so a write costs one small append. On
+    start-up the log is replayed over the base image, and once it holds
+    ``compact_every`` entries it is folded into a new base image that replaces the
+    old one atomically. A torn final log line from a crash is discarded.
+
+    ``version`` is derived from the base image's and the log's inode, size and mtime,
+    so every worker process sees the same version, and a process reloads from disk
+    when another one has written since it last looked. Writes from several processes
+    are not serialized against each other; use the SQLite backend for those.
+    """
+
+    def __init__(self, data_file: str = "due_diligence_data.json", compact_every: Optional[int] = None):
         # Get the absolute path to the data file
         current_dir = os.path.dirname(os.path.abspath(__file__))
         self.data_file = os.path.join(current_dir, data_file)
-        print(f"Initializing DueDiligenceDataHandler with data file: {self.data_file}")
-        print(f"Current directory: {current_dir}")
-        print(f"File exists: {os.path.exists(self.data_file)}")
-        self.data = self._load_data()
-        print(f"Loaded {len(self.data)} hospitals")
-        if self.data:
-            print(f"Available hospital IDs: {[h['hospital_info']['ID'] for h in self.data]}")
-
-    def _load_data(self) -> List[Dict]:
-        """Load data from JSON file"""
+        self.wal_file = f"{self.data_file}.wal"
+        self.compact_every = compact_every or int(os.getenv("DUE_DILIGENCE_COMPACT_EVERY", "500"))
+        logger.info(f"Initializing DueDiligenceDataHandler with data file: {self.data_file}")
+        self._lock = threading.RLock()
+        self._records: Dict[str, Dict] = {}
+        self._name_index: Dict[str, List[str]] = {}
+        self._wal_entries = 0
+        self._load_data()
+        self._wal = open(self.wal_file, 'a', encoding='utf-8')
+        self._fingerprint = self._disk_fingerprint()
+        logger.info(f"Loaded {len(self._records)} hospitals")
+
+    @staticmethod
+    def _key(hospital_id) -> str:
+        return str(hospital_id)
+
+    @staticmethod
+    def _name_key(name) -> str:
+        return str(name).casefold()
+
+    def _index(self, record: Dict, replaces: Optional[str] = None) -> None:
+        """Insert a record, or replace an existing one (``replaces`` names its old ID when
+        the ID changes) in place, so listings keep their order across updates"""
+        key = self._key(record["hospital_info"]["ID"])
+        old_key = replaces if replaces is not None and replaces in self._records else key
+        previous = self._records.get(old_key)
+        name_key = self._name_key(record["hospital_info"]["HOSPITAL"])
+        if previous is None:
+            self._records[key] = record
+            self._name_index.setdefault(name_key, []).append(key)
+            return
+        if old_key == key:
+            self._records[key] = record
+        else:
+            self._records = {
+                (key if existing == old_key else existing): (record if existing == old_key else value)
+                for existing, value in self._records.items()
+            }
+        old_name_key = self._name_key(previous["hospital_info"]["HOSPITAL"])
+        if old_key != key or old_name_key != name_key:
+            keys = self._name_index.get(old_name_key, [])
+            if old_key in keys:
+                keys.remove(old_key)
+            if not keys:
+                self._name_index.pop(old_name_key, None)
+            self._name_index.setdefault(name_key, []).append(key)
+
+    def _unindex(self, key: str) -> Optional[Dict]:
+        record = self._records.pop(key, None)
+        if record is not None:
+            name_key = self._name_key(record["hospital_info"]["HOSPITAL"])
+            keys = self._name_index.get(name_key, [])
+            if key in keys:
+                keys.remove(key)
+            if not keys:
+                self._name_index.pop(name_key, None)
+        return record
+
+    def _load_data(self, truncate: bool = True) -> None:
+        """Load the base image and replay the write-ahead log over it"""
         try:
             with open(self.data_file, 'r') as f:
                 data = json.load(f)
-                print(f"Successfully loaded data from {self.data_file}")
-                return data
+            logger.info(f"Successfully loaded data from {self.data_file}")
         except FileNotFoundError:
-            print(f"Warning: {self.data_file} not found. Creating empty data file.")
-            self._save_data([])
-            return []
+            logger.warning(f"{self.data_file} not found. Creating empty data file.")
+            data = []
+            self._write_base(data)
         except json.JSONDecodeError:
-            print(f"Warning: {self.data_file} is invalid. Creating empty data file.")
-            self._save_data([])
-            return []
+            logger.warning(f"{self.data_file} is invalid. Creating empty data file.")
+            data = []
+            self._write_base(data)
+        for record in data:
+            self._index(record)
+        self._replay_wal(truncate)
 
-    def _save_data(self, data: List[Dict]) -> None:
-        """Save data to JSON file"""
-        try:
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
-                print(f"Successfully saved data to {self.data_file}")
-        except Exception as e:
-            print(f"Error saving data: {e}")
-            raise
+    def _disk_fingerprint(self) -> Tuple:
+        return _file_fingerprint(self.data_file), _file_fingerprint(self.wal_file)
+
+    @property
+    def version(self) -> Tuple:
+        """Changes with every write by any process, so cached responses never outlive it"""
+        self.refresh()
+        return self._fingerprint
+
+    def refresh(self) -> bool:
+        """Reload the base image and log if another process has written since this one
+        last looked; returns whether it reloaded"""
+        if self._disk_fingerprint() == self._fingerprint:
+            return False
+        with self._lock:
+            fingerprint = self._disk_fingerprint()
+            if fingerprint == self._fingerprint:
+                return False
+            self._records, self._name_index, self._wal_entries = {}, {}, 0
+            self._load_data(truncate=False)
+            self._fingerprint = fingerprint
+            logger.info(f"Reloaded {len(self._records)} hospitals written by another process")
+            return True
+
+    def _replay_wal(self, truncate: bool = True) -> None:
+        if not os.path.exists(self.wal_file):
+            return
+        valid_bytes = 0
+        with open(self.wal_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Torn append from a crash mid-write, or when refreshing, another process's
+                    # append still in progress; either way the operation has not completed
+                    if truncate:
+                        logger.warning(f"Discarding incomplete last entry in {self.wal_file}")
+                    break
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, KeyError, TypeError) as e:
+                    logger.error(f"Skipping unreadable entry in {self.wal_file}: {e}")
+                valid_bytes += len(line)
+                self._wal_entries += 1
+        if truncate and valid_bytes != os.path.getsize(self.wal_file):
+            os.truncate(self.wal_file, valid_bytes)
+        logger.info(f"Replayed {self._wal_entries} write-ahead log entries from {self.wal_file}")
+
+    def _apply(self, entry: Dict) -> None:
+        if entry["op"] == "put":
+            self._index(entry["record"], entry.get("replaces"))
+        elif entry["op"] == "delete":
+            self._unindex(self._key(entry["id"]))
+
+    def _write_base(self, data: List[Dict]) -> None:
+        """Write a new base image next to the old one and swap it in atomically"""
+        tmp_file = f"{self.data_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.data_file)
+
+    def _log(self, entries: List[Dict]) -> None:
+        """Durably append operations to the write-ahead log, then apply them in memory"""
+        if len(entries) >= self.compact_every:
+            # A batch this large would trigger compaction anyway; write the base image once instead
+            for entry in entries:
+                self._apply(entry)
+            self.compact()
+            return
+        self._wal.write("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries))
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        for entry in entries:
+            self._apply(entry)
+        self._wal_entries += len(entries)
+        if self._wal_entries >= self.compact_every:
+            self.compact()
+        else:
+            self._fingerprint = self._disk_fingerprint()
+
+    def compact(self) -> None:
+        """Fold the write-ahead log into a fresh base image and start a new log"""
+        with self._lock:
+            self._write_base(list(self._records.values()))
+            # Replaying the old log over the new base is harmless, so a crash here loses nothing
+            self._wal.truncate(0)
+            self._wal.flush()
+            os.fsync(self._wal.fileno())
+            logger.info(f"Compacted {self._wal_entries} log entries into {self.data_file}")
+            self._wal_entries = 0
+            self._fingerprint = self._disk_fingerprint()
+
+    def close(self) -> None:
+        with self._lock:
+            self._wal.close()
 
     def get_all_hospitals(self) -> List[Dict]:
         """Get all hospital data"""
-        return self.data
+        self.refresh()
+        with self._lock:
+            return list(self._records.values())
 
     def get_hospital_by_id(self, hospital_id: int) -> Optional[Dict]:
         """Get hospital data by ID"""
-        print(f"Searching for hospital with ID: {hospital_id}")
-        print(f"Available hospitals: {[h['hospital_info']['ID'] for h in self.data]}")
-        for hospital in self.data:
-            if str(hospital["hospital_info"]["ID"]) == str(hospital_id):
-                print(f"Found hospital with ID {hospital_id}")
-                return hospital
-        print(f"Hospital with ID {hospital_id} not found")
-        return None
+        self.refresh()
+        return self._records.get(self._key(hospital_id))
 
     def get_hospital_by_name(self, hospital_name: str) -> Optional[Dict]:
         """Get hospital data by name"""
-        for hospital in self.data:
-            if hospital["hospital_info"]["HOSPITAL"].lower() == hospital_name.lower():
-                return hospital
-        return None
+        self.refresh()
+        keys = self._name_index.get(self._name_key(hospital_name))
+        return self._records.get(keys[0]) if keys else None
 
     def add_hospital(self, hospital_data: Dict) -> bool:
         """Add new hospital data"""
-        if not self._validate_hospital_data(hospital_data):
-            return False
-        
-        # Check if hospital already exists
-        if self.get_hospital_by_id(hospital_data["hospital_info"]["ID"]):
+        if not validate_hospital_data(hospital_data):
             return False
 
-        self.data.append(hospital_data)
-        self._save_data(self.data)
+        with self._lock:
+            self.refresh()
+            # Check if hospital already exists
+            if self._key(hospital_data["hospital_info"]["ID"]) in self._records:
+                return False
+            self._log([{"op": "put", "record": hospital_data}])
         return True
 
     def update_hospital(self, hospital_id: int, hospital_data: Dict) -> bool:
         """Update existing hospital data"""
-        if not self._validate_hospital_data(hospital_data):
+        if not validate_hospital_data(hospital_data):
             return False
 
-        for i, hospital in enumerate(self.data):
-            if hospital["hospital_info"]["ID"] == hospital_id:
-                self.data[i] = hospital_data
-                self._save_data(self.data)
-                return True
-        return False
+        with self._lock:
+            self.refresh()
+            key = self._key(hospital_id)
+            if key not in self._records:
+                return False
+            entry = {"op": "put", "record": hospital_data}
+            new_key = self._key(hospital_data["hospital_info"]["ID"])
+            if new_key != key:
+                # Re-keying onto another hospital's ID would silently overwrite it
+                if new_key in self._records:
+                    return False
+                entry["replaces"] = key
+            self._log([entry])
+        return True
+
+    def bulk_upsert(self, records: List[Dict]) -> Dict[str, int]:
+        """Insert or replace many validated records with a single durable write"""
+        with self._lock:
+            self.refresh()
+            unique = {self._key(record["hospital_info"]["ID"]): record for record in records}
+            updated = sum(1 for key in unique if key in self._records)
+            if unique:
+                self._log([{"op": "put", "record": record} for record in unique.values()])
+        return {"inserted": len(unique) - updated, "updated": updated}
 
     def delete_hospital(self, hospital_id: int) -> bool:
         """Delete hospital data"""
-        for i, hospital in enumerate(self.data):
-            if hospital["hospital_info"]["ID"] == hospital_id:
-                del self.data[i]
-                self._save_data(self.data)
-                return True
-        return False
-
-    def _validate_hospital_data(self, data: Dict) -> bool:
-        """Validate hospital data structure"""
-        required_fields = {
-            "hospital_info": ["ID", "HOSPITAL", "ADDRESS", "CATEGORY", "TIER", "INFRA_SCORE"],
-            "hospital_score": ["score"],
-            "financial_assessment": ["gst_status", "pan_status", "epfo_status"],
-            "negative_legal": ["blacklist", "pmjay_status", "legal_status"],
-            "accreditation_status": ["jci", "nabh", "rohini", "none"]
-        }
-
-        try:
-            for section, fields in required_fields.items():
-                if section not in data:
-                    print(f"Missing section: {section}")
-                    return False
-                for field in fields:
-                    if field not in data[section]:
-                        print(f"Missing field {field} in section {section}")
-                        return False
-                    
-            # Validate nested structures
-            if not isinstance(data["negative_legal"]["blacklist"], dict):
-                print("Invalid blacklist structure")
-                return False
-            if "count" not in data["negative_legal"]["blacklist"]:
-                print("Missing blacklist count")
+        with self._lock:
+            self.refresh()
+            key = self._key(hospital_id)
+            if key not in self._records:
                 return False
-            if "severity" not in data["negative_legal"]["blacklist"]:
-                print("Missing blacklist severity")
-                return False
-                
-            legal_status = data["negative_legal"]["legal_status"]
-            for case_type in ["criminal_case", "civil_case"]:
-                if case_type not in legal_status:
-                    print(f"Missing {case_type}")
-                    return False
-                if not isinstance(legal_status[case_type], dict):
-                    print(f"Invalid {case_type} structure")
-                    return False
-                if "status" not in legal_status[case_type]:
-                    print(f"Missing status in {case_type}")
-                    return False
-                if "details" not in legal_status[case_type]:
-                    print(f"Missing details in {case_type}")
-                    return False
-                    
-            for cert in ["jci", "nabh", "rohini"]:
-                cert_data = data["accreditation_status"][cert]
-                if not isinstance(cert_data, dict):
-                    print(f"Invalid {cert} structure")
-                    return False
-                if "status" not in cert_data:
-                    print(f"Missing status in {cert}")
-                    return False
-                if "label" not in cert_data:
-                    print(f"Missing label in {cert}")
-                    return False
-                    
-            return True
-        except Exception as e:
-            print(f"Validation error: {e}")
-            return False 
\ No newline at end of file
+            self._log([{"op": "delete", "id": key}])
+        return True
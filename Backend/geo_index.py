@@ -0,0 +1,143 @@
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.195
+# Most neighbours a single nearest-hospital query returns
+MAX_NEIGHBOURS = 100
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points, all in degrees"""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoIndex:
+    """Nearest-hospital lookups over a uniform lat/lng grid, using only NumPy.
+
+    Points are sorted by grid cell so each cell is a contiguous slice. A radius query
+    gathers the cells that can intersect the search circle and ranks the candidates
+    by exact haversine distance.
+    """
+
+    def __init__(self, ids: List[str], names: List[str], types: List[str],
+                 lats: List[float], lngs: List[float], cell_km: float = 5.0):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        rows = np.floor(lats / self.cell_deg).astype(np.int64)
+        cols = np.floor(lngs / self.cell_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+
+        self.ids = np.asarray(ids, dtype=object)[order]
+        self.names = np.asarray(names, dtype=object)[order]
+        self.types = np.asarray(types, dtype=object)[order]
+        self.lats = lats[order]
+        self.lngs = lngs[order]
+        self.positions = {hospital_id: i for i, hospital_id in enumerate(self.ids.tolist())}
+
+        self.cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        rows, cols = rows[order].tolist(), cols[order].tolist()
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or (rows[i], cols[i]) != (rows[start], cols[start]):
+                self.cells[(rows[start], cols[start])] = (start, i)
+                start = i
+        logger.info(f"Built geo index over {len(self.ids)} hospitals in {len(self.cells)} cells")
+
+    @classmethod
+    def from_hospitals(cls, hospitals: List[Dict], cell_km: float = 5.0) -> "GeoIndex":
+        """Build from hospital profiling records, skipping those without coordinates"""
+        ids, names, types, lats, lngs = [], [], [], [], []
+        for hospital in hospitals:
+            coordinates = (hospital.get('location') or {}).get('coordinates') or {}
+            lat, lng = coordinates.get('lat'), coordinates.get('lng')
+            if lat is None or lng is None:
+                continue
+            ids.append(str(hospital['id']))
+            names.append(hospital.get('name'))
+            types.append((hospital.get('details') or {}).get('type'))
+            lats.append(float(lat))
+            lngs.append(float(lng))
+        return cls(ids, names, types, lats, lngs, cell_km=cell_km)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, hospital_id) -> bool:
+        return str(hospital_id) in self.positions
+
+    def _candidates(self, lat: float, lng: float, radius_km: Optional[float]) -> np.ndarray:
+        if radius_km is None:
+            return np.arange(len(self.ids))
+        row, col = math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+        row_span = math.ceil(radius_km / (self.cell_deg * KM_PER_DEGREE))
+        # Longitude degrees shrink towards the poles, so widen the column span accordingly
+        cos_lat = max(math.cos(math.radians(min(abs(lat) + radius_km / KM_PER_DEGREE, 89.9))), 1e-6)
+        col_span = math.ceil(radius_km / (self.cell_deg * KM_PER_DEGREE * cos_lat))
+        if (2 * row_span + 1) * (2 * col_span + 1) > len(self.cells):
+            ranges = list(self.cells.values())
+        else:
+            ranges = [
+                self.cells[(r, c)]
+                for r in range(row - row_span, row + row_span + 1)
+                for c in range(col - col_span, col + col_span + 1)
+                if (r, c) in self.cells
+            ]
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, stop) for start, stop in ranges])
+
+    def nearest(self, lat: float, lng: float, k: int = 5, radius_km: Optional[float] = None,
+                hosp_type: Optional[str] = None, exclude_id: Optional[str] = None) -> List[Dict]:
+        """Return up to k hospitals closest to a point, optionally within radius_km and of one type"""
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        candidates = self._candidates(lat, lng, radius_km)
+        if hosp_type is not None and len(candidates):
+            candidates = candidates[self.types[candidates] == hosp_type]
+        if exclude_id is not None and str(exclude_id) in self.positions:
+            candidates = candidates[candidates != self.positions[str(exclude_id)]]
+        if not len(candidates):
+            return []
+
+        distances = haversine_km(lat, lng, self.lats[candidates], self.lngs[candidates])
+        if radius_km is not None:
+            within = distances <= radius_km
+            candidates, distances = candidates[within], distances[within]
+        if len(candidates) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            candidates, distances = candidates[top], distances[top]
+        order = np.argsort(distances, kind='stable')
+        return [
+            {
+                'id': self.ids[i],
+                'name': self.names[i],
+                'type': self.types[i],
+                'distance_km': float(distance)
+            }
+            for i, distance in zip(candidates[order].tolist(), distances[order].tolist())
+        ]
+
+    def nearest_to(self, hospital_id, k: int = 5, radius_km: Optional[float] = None,
+                   same_type: bool = True) -> Optional[List[Dict]]:
+        """Nearest neighbours of an indexed hospital, or None if it has no coordinates"""
+        position = self.positions.get(str(hospital_id))
+        if position is None:
+            return None
+        return self.nearest(
+            self.lats[position],
+            self.lngs[position],
+            k=k,
+            radius_km=radius_km,
+            hosp_type=self.types[position] if same_type else None,
+            exclude_id=str(hospital_id)
+        )
@@ -1,16 +1,65 @@
 import json
 import logging
+import mmap
+import os
+import shutil
+
+from listing import ListingSpec
+from profile_search import ProfileSearchIndex
+
+# Bulky per-hospital fields that lazy mode keeps on disk and decodes on demand
+LAZY_FIELDS = ('doctors', 'photos')
+SIDECAR_FORMAT_VERSION = 1
+
+# Server-side listing: filters, rating range and short projection names
+PROFILING_LISTING = ListingSpec(
+    id=lambda hospital: hospital['id'],
+    filters={
+        'city': lambda hospital: [(hospital.get('location') or {}).get('city')],
+        'state': lambda hospital: [(hospital.get('location') or {}).get('state')],
+        'type': lambda hospital: [(hospital.get('details') or {}).get('type')],
+        'accreditation': lambda hospital: hospital.get('accreditationStatus') or [],
+        'network_status': lambda hospital: [(hospital.get('networkStatus') or {}).get('status')]
+    },
+    rating=lambda hospital: hospital.get('rating'),
+    aliases={
+        'city': 'location.city',
+        'state': 'location.state',
+        'pincode': 'location.pincode',
+        'type': 'details.type',
+        'beds': 'details.beds'
+    }
+)
 
 class HospitalProfilingDataHandler:
-    def __init__(self, data_path):
+    """Hospital profiles indexed by ID.
+
+    In lazy mode (``lazy=True`` or HOSPITAL_PROFILING_LAZY=true) only a summary of
+    each hospital stays in memory. The LAZY_FIELDS are written once to a sidecar
+    next to the JSON file, one line per hospital, and read back through a memory
+    map by byte offset when a full profile is requested.
+    """
+
+    def __init__(self, data_path, lazy=None):
         self.data_path = data_path
+        if lazy is None:
+            lazy = os.getenv("HOSPITAL_PROFILING_LAZY", "false").lower() == "true"
+        self.lazy = lazy
+        self.version = 0
+        self._offsets = {}
+        self._sidecar = None
         self.data = self.load_data()
+        self._by_id = {h['id']: h for h in self.data}
+        self.search_index = ProfileSearchIndex(self.iter_hospitals())
 
     def load_data(self):
         try:
+            if self.lazy:
+                return self._load_lazy()
             with open(self.data_path, 'r') as file:
                 data = json.load(file)
             logging.info(f"Loaded hospital profiling data with {len(data['hospitals'])} hospitals")
+            self.version += 1
             return data['hospitals']
         except FileNotFoundError:
             logging.error(f"JSON file not found at path: {self.data_path}")
@@ -22,17 +71,105 @@ class HospitalProfilingDataHandler:
             logging.error(f"Error loading hospital profiling data: {e}")
             return []
 
+    @property
+    def sidecar_dir(self):
+        return os.path.splitext(self.data_path)[0] + ".profiles"
+
+    def _source_fingerprint(self):
+        stat = os.stat(self.data_path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _write_sidecar(self):
+        """Split the JSON file into resident summaries and an on-disk file of the lazy fields"""
+        with open(self.data_path, 'r') as file:
+            hospitals = json.load(file)['hospitals']
+        tmp_dir = f"{self.sidecar_dir}.tmp-{os.getpid()}"
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+
+        summaries, offsets, offset = [], [], 0
+        with open(os.path.join(tmp_dir, "records.jsonl"), 'wb') as records:
+            for hospital in hospitals:
+                line = json.dumps({field: hospital[field] for field in LAZY_FIELDS if field in hospital},
+                                  separators=(",", ":")).encode("utf-8") + b"\n"
+                records.write(line)
+                summaries.append({key: value for key, value in hospital.items() if key not in LAZY_FIELDS})
+                offsets.append([offset, len(line)])
+                offset += len(line)
+        with open(os.path.join(tmp_dir, "manifest.json"), 'w') as manifest:
+            json.dump({
+                "format_version": SIDECAR_FORMAT_VERSION,
+                "source": self._source_fingerprint(),
+                "summaries": summaries,
+                "offsets": offsets
+            }, manifest)
+
+        # Swap the finished directory into place so readers never see a partial sidecar
+        old_dir = None
+        if os.path.exists(self.sidecar_dir):
+            old_dir = f"{self.sidecar_dir}.old-{os.getpid()}"
+            os.rename(self.sidecar_dir, old_dir)
+        os.rename(tmp_dir, self.sidecar_dir)
+        if old_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+        logging.info(f"Wrote hospital profiling sidecar for {len(summaries)} hospitals to {self.sidecar_dir}")
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.sidecar_dir, "manifest.json"), 'r') as manifest:
+                return json.load(manifest)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _load_lazy(self):
+        manifest = self._read_manifest()
+        if (manifest is None or manifest.get("format_version") != SIDECAR_FORMAT_VERSION
+                or manifest.get("source") != self._source_fingerprint()):
+            self._write_sidecar()
+            manifest = self._read_manifest()
+        summaries = manifest["summaries"]
+        self._offsets = {summary['id']: tuple(offset) for summary, offset in zip(summaries, manifest["offsets"])}
+        with open(os.path.join(self.sidecar_dir, "records.jsonl"), 'rb') as records:
+            self._sidecar = mmap.mmap(records.fileno(), 0, access=mmap.ACCESS_READ) if summaries else None
+        logging.info(f"Loaded {len(summaries)} hospital profile summaries from {self.sidecar_dir}")
+        self.version += 1
+        return summaries
+
+    def materialize(self, summary):
+        """Full profile for a summary, decoding its lazy fields from the sidecar"""
+        if not self.lazy:
+            return summary
+        offset, length = self._offsets[summary['id']]
+        return {**summary, **json.loads(self._sidecar[offset:offset + length])}
+
+    def iter_hospitals(self):
+        """Full profiles one at a time, so lazy mode never holds them all at once"""
+        for summary in self.data:
+            yield self.materialize(summary)
+
+    def get_hospital_summaries(self):
+        """Resident records: full profiles, or summaries without LAZY_FIELDS in lazy mode"""
+        return self.data
+
     def get_hospital_by_id(self, hospital_id):
         try:
-            hospital = next((h for h in self.data if h['id'] == hospital_id), None)
-            return hospital
+            hospital = self._by_id.get(hospital_id)
+            return self.materialize(hospital) if hospital is not None else None
         except Exception as e:
             logging.error(f"Error fetching hospital by ID: {e}")
             return None
 
+    def search(self, query, limit=10, prefix=True):
+        try:
+            return self.search_index.search(query, limit=limit, prefix=prefix)
+        except Exception as e:
+            logging.error(f"Error searching hospital profiles: {e}")
+            return []
+
     def get_all_hospitals(self):
         try:
-            return self.data
+            return self.data if not self.lazy else list(self.iter_hospitals())
         except Exception as e:
             logging.error(f"Error fetching all hospitals: {e}")
-            return []
\ No newline at end of file
+            return []
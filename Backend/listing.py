@@ -0,0 +1,168 @@
+import base64
+import bisect
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class ListingSpec(NamedTuple):
+    """How to list one kind of record: its ID, filterable fields and projection aliases"""
+    id: Callable[[Dict], Any]
+    # Filter name -> values of a record (several for multi-valued fields such as accreditations)
+    filters: Dict[str, Callable[[Dict], Iterable]]
+    rating: Callable[[Dict], Optional[float]]
+    # Short projection names -> dotted paths into the record
+    aliases: Dict[str, str]
+
+
+def natural_key(value) -> Tuple:
+    """Sort numeric IDs numerically and everything else as text"""
+    text = str(value)
+    return (0, int(text), "") if text.isdigit() else (1, 0, text)
+
+
+def encode_cursor(key: Tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (int(key[0]), int(key[1]), str(key[2]))
+    except (ValueError, TypeError, IndexError):
+        raise ValueError("Invalid cursor")
+
+
+def _lookup(record: Dict, path: str):
+    value = record
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ListingIndex:
+    """Precomputed filter indexes over a snapshot of records, ordered by natural ID.
+
+    Each filter field maps case-folded values to the set of matching positions, and
+    ratings are kept sorted for range queries, so a query only touches matching
+    records. Cursors carry the sort key of the last record returned, which keeps
+    pages stable when records are added or removed in between.
+    """
+
+    def __init__(self, records: List[Dict], spec: ListingSpec):
+        self.spec = spec
+        keyed = sorted(((natural_key(spec.id(record)), record) for record in records), key=lambda item: item[0])
+        self.keys = [key for key, _ in keyed]
+        self.records = [record for _, record in keyed]
+        self.filters: Dict[str, Dict[str, set]] = {name: {} for name in spec.filters}
+        ratings = []
+        for position, record in enumerate(self.records):
+            for name, values_of in spec.filters.items():
+                for value in values_of(record) or ():
+                    if value is not None and str(value).strip():
+                        self.filters[name].setdefault(str(value).strip().casefold(), set()).add(position)
+            rating = _as_float(spec.rating(record))
+            if rating is not None:
+                ratings.append((rating, position))
+        ratings.sort()
+        self.rating_values = [rating for rating, _ in ratings]
+        self.rating_positions = [position for _, position in ratings]
+
+    def _matching(self, filters: Dict[str, Optional[str]], min_rating: Optional[float],
+                  max_rating: Optional[float]) -> Optional[set]:
+        """Positions matching every filter, or None when nothing is filtered"""
+        candidates = []
+        for name, requested in filters.items():
+            if requested is None:
+                continue
+            index = self.filters[name]
+            # A comma-separated value matches any of its parts
+            candidates.append(set().union(*(
+                index.get(value.strip().casefold(), set()) for value in requested.split(",") if value.strip()
+            )))
+        if min_rating is not None or max_rating is not None:
+            lo = 0 if min_rating is None else bisect.bisect_left(self.rating_values, min_rating)
+            hi = len(self.rating_values) if max_rating is None else bisect.bisect_right(self.rating_values, max_rating)
+            candidates.append(set(self.rating_positions[lo:hi]))
+        if not candidates:
+            return None
+        candidates.sort(key=len)
+        return candidates[0].intersection(*candidates[1:])
+
+    def project(self, record: Dict, fields: Optional[List[str]]) -> Dict:
+        if not fields:
+            return record
+        return {field: _lookup(record, self.spec.aliases.get(field, field)) for field in fields}
+
+    def query(self, filters: Dict[str, Optional[str]], min_rating: Optional[float] = None,
+              max_rating: Optional[float] = None, fields: Optional[List[str]] = None,
+              cursor: Optional[str] = None, limit: Optional[int] = None,
+              load: Optional[Callable[[Dict], Dict]] = None) -> Dict:
+        """
+        One page of matching records as {items, next_cursor, total}; raises ValueError on
+        bad input. ``load`` expands an indexed record into the full one before projection,
+        for stores that only keep summaries in memory.
+        """
+        unknown = [name for name in filters if name not in self.filters]
+        if unknown:
+            raise ValueError(f"Unknown filters: {unknown}")
+        limit = min(max(1, limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+        start = bisect.bisect_right(self.keys, decode_cursor(cursor)) if cursor else 0
+
+        matching = self._matching(filters, min_rating, max_rating)
+        if matching is None:
+            total = len(self.records)
+            page = list(range(start, min(start + limit + 1, total)))
+        else:
+            total = len(matching)
+            page = sorted(position for position in matching if position >= start)[:limit + 1]
+
+        next_cursor = encode_cursor(self.keys[page[limit - 1]]) if len(page) > limit else None
+        return {
+            "items": [
+                self.project(load(self.records[position]) if load else self.records[position], fields)
+                for position in page[:limit]
+            ],
+            "next_cursor": next_cursor,
+            "total": total
+        }
+
+
+class VersionedListing:
+    """Keeps one ListingIndex per data version, rebuilding it after the data changes"""
+
+    def __init__(self, spec: ListingSpec):
+        self.spec = spec
+        self._lock = threading.Lock()
+        self._version = None
+        self._index: Optional[ListingIndex] = None
+
+    def get(self, version, records: Callable[[], List[Dict]]) -> ListingIndex:
+        with self._lock:
+            if self._index is None or self._version != version:
+                self._index = ListingIndex(records(), self.spec)
+                self._version = version
+                logger.info(f"Built listing index over {len(self._index.records)} records (version {version})")
+            return self._index
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
@@ -1,12 +1,25 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
+from fastapi.responses import FileResponse, RedirectResponse, JSONResponse, Response
 import pandas as pd
 import numpy as np
-from utils import analyze_hospital_claims
-from due_dil_utils import DueDiligenceDataHandler
-from hospital_profiling import HospitalProfilingDataHandler
+from utils import ANALYSIS_SECTIONS
+from claims_reload import ClaimsReloader
+from claims_aggregates import batch_format_for, parse_claims_batch
+from due_dil_utils import DUE_DILIGENCE_LISTING, DueDiligenceDataHandler, parse_bulk_payload
+from due_dil_sqlite import SQLiteDueDiligenceRepository
+from hospital_profiling import PROFILING_LISTING, HospitalProfilingDataHandler
+from listing import VersionedListing, parse_fields
+from geo_index import MAX_NEIGHBOURS, GeoIndex
+from serializers import DataFrameJSONResponse
+from response_cache import ResponseCache, cached_response
+from singleflight import SingleFlight
+from worker_pool import PoolSaturatedError, WorkerPool
+from admission import AdmissionController, AdmissionRejected
+import analytics_worker
+from analytics_worker import claims_analysis_body, claims_batch_body
+import asyncio
 import logging
 import os
 import socket
@@ -17,6 +30,7 @@ from dotenv import load_dotenv
 from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
 from fastapi import BackgroundTasks
 from pydantic import BaseModel, EmailStr
+from typing import List, Optional
 
 # Load environment variables from .env file
 load_dotenv()
@@ -27,12 +41,31 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
-# Initialize DueDiligenceDataHandler
-due_dil_handler = DueDiligenceDataHandler()
+# Initialize the due-diligence store. DUE_DILIGENCE_BACKEND=sqlite shares one database across
+# workers; on first use it imports the existing JSON records.
+if os.getenv("DUE_DILIGENCE_BACKEND", "json").lower() == "sqlite":
+    due_dil_handler = SQLiteDueDiligenceRepository(
+        os.getenv("DUE_DILIGENCE_DB", "due_diligence.db"),
+        import_from="due_diligence_data.json"
+    )
+else:
+    due_dil_handler = DueDiligenceDataHandler()
 
 # Initialize HospitalProfilingDataHandler
 hospital_profiling_handler = HospitalProfilingDataHandler("hospital_profiling_data.json")
 
+# Spatial index over the profiled hospitals' coordinates
+geo_index = GeoIndex.from_hospitals(hospital_profiling_handler.get_hospital_summaries())
+
+# Rendered responses keyed by endpoint, parameters and data version, served with ETags
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+)
+
+# Concurrent identical analytics requests wait on one computation instead of repeating it
+analytics_flight = SingleFlight()
+
 # --- SSO LOGIC  ---
 from fastapi import Depends
 import json
@@ -217,16 +250,47 @@ try:
         else:
             raise FileNotFoundError(f"Excel file not found at either {excel_path} or {alternative_path}")
     
-    df = pd.read_excel(excel_path)
-    logger.info(f"Successfully loaded Excel file with shape: {df.shape}")
-    logger.info(f"DataFrame columns: {df.columns.tolist()}")
-    logger.info(f"Available Partner IDs: {df['PARTNER_ID'].unique().tolist()}")
-    
-    # Verify required columns
-    required_columns = ['PARTNER_ID', 'HOSPITAL', 'HOSP_TYPE', 'CITY', 'STATE', 'PIN']
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        raise ValueError(f"Missing required columns in Excel file: {missing_columns}")
+    # Reads the columnar snapshot next to the workbook, rebuilding it when the workbook changes.
+    # With CLAIMS_SHARED_DATASET every worker attaches to the same memory-mapped snapshot.
+    # CLAIMS_CUBE materializes every partner's claims-analysis sections up front.
+    # The reloader swaps in a rebuilt dataset under a new version without a restart.
+    claims_reloader = ClaimsReloader(
+        excel_path,
+        use_snapshot=os.getenv("CLAIMS_SNAPSHOT", "true").lower() == "true",
+        shared=os.getenv("CLAIMS_SHARED_DATASET", "false").lower() == "true",
+        use_cube=os.getenv("CLAIMS_CUBE", "false").lower() == "true",
+        verify_cube=os.getenv("CLAIMS_CUBE_VERIFY", "false").lower() == "true",
+        # CLAIMS_INCREMENTAL serves claims analysis from aggregates that ingested batches update in place
+        incremental=os.getenv("CLAIMS_INCREMENTAL", "false").lower() == "true"
+    )
+    claims_dataset = claims_reloader.current
+
+    # CPU-bound analytics run on a bounded pool so the event loop stays free for other requests.
+    # ANALYTICS_POOL=process gives each worker its own copy of the indexes over the shared snapshot.
+    analytics_pool_kind = os.getenv("ANALYTICS_POOL", "thread").lower()
+    if claims_reloader.incremental and analytics_pool_kind == "process":
+        # Ingested batches only reach the aggregates held by this process
+        logger.warning("CLAIMS_INCREMENTAL keeps its aggregates in the API process; using a thread pool")
+        analytics_pool_kind = "thread"
+    analytics_worker.configure(claims_dataset.store, geo_index, claims_dataset.cube, claims_dataset.aggregates)
+    analytics_pool = WorkerPool(
+        analytics_pool_kind,
+        max_workers=int(os.getenv("ANALYTICS_POOL_SIZE", "0")) or None,
+        queue_depth=int(os.getenv("ANALYTICS_QUEUE_DEPTH", "32")),
+        initializer=analytics_worker.init_worker if analytics_pool_kind == "process" else None,
+        initargs=(excel_path, os.path.abspath(hospital_profiling_handler.data_path), claims_dataset.cube is not None),
+        name="analytics"
+    )
+
+    def on_claims_reloaded(dataset):
+        # Thread workers share these objects; process workers catch up when a task carries the new version
+        analytics_worker.configure(dataset.store, geo_index, dataset.cube, dataset.aggregates)
+        response_cache.invalidate("claims-analysis")
+
+    claims_reloader.listeners.append(on_claims_reloaded)
+    # CLAIMS_WATCH polls the workbook and reloads it once a change has settled
+    if os.getenv("CLAIMS_WATCH", "false").lower() == "true":
+        claims_reloader.watch(float(os.getenv("CLAIMS_WATCH_INTERVAL", "5")))
     
 except FileNotFoundError as e:
     logging.error(f"File not found error: {e}")
@@ -238,6 +302,70 @@ except Exception as e:
     logging.error(f"Error loading dataset: {e}")
     raise
 
+# Claim batches are folded in one at a time
+claims_ingest_pool = WorkerPool("thread", max_workers=1, queue_depth=int(os.getenv("CLAIMS_INGEST_QUEUE_DEPTH", "8")),
+                                name="claims-ingest")
+
+# Due-diligence writes go through one thread so file saves never block the event loop or interleave
+due_dil_pool = WorkerPool("thread", max_workers=1, queue_depth=int(os.getenv("DUE_DILIGENCE_QUEUE_DEPTH", "64")),
+                          name="due-diligence")
+
+# Per-route admission limits for the expensive endpoints; requests beyond them are shed with 503
+admission_controllers = {
+    "claims-analysis": AdmissionController.from_env(
+        "claims-analysis", "CLAIMS_ANALYSIS", max_in_flight=analytics_pool.max_workers, max_queue=16, queue_timeout=2.0
+    ),
+    "claims-batch": AdmissionController.from_env(
+        "claims-batch", "CLAIMS_BATCH", max_in_flight=max(1, analytics_pool.max_workers // 2), max_queue=4,
+        queue_timeout=5.0
+    )
+}
+
+async def run_offloaded(pool, fn, *args):
+    """Run blocking work on a worker pool, answering 503 when the pool is saturated"""
+    try:
+        return await pool.run(fn, *args)
+    except PoolSaturatedError as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail="Server is busy, please retry shortly",
+                            headers={"Retry-After": "1"})
+
+async def run_admitted(route, pool, fn, *args):
+    """Run work on a pool once the route's admission controller lets it in"""
+    controller = admission_controllers[route]
+    try:
+        admitted_at = await controller.acquire()
+    except AdmissionRejected as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail="Server is busy, please retry shortly",
+                            headers={"Retry-After": str(e.retry_after)})
+    try:
+        return await run_offloaded(pool, fn, *args)
+    finally:
+        controller.release(admitted_at)
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    claims_reloader.stop()
+    analytics_pool.shutdown(wait=False)
+    claims_ingest_pool.shutdown(wait=False)
+    due_dil_pool.shutdown(wait=False)
+
+# Filter indexes for the hospital listings, rebuilt whenever the underlying data version changes
+due_dil_listing = VersionedListing(DUE_DILIGENCE_LISTING)
+profiling_listing = VersionedListing(PROFILING_LISTING)
+
+def listing_page(listing, version, records, filters, min_rating, max_rating, fields, cursor, limit, load=None):
+    """One filtered, projected page of a hospital listing"""
+    try:
+        page = listing.get(version, records).query(
+            filters, min_rating=min_rating, max_rating=max_rating, fields=parse_fields(fields), cursor=cursor,
+            limit=limit, load=load
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(content=page)
+
 # Add test endpoint
 @app.get("/api/test")
 async def test_endpoint():
@@ -247,47 +375,45 @@ async def test_endpoint():
         "message": "API is working"
     }
 
-@app.get("/api/claims-analysis/{partner_id}")
-async def claims_analysis(partner_id: int):
+def parse_sections(sections):
+    """Validate requested claims-analysis sections, accepting a list or a comma-separated string"""
+    if sections is None:
+        return None
+    if isinstance(sections, str):
+        sections = [section.strip() for section in sections.split(",") if section.strip()]
+    unknown_sections = [section for section in sections if section not in ANALYSIS_SECTIONS]
+    if unknown_sections:
+        raise HTTPException(status_code=400, detail=f"Unknown sections: {unknown_sections}")
+    return sections
+
+@app.get("/api/claims-analysis/{partner_id}", response_class=DataFrameJSONResponse)
+async def claims_analysis(partner_id: int, request: Request, sections: Optional[str] = None):
     print(f"/api/claims-analysis/{partner_id} endpoint hit")
     try:
-        if df is None:
+        requested_sections = parse_sections(sections)
+        # The whole request works against the dataset version current when it arrived
+        dataset = claims_reloader.current
+        if dataset is None:
             raise HTTPException(status_code=500, detail="Dataset not loaded")
             
         logger.info(f"Received request for partner_id: {partner_id}")
         
-        if 'PARTNER_ID' not in df.columns:
-            raise HTTPException(status_code=500, detail="PARTNER_ID column not found in dataset")
-
-        available_ids = df['PARTNER_ID'].unique().tolist()
-        logger.debug(f"Available Partner IDs: {available_ids}")
-
-        if partner_id not in available_ids:
+        if partner_id not in dataset:
             raise HTTPException(
                 status_code=404,
                 detail=f"Hospital with Partner ID {partner_id} not found"
             )
 
-        partner_data = df[df['PARTNER_ID'] == partner_id]
-        logger.debug(f"Found {len(partner_data)} records for partner_id {partner_id}")
-        
-        results = analyze_hospital_claims(df, partner_id)
-        
-        hospital_data = partner_data.iloc[0]
-        hospital_info = {
-            'HOSPITAL': str(hospital_data['HOSPITAL']),
-            'TIER': str(hospital_data['HOSP_TYPE']),
-            'CATEGORY': 'Multi-Specialty',
-            'ADDRESS': f"{str(hospital_data['CITY'])}, {str(hospital_data['STATE'])} - {str(hospital_data['PIN'])}",
-            'INFRA_SCORE': round(float(np.random.uniform(3.5, 5.0)), 1)
-        }
-        
-        response = {
-            'hospital_info': hospital_info,
-            **{key: handle_nan_values(value.to_dict(orient="records")) for key, value in results.items()}
-        }
-        
-        return response
+        async def build():
+            body = await run_admitted("claims-analysis", analytics_pool, claims_analysis_body, partner_id,
+                                      requested_sections, dataset.version)
+            return Response(content=body, media_type="application/json")
+
+        sections_key = tuple(requested_sections) if requested_sections is not None else None
+        return await cached_response(
+            response_cache, request, "claims-analysis", (partner_id, sections_key), dataset.version,
+            build, flight=analytics_flight
+        )
         
     except HTTPException as he:
         logger.error(f"HTTP Exception: {he.detail}")
@@ -298,15 +424,79 @@ async def claims_analysis(partner_id: int):
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Add due diligence endpoints
+class ClaimsBatchRequest(BaseModel):
+    partner_ids: List[int]
+    sections: Optional[List[str]] = None
+
+@app.post("/api/claims-analysis/batch", response_class=DataFrameJSONResponse)
+async def claims_analysis_batch(request: ClaimsBatchRequest):
+    print(f"/api/claims-analysis/batch endpoint hit for {len(request.partner_ids)} partners")
+    try:
+        requested_sections = parse_sections(request.sections)
+
+        body = await run_admitted("claims-batch", analytics_pool, claims_batch_body, request.partner_ids,
+                                  requested_sections, claims_reloader.current.version)
+        return Response(content=body, media_type="application/json")
+    except HTTPException as he:
+        logger.error(f"HTTP Exception: {he.detail}")
+        raise he
+    except Exception as e:
+        logger.error(f"Error processing batch claims analysis: {str(e)}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/claims/ingest")
+async def ingest_claims(request: Request):
+    print("/api/claims/ingest endpoint hit")
+    """Append a batch of claim rows from a CSV, NDJSON or JSON array body to the incremental aggregates"""
+    try:
+        if not claims_reloader.incremental:
+            raise HTTPException(status_code=400, detail="Claims ingestion is disabled, set CLAIMS_INCREMENTAL=true")
+        body = await request.body()
+        batch_format = batch_format_for(request.headers.get("content-type", ""))
+        try:
+            batch = await run_offloaded(claims_ingest_pool, parse_claims_batch, body, batch_format)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            return await run_offloaded(claims_ingest_pool, claims_reloader.ingest, batch)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error ingesting claims batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/due-diligence/hospitals")
-async def get_all_hospitals():
+async def get_all_hospitals(request: Request, tier: Optional[str] = None, category: Optional[str] = None,
+                            city: Optional[str] = None, state: Optional[str] = None,
+                            accreditation: Optional[str] = None, min_rating: Optional[float] = None,
+                            max_rating: Optional[float] = None, fields: Optional[str] = None,
+                            cursor: Optional[str] = None, limit: Optional[int] = None):
     print("/api/due-diligence/hospitals endpoint hit")
-    """Get all hospital due diligence data"""
+    """Get all hospital due diligence data, or a filtered page of it when any listing parameter is given"""
     try:
-        hospitals = due_dil_handler.get_all_hospitals()
-        logger.info(f"Successfully fetched {len(hospitals)} hospitals")
-        return hospitals
+        filters = {"tier": tier, "category": category, "city": city, "state": state, "accreditation": accreditation}
+        listing_params = (*filters.values(), min_rating, max_rating, fields, cursor, limit)
+        version = due_dil_handler.version
+        if all(param is None for param in listing_params):
+            def build():
+                hospitals = due_dil_handler.get_all_hospitals()
+                logger.info(f"Successfully fetched {len(hospitals)} hospitals")
+                return JSONResponse(content=hospitals)
+
+            return await cached_response(response_cache, request, "due-diligence", "hospitals", version, build)
+
+        return await cached_response(
+            response_cache, request, "due-diligence", ("hospitals", listing_params), version,
+            lambda: listing_page(due_dil_listing, version, due_dil_handler.get_all_hospitals, filters,
+                                 min_rating, max_rating, fields, cursor, limit)
+        )
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error fetching hospitals: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -323,6 +513,8 @@ async def get_hospital_by_id(hospital_id: int):
             raise HTTPException(status_code=404, detail="Hospital not found")
         logger.info(f"Successfully fetched hospital with ID: {hospital_id}")
         return hospital
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error fetching hospital {hospital_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -332,25 +524,58 @@ async def add_hospital(hospital_data: dict):
     print("/api/due-diligence/hospital [POST] endpoint hit")
     """Add new hospital due diligence data"""
     try:
-        success = due_dil_handler.add_hospital(hospital_data)
+        success = await run_offloaded(due_dil_pool, due_dil_handler.add_hospital, hospital_data)
         if not success:
             raise HTTPException(status_code=400, detail="Invalid hospital data or hospital already exists")
+        response_cache.invalidate("due-diligence")
         logger.info("Successfully added new hospital")
         return {"message": "Hospital added successfully"}
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error adding hospital: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/due-diligence/hospitals/bulk")
+async def bulk_upsert_hospitals(request: Request, atomic: bool = False):
+    print("/api/due-diligence/hospitals/bulk endpoint hit")
+    """Insert or update many hospitals from a JSON array or an NDJSON body, persisting once"""
+    try:
+        body = await request.body()
+        content_type = request.headers.get("content-type", "")
+        ndjson = "ndjson" in content_type or "jsonl" in content_type
+        try:
+            records, errors = await run_offloaded(due_dil_pool, parse_bulk_payload, body, ndjson)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # With atomic=true a single bad record rejects the whole upload
+        if errors and atomic:
+            raise HTTPException(status_code=422, detail={"message": "Upload contains invalid records", "errors": errors})
+
+        result = await run_offloaded(due_dil_pool, due_dil_handler.bulk_upsert, [record for _, record in records])
+        if result["inserted"] or result["updated"]:
+            response_cache.invalidate("due-diligence")
+        logger.info(f"Bulk upsert: {result['inserted']} inserted, {result['updated']} updated, {len(errors)} rejected")
+        return {**result, "rejected": len(errors), "errors": errors}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Error in bulk hospital upsert: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.put("/api/due-diligence/hospital/{hospital_id}")
 async def update_hospital(hospital_id: int, hospital_data: dict):
     print(f"/api/due-diligence/hospital/{hospital_id} [PUT] endpoint hit")
     """Update hospital due diligence data"""
     try:
-        success = due_dil_handler.update_hospital(hospital_id, hospital_data)
+        success = await run_offloaded(due_dil_pool, due_dil_handler.update_hospital, hospital_id, hospital_data)
         if not success:
             raise HTTPException(status_code=404, detail="Hospital not found or invalid data")
+        response_cache.invalidate("due-diligence")
         logger.info(f"Successfully updated hospital with ID: {hospital_id}")
         return {"message": "Hospital updated successfully"}
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error updating hospital {hospital_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -360,11 +585,14 @@ async def delete_hospital(hospital_id: int):
     print(f"/api/due-diligence/hospital/{hospital_id} [DELETE] endpoint hit")
     """Delete hospital due diligence data"""
     try:
-        success = due_dil_handler.delete_hospital(hospital_id)
+        success = await run_offloaded(due_dil_pool, due_dil_handler.delete_hospital, hospital_id)
         if not success:
             raise HTTPException(status_code=404, detail="Hospital not found")
+        response_cache.invalidate("due-diligence")
         logger.info(f"Successfully deleted hospital with ID: {hospital_id}")
         return {"message": "Hospital deleted successfully"}
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Error deleting hospital {hospital_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -387,27 +615,119 @@ except Exception as e:
     raise
 
 @app.get("/api/hospital-profiling/hospitals")
-async def get_all_hospital_profiles():
+async def get_all_hospital_profiles(request: Request, city: Optional[str] = None, state: Optional[str] = None,
+                                    type: Optional[str] = None, accreditation: Optional[str] = None,
+                                    network_status: Optional[str] = None, min_rating: Optional[float] = None,
+                                    max_rating: Optional[float] = None, fields: Optional[str] = None,
+                                    cursor: Optional[str] = None, limit: Optional[int] = None):
     print("/api/hospital-profiling/hospitals endpoint hit")
     try:
-        hospitals = hospital_profiling_handler.get_all_hospitals()
-        return hospitals
+        filters = {"city": city, "state": state, "type": type, "accreditation": accreditation,
+                   "network_status": network_status}
+        listing_params = (*filters.values(), min_rating, max_rating, fields, cursor, limit)
+        version = hospital_profiling_handler.version
+        if all(param is None for param in listing_params):
+            return await cached_response(
+                response_cache, request, "hospital-profiling", "hospitals", version,
+                lambda: JSONResponse(content=hospital_profiling_handler.get_all_hospitals())
+            )
+
+        return await cached_response(
+            response_cache, request, "hospital-profiling", ("hospitals", listing_params), version,
+            lambda: listing_page(profiling_listing, version, hospital_profiling_handler.get_hospital_summaries, filters,
+                                 min_rating, max_rating, fields, cursor, limit,
+                                 load=hospital_profiling_handler.materialize)
+        )
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logging.error(f"Error fetching hospital profiles: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/hospital-profiling/search")
+async def search_hospital_profiles(request: Request, q: str, limit: int = 10, prefix: bool = True):
+    print(f"/api/hospital-profiling/search endpoint hit for query: {q}")
+    try:
+        limit = min(max(1, limit), 100)
+        return await cached_response(
+            response_cache, request, "hospital-profiling", ("search", q.strip().casefold(), limit, prefix),
+            hospital_profiling_handler.version,
+            lambda: JSONResponse(content=hospital_profiling_handler.search(q, limit=limit, prefix=prefix))
+        )
+    except Exception as e:
+        logging.error(f"Error searching hospital profiles for {q!r}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/hospital-profiling/hospital/{hospital_id}")
-async def get_hospital_profile_by_id(hospital_id: str):
+async def get_hospital_profile_by_id(hospital_id: str, request: Request):
     print(f"/api/hospital-profiling/hospital/{hospital_id} endpoint hit")
     try:
         hospital = hospital_profiling_handler.get_hospital_by_id(hospital_id)
         if not hospital:
             raise HTTPException(status_code=404, detail="Hospital not found")
-        return hospital
+        return await cached_response(
+            response_cache, request, "hospital-profiling", ("hospital", hospital_id), hospital_profiling_handler.version,
+            lambda: JSONResponse(content=hospital)
+        )
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logging.error(f"Error fetching hospital profile {hospital_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/hospital-profiling/hospital/{hospital_id}/nearby")
+async def get_nearby_hospitals(hospital_id: str, request: Request, k: int = Query(5, ge=1, le=MAX_NEIGHBOURS),
+                               radius_km: float = Query(10.0, gt=0), same_type: bool = True):
+    print(f"/api/hospital-profiling/hospital/{hospital_id}/nearby endpoint hit")
+    try:
+        def build():
+            neighbours = geo_index.nearest_to(hospital_id, k=k, radius_km=radius_km, same_type=same_type)
+            if neighbours is None:
+                raise HTTPException(status_code=404, detail="Hospital not found or has no coordinates")
+            return JSONResponse(content=neighbours)
+
+        return await cached_response(
+            response_cache, request, "hospital-profiling", ("nearby", hospital_id, k, radius_km, same_type),
+            hospital_profiling_handler.version, build
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logging.error(f"Error fetching hospitals near {hospital_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/admin/stats")
+async def get_admin_stats():
+    print("/api/admin/stats endpoint hit")
+    return {
+        "response_cache": response_cache.stats(),
+        "analytics_coalescing": analytics_flight.stats(),
+        "analytics_pool": analytics_pool.stats(),
+        "due_diligence_pool": due_dil_pool.stats(),
+        "admission": {route: controller.stats() for route, controller in admission_controllers.items()},
+        "claims_dataset": claims_reloader.stats()
+    }
+
+@app.post("/api/admin/reload-claims")
+async def reload_claims(wait: bool = False):
+    print("/api/admin/reload-claims endpoint hit")
+    if not wait:
+        started = claims_reloader.reload_in_background("admin request")
+        return JSONResponse(
+            status_code=202,
+            content={"status": "started" if started else "already_running", "version": claims_reloader.current.version}
+        )
+    try:
+        dataset = await asyncio.get_running_loop().run_in_executor(None, claims_reloader.reload, "admin request")
+    except Exception as e:
+        logging.error(f"Error reloading claims dataset: {e}")
+        raise HTTPException(status_code=500, detail=f"Reload failed, still serving version "
+                                                    f"{claims_reloader.current.version}: {e}")
+    if dataset is None:
+        return JSONResponse(status_code=202, content={"status": "already_running",
+                                                      "version": claims_reloader.current.version})
+    return {"status": "reloaded", "version": dataset.version, "partners": len(dataset.store)}
+
 # Update the catch-all route to serve from the correct location
 @app.get("/{full_path:path}")
 async def serve_app(full_path: str):
@@ -486,24 +806,6 @@ async def send_report_request(request: ReportRequestSchema, background_tasks: Ba
         from fastapi import HTTPException
         raise HTTPException(status_code=500, detail="Failed to send email.")
 
-def handle_nan_values(obj):
-    """Recursively handle NaN values in dictionaries and lists"""
-    if isinstance(obj, dict):
-        return {k: handle_nan_values(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [handle_nan_values(item) for item in obj]
-    elif isinstance(obj, (float, np.float64, np.float32, np.float16)):
-        if pd.isna(obj) or np.isnan(obj):
-            return None
-        return float(obj)
-    elif isinstance(obj, (int, np.int64, np.int32, np.int16)):
-        return int(obj)
-    elif isinstance(obj, (str, np.character)):
-        return str(obj)
-    elif pd.isna(obj):
-        return None
-    return obj
-
 if __name__ == '__main__':
     import uvicorn
     logging.info("Starting server on 0.0.0.0:5002")
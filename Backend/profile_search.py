@@ -0,0 +1,160 @@
+import bisect
+import logging
+import math
+import re
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[0-9a-z]+")
+SERVICE_PATTERN = re.compile(r"^(.*?)\s*\((\d+)\)\s*$")
+STOPWORDS = {"a", "an", "and", "at", "dr", "for", "in", "near", "of", "the", "with"}
+
+# Relative weight of a term depending on where in the profile it appears
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "doctor_name": 2.5,
+    "city": 2.0,
+    "service": 2.0,
+    "doctor_specialty": 2.0,
+    "state": 1.5,
+    "type": 1.0,
+    "doctor_qualification": 1.0
+}
+# Prefix matches rank below whole-word matches
+PREFIX_FACTOR = 0.7
+MAX_PREFIX_EXPANSIONS = 64
+
+
+def tokenize(text) -> List[str]:
+    if text is None:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(str(text).casefold()) if token not in STOPWORDS]
+
+
+def parse_service(service: str) -> Tuple[str, int]:
+    """Split a key service such as 'orthopedist(9)' into its specialty and doctor count"""
+    match = SERVICE_PATTERN.match(str(service))
+    if match:
+        return match.group(1), int(match.group(2))
+    return str(service), 1
+
+
+def _add(postings: Dict[str, Dict[int, float]], position: int, text, weight: float) -> None:
+    for token in set(tokenize(text)):
+        hospitals = postings.setdefault(token, {})
+        hospitals[position] = hospitals.get(position, 0.0) + weight
+
+
+def _as_rating(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ProfileSearchIndex:
+    """In-memory inverted index over hospital profiles.
+
+    Each term maps to the hospitals it occurs in, with a score from the fields it
+    occurs in; key services weigh more the more doctors offer them. The sorted
+    vocabulary answers prefix (typeahead) queries with a binary search. Postings are
+    frozen into NumPy arrays so a query scores all hospitals with a few vector
+    operations. Every query term must match, and hospitals rank by their summed
+    term scores, then by rating.
+    """
+
+    def __init__(self, hospitals: Iterable[Dict]):
+        postings: Dict[str, Dict[int, float]] = {}
+        self.summaries: List[Dict] = []
+        self.doctors: List[List[Tuple[str, set]]] = []
+        for position, hospital in enumerate(hospitals):
+            location = hospital.get('location') or {}
+            details = hospital.get('details') or {}
+            self.summaries.append({
+                'id': hospital.get('id'),
+                'name': hospital.get('name'),
+                'city': location.get('city'),
+                'state': location.get('state'),
+                'type': details.get('type'),
+                'rating': hospital.get('rating')
+            })
+            _add(postings, position, hospital.get('name'), FIELD_WEIGHTS['name'])
+            _add(postings, position, location.get('city'), FIELD_WEIGHTS['city'])
+            _add(postings, position, location.get('state'), FIELD_WEIGHTS['state'])
+            _add(postings, position, details.get('type'), FIELD_WEIGHTS['type'])
+            for service in hospital.get('keyServices') or []:
+                specialty, count = parse_service(service)
+                _add(postings, position, specialty, FIELD_WEIGHTS['service'] * (1 + math.log1p(count) / 2))
+            doctors = []
+            for doctor in hospital.get('doctors') or []:
+                _add(postings, position, doctor.get('name'), FIELD_WEIGHTS['doctor_name'])
+                _add(postings, position, doctor.get('specialty'), FIELD_WEIGHTS['doctor_specialty'])
+                _add(postings, position, doctor.get('qualification'), FIELD_WEIGHTS['doctor_qualification'])
+                terms = set(tokenize(doctor.get('name'))) | set(tokenize(doctor.get('specialty')))
+                doctors.append((doctor.get('name'), terms))
+            self.doctors.append(doctors)
+
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.fromiter(hospitals.keys(), dtype=np.int32, count=len(hospitals)),
+                   np.fromiter(hospitals.values(), dtype=np.float32, count=len(hospitals)))
+            for term, hospitals in postings.items()
+        }
+        self.vocabulary = sorted(self.postings)
+        self.ratings = np.array([_as_rating(summary['rating']) for summary in self.summaries], dtype=np.float32)
+        logger.info(f"Built search index over {len(self.summaries)} hospitals with {len(self.vocabulary)} terms")
+
+    def _expand(self, token: str, prefix: bool) -> List[Tuple[str, float]]:
+        """Vocabulary terms a query token matches, with their match factor"""
+        terms = [(token, 1.0)] if token in self.postings else []
+        if prefix:
+            start = bisect.bisect_right(self.vocabulary, token)
+            for term in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+                if not term.startswith(token):
+                    break
+                terms.append((term, PREFIX_FACTOR))
+        return terms
+
+    def _term_matches(self, term: str, tokens: List[str], prefix: bool) -> bool:
+        return any(term == token or (prefix and term.startswith(token)) for token in tokens)
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True) -> List[Dict]:
+        """Ranked hospitals matching every term of the query, with the doctors that matched"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.summaries:
+            return []
+        scores = np.zeros(len(self.summaries), dtype=np.float32)
+        matched = np.ones(len(self.summaries), dtype=bool)
+        for token in tokens:
+            # A hospital scores a token by its best matching term, whole word or prefix
+            token_scores = np.zeros(len(self.summaries), dtype=np.float32)
+            for term, factor in self._expand(token, prefix):
+                positions, weights = self.postings[term]
+                token_scores[positions] = np.maximum(token_scores[positions], weights * factor)
+            matched &= token_scores > 0
+            if not matched.any():
+                return []
+            scores += token_scores
+
+        candidates = np.flatnonzero(matched)
+        if len(candidates) > limit:
+            # Keep everything scoring at least the limit-th best, so hospitals tied on
+            # score at the cut are decided by rating below rather than dropped arbitrarily
+            cutoff = np.partition(scores[candidates], len(candidates) - limit)[len(candidates) - limit]
+            candidates = candidates[scores[candidates] >= cutoff]
+        # Score, then rating, then position; the sort is stable
+        order = np.lexsort((-self.ratings[candidates], -scores[candidates]))[:limit]
+        ranked = [(int(position), float(scores[position])) for position in candidates[order]]
+        return [
+            {
+                **self.summaries[position],
+                'score': round(score, 3),
+                'matched_doctors': [
+                    name for name, terms in self.doctors[position]
+                    if any(self._term_matches(term, tokens, prefix) for term in terms)
+                ][:5]
+            }
+            for position, score in ranked
+        ]
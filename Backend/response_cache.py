@@ -0,0 +1,131 @@
+import hashlib
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, NamedTuple, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    media_type: str
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag derived from the response bytes"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Evaluate If-None-Match against an ETag (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of rendered responses keyed by (namespace, params, version)"""
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    def get(self, key: tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, entry: CachedResponse) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+                self.evictions += 1
+
+    def invalidate(self, namespace: Hashable) -> int:
+        """Drop every entry of a namespace, returning how many were removed"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == namespace]
+            for key in stale:
+                self._size -= len(self._entries.pop(key).body)
+        if stale:
+            logger.info(f"Invalidated {len(stale)} cached responses for {namespace}")
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "not_modified": self.not_modified
+            }
+
+
+async def cached_response(cache: ResponseCache, request: Request, namespace: Hashable, params: Hashable,
+                          version: Hashable, build: Callable, flight: Optional[SingleFlight] = None) -> Response:
+    """
+    Serve a response from the cache, building and storing it on a miss. ``build`` returns
+    a Response (or an awaitable of one); only 200 responses are cached. With ``flight``,
+    concurrent misses for the same key share one build. A request whose If-None-Match
+    matches the ETag gets an empty 304.
+    """
+    key = (namespace, params, version)
+    entry = cache.get(key)
+    if entry is None:
+        if flight is not None:
+            response = await flight.do(key, build)
+        else:
+            response = build()
+            if inspect.isawaitable(response):
+                response = await response
+        if response.status_code != 200:
+            return response
+        entry = CachedResponse(bytes(response.body), etag_for(response.body), response.media_type)
+        cache.put(key, entry)
+
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, entry.etag):
+        cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
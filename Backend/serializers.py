@@ -0,0 +1,69 @@
+import json
+import math
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+
+def _encode_scalar(value: Any) -> str:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return "null"
+    if value is None or value is pd.NaT or (not isinstance(value, (str, bytes)) and pd.api.types.is_scalar(value) and pd.isna(value)):
+        return "null"
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    return str(value)
+
+
+def _encode_frame(df: pd.DataFrame) -> str:
+    """A frame as a JSON list of records, with NaN/inf written as null"""
+    floats = df.select_dtypes(include="floating").columns
+    if len(floats) == 0 and not (df.dtypes == object).any():
+        # No floats to round and no NaN to hide in object columns: pandas' C encoder is exact
+        return df.to_json(orient="records", date_format="iso", force_ascii=False)
+    # pandas' encoder keeps at most 15 significant digits, so floats are written with
+    # Python's shortest round-trip repr, as the to_dict + JSON path always did
+    values = df.astype(object)
+    for column in df.columns:
+        if column in floats:
+            missing = ~np.isfinite(df[column].to_numpy())
+        else:
+            missing = df[column].isna().to_numpy()
+        if missing.any():
+            values[column] = values[column].where(~missing, None)
+    return json.dumps(values.to_dict(orient="records"), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":"), default=_encode_default)
+
+
+def encode_json(content: Any) -> str:
+    """
+    Encode a payload that may contain DataFrames. Frames are serialized as lists of
+    records, with NaN/inf written as null, NumPy scalars as plain numbers and floats at
+    full precision; the surrounding dicts and lists are joined around those fragments.
+    """
+    if isinstance(content, pd.DataFrame):
+        return _encode_frame(content)
+    if isinstance(content, dict):
+        return "{" + ",".join(
+            f"{json.dumps(str(key), ensure_ascii=False)}:{encode_json(value)}" for key, value in content.items()
+        ) + "}"
+    if isinstance(content, (list, tuple)):
+        return "[" + ",".join(encode_json(item) for item in content) + "]"
+    return _encode_scalar(content)
+
+
+class DataFrameJSONResponse(JSONResponse):
+    """JSON response for analytics payloads whose sections are DataFrames"""
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content).encode("utf-8")
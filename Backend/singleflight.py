@@ -0,0 +1,78 @@
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """An in-flight computation and the number of callers awaiting it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key onto one in-flight computation.
+
+    The first caller for a key starts the work in a task; callers arriving while it
+    is still running await the same task and receive its result or exception. The
+    task is cancelled only once every caller has been cancelled. Nothing is kept
+    once the computation finishes, so results are never stale.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, _Flight] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def _run(self, fn: Callable[[], Any]) -> Any:
+        try:
+            result = fn()
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            self.errors += 1
+            raise
+
+    def _finished(self, key: Hashable, flight: _Flight) -> None:
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        if not flight.task.cancelled():
+            # Mark the exception retrieved in case every caller had already gone
+            flight.task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        flight = self._in_flight.get(key)
+        if flight is None:
+            # The work runs in its own task, so the caller that started it can go away
+            # without failing the callers coalesced onto it
+            flight = _Flight(asyncio.ensure_future(self._run(fn)))
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda _: self._finished(key, flight))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            # Shielded so a cancelled caller only stops waiting
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to receive the result
+                flight.task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "errors": self.errors
+        }
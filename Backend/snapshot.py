@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from claims_store import compact_claims_frame, log_memory_report, sort_claims_by_partner
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 3
+MANIFEST_FILE = "manifest.json"
+
+
+def snapshot_dir_for(excel_path: str) -> str:
+    """Snapshot directory that sits next to the source workbook"""
+    return os.path.splitext(excel_path)[0] + ".snapshot"
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_fingerprint(source_path: str, with_hash: bool = True) -> Dict:
+    stat = os.stat(source_path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        fingerprint["sha256"] = _file_sha256(source_path)
+    return fingerprint
+
+
+def _codes_dtype(dictionary_size: int):
+    """Smallest code type, matching what pandas uses for categoricals of that size"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if dictionary_size < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _json_value(value):
+    """Convert a dictionary entry to something json can store losslessly enough"""
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def write_snapshot(df: pd.DataFrame, snapshot_dir: str, source_path: Optional[str] = None) -> None:
+    """Write a claims frame as one .npy file per column, dictionary-encoding string columns"""
+    tmp_dir = f"{snapshot_dir}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        file_name = f"c{i}.npy"
+        entry = {"name": str(name), "file": file_name}
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+            try:
+                # Sorted dictionaries keep categorical group-bys in the same order as strings
+                codes, uniques = pd.factorize(series, sort=True)
+            except TypeError:
+                codes, uniques = pd.factorize(series, sort=False)
+            np.save(os.path.join(tmp_dir, file_name), codes.astype(_codes_dtype(len(uniques))))
+            entry["kind"] = "categorical" if isinstance(series.dtype, pd.CategoricalDtype) else "dictionary"
+            entry["dictionary"] = [_json_value(value) for value in uniques.tolist()]
+        elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+            values = series.to_numpy(dtype='datetime64[ns]')
+            np.save(os.path.join(tmp_dir, file_name), values.view(np.int64))
+            entry["kind"] = "datetime"
+        else:
+            np.save(os.path.join(tmp_dir, file_name), series.to_numpy())
+            entry["kind"] = "numeric"
+        columns.append(entry)
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "rows": len(df),
+        "columns": columns,
+        "source": _source_fingerprint(source_path) if source_path else None,
+        "created_at": time.time()
+    }
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+
+    # Swap the finished directory into place so readers never see a partial snapshot
+    old_dir = None
+    if os.path.exists(snapshot_dir):
+        old_dir = f"{snapshot_dir}.old-{os.getpid()}"
+        os.rename(snapshot_dir, old_dir)
+    os.rename(tmp_dir, snapshot_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info(f"Wrote claims snapshot with {len(df)} rows to {snapshot_dir}")
+
+
+def read_manifest(snapshot_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def is_snapshot_fresh(snapshot_dir: str, source_path: str) -> bool:
+    """A snapshot is fresh when the workbook's size and mtime, or failing that its hash, match"""
+    manifest = read_manifest(snapshot_dir)
+    if not manifest or manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return False
+    source = manifest.get("source")
+    if not source:
+        return False
+    current = _source_fingerprint(source_path, with_hash=False)
+    if current["size"] != source["size"]:
+        return False
+    if current["mtime_ns"] == source["mtime_ns"]:
+        return True
+    # The workbook was touched or copied; only its contents decide
+    return _file_sha256(source_path) == source.get("sha256")
+
+
+def load_snapshot(snapshot_dir: str, mmap: bool = True, shared: bool = False) -> pd.DataFrame:
+    """Load a snapshot, memory-mapping numeric columns read-only.
+
+    Categorical columns always keep their memory-mapped codes. With ``shared`` the
+    remaining string columns become categoricals too, so every process loading the
+    same snapshot shares one copy of the column data through the page cache.
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No claims snapshot at {snapshot_dir}")
+
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for entry in manifest["columns"]:
+        values = np.load(os.path.join(snapshot_dir, entry["file"]), mmap_mode=mmap_mode)
+        if entry["kind"] == "categorical" or (entry["kind"] == "dictionary" and shared):
+            data[entry["name"]] = pd.Categorical.from_codes(values, categories=entry["dictionary"], validate=False)
+        elif entry["kind"] == "dictionary":
+            dictionary = np.array(entry["dictionary"] + [np.nan], dtype=object)
+            # Code -1 marks missing values and picks the trailing NaN
+            data[entry["name"]] = dictionary[values]
+        elif entry["kind"] == "datetime":
+            data[entry["name"]] = values.view('datetime64[ns]')
+        else:
+            data[entry["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def _read_workbook(excel_path: str) -> pd.DataFrame:
+    """Parse the workbook into the compact, partner-sorted layout that snapshots store"""
+    df, report = compact_claims_frame(pd.read_excel(excel_path))
+    log_memory_report(report)
+    return sort_claims_by_partner(df)
+
+
+@contextmanager
+def _snapshot_lock(snapshot_dir: str):
+    """Serialize snapshot rebuilds across processes so only one of them parses the workbook"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{snapshot_dir}.lock", 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_claims_dataset(excel_path: str, use_snapshot: bool = True, shared: bool = False) -> pd.DataFrame:
+    """Load the claims workbook through its snapshot, rebuilding the snapshot when stale.
+
+    In shared mode the first process to arrive rebuilds a stale snapshot while the
+    others wait on a file lock, and every process then attaches to the snapshot
+    with zero-copy read-only views.
+    """
+    snapshot_dir = snapshot_dir_for(excel_path)
+    if shared:
+        with _snapshot_lock(snapshot_dir):
+            if not is_snapshot_fresh(snapshot_dir, excel_path):
+                df = _read_workbook(excel_path)
+                logger.info(f"Loaded Excel file {excel_path} with shape: {df.shape}")
+                write_snapshot(df, snapshot_dir, source_path=excel_path)
+                del df
+            df = load_snapshot(snapshot_dir, shared=True)
+        logger.info(f"Attached to shared claims snapshot {snapshot_dir} with shape: {df.shape}")
+        return df
+
+    if use_snapshot and is_snapshot_fresh(snapshot_dir, excel_path):
+        try:
+            df = load_snapshot(snapshot_dir)
+            logger.info(f"Loaded claims snapshot from {snapshot_dir} with shape: {df.shape}")
+            return df
+        except Exception as e:
+            logger.warning(f"Could not read claims snapshot {snapshot_dir}, falling back to Excel: {e}")
+
+    df = _read_workbook(excel_path)
+    logger.info(f"Loaded Excel file {excel_path} with shape: {df.shape}")
+    if use_snapshot:
+        try:
+            write_snapshot(df, snapshot_dir, source_path=excel_path)
+        except Exception as e:
+            logger.warning(f"Could not write claims snapshot {snapshot_dir}: {e}")
+    return df
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, "hospital_data_v1.xlsx")
+    started = time.perf_counter()
+    frame = _read_workbook(source)
+    write_snapshot(frame, snapshot_dir_for(source), source_path=source)
+    logger.info(f"Snapshot built in {time.perf_counter() - started:.2f}s")
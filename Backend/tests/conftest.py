@@ -0,0 +1,100 @@
+import importlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Backend modules are imported by name, as main.py does
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture
+def claims_df() -> pd.DataFrame:
+    """A small claims book in workbook order: partners interleaved, several hospital names
+    per partner, shared PINs and hospital types, and rows without a PIN"""
+    rng = np.random.default_rng(7)
+    rows = 600
+    partner_ids = rng.integers(1000, 1030, size=rows)
+    pins = np.where(rng.random(rows) < 0.05, np.nan, 400000 + partner_ids % 4)
+    df = pd.DataFrame({
+        'PARTNER_ID': partner_ids,
+        'HOSPITAL': [f"Hospital {partner_id}{'ABC'[i % 3]}" for i, partner_id in enumerate(partner_ids)],
+        'HOSP_TYPE': np.where(partner_ids % 3 == 0, 'Tier 1', 'Tier 2'),
+        'CITY': 'Pune',
+        'STATE': 'MH',
+        'PIN': pins,
+        # Some claims span several rows, so distinct and row counts differ
+        'CLAIM_NO': rng.integers(500000, 500450, size=rows),
+        'CLAIM_TYPE': rng.choice(['CASHLESS', 'REIMBURSEMENT'], size=rows),
+        'MEDICAL_OR_SURGICAL': rng.choice(['Medical', 'Surgical', 'MEDICAL MGMT'], size=rows),
+        'ROOM_CATEGORY': rng.choice(['ICU', 'General', 'Private'], size=rows),
+        'FINAL_DIAGNOSIS': rng.choice([f"DX{i}" for i in range(8)], size=rows),
+        'CLAIMED_AMT': rng.integers(10000, 90000, size=rows).astype(float),
+        'APPROVED_AMT': rng.integers(5000, 80000, size=rows).astype(float),
+        'CLAIM_YEAR': rng.choice([2021, 2022, 2023, 2024], size=rows),
+    })
+    # 2022 only has cashless Medical claims, so one side of each split has no rows that year
+    df.loc[df['CLAIM_YEAR'] == 2022, ['CLAIM_TYPE', 'MEDICAL_OR_SURGICAL']] = ['CASHLESS', 'Medical']
+    return df
+
+
+@pytest.fixture
+def claims_workbook(claims_df, tmp_path) -> str:
+    """claims_df written out as the claims workbook"""
+    path = str(tmp_path / "claims.xlsx")
+    claims_df.to_excel(path, index=False)
+    return path
+
+
+@pytest.fixture
+def hospital_record():
+    """Builds a minimal valid due-diligence record"""
+    def build(hospital_id, name=None, tier="Tier 1", category="Multi Specialty", infra_score=4.0,
+              address="12 MG Road, Pune, Maharashtra - 411001", nabh="Accredited") -> dict:
+        return {
+            "hospital_info": {
+                "ID": hospital_id,
+                "HOSPITAL": name or f"Hospital {hospital_id}",
+                "ADDRESS": address,
+                "CATEGORY": category,
+                "TIER": tier,
+                "INFRA_SCORE": infra_score
+            },
+            "hospital_score": {"score": 80},
+            "financial_assessment": {"gst_status": "Active", "pan_status": "Active", "epfo_status": "Active"},
+            "negative_legal": {
+                "blacklist": {"count": 0, "severity": "None"},
+                "pmjay_status": "Active",
+                "legal_status": {
+                    "criminal_case": {"status": "None", "details": ""},
+                    "civil_case": {"status": "None", "details": ""}
+                }
+            },
+            "accreditation_status": {
+                "jci": {"status": "Not Accredited", "label": "JCI"},
+                "nabh": {"status": nabh, "label": "NABH"},
+                "rohini": {"status": "Not Accredited", "label": "ROHINI"},
+                "none": False
+            }
+        }
+    return build
+
+
+@pytest.fixture
+def due_dil_api(tmp_path, monkeypatch):
+    """TestClient over main.app with the due-diligence store swapped for an empty one in
+    tmp_path. main loads the local claims workbook at import, so this skips without it."""
+    if not os.path.exists(os.path.join(BACKEND_DIR, "hospital_data_v1.xlsx")):
+        pytest.skip("main.app needs the local claims workbook")
+    from fastapi.testclient import TestClient
+    from due_dil_utils import DueDiligenceDataHandler
+
+    main = importlib.import_module("main")
+    handler = DueDiligenceDataHandler(str(tmp_path / "due_diligence_data.json"))
+    monkeypatch.setattr(main, "due_dil_handler", handler)
+    main.response_cache.invalidate("due-diligence")
+    yield TestClient(main.app), handler
+    handler.close()
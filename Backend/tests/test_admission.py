@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=3, queue_timeout=5)
+        order = []
+        holder = await controller.acquire()
+
+        async def caller(name):
+            admitted_at = await controller.acquire()
+            order.append(name)
+            await asyncio.sleep(0)
+            controller.release(admitted_at)
+
+        callers = []
+        for name in ("first", "second", "third"):
+            callers.append(asyncio.ensure_future(caller(name)))
+            await asyncio.sleep(0)
+        assert controller.stats()["waiting"] == 3
+        controller.release(holder)
+        await asyncio.gather(*callers)
+        return controller, order
+
+    controller, order = asyncio.run(scenario())
+    assert order == ["first", "second", "third"]
+    stats = controller.stats()
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+    assert stats["admitted"] == 4 and stats["queued"] == 3 and stats["completed"] == 4
+
+
+def test_queued_caller_times_out_and_gives_up_its_place():
+    async def scenario():
+        controller = AdmissionController("test", max_in_flight=1, max_queue=1, queue_timeout=0.05)
+        holder = await controller.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        assert controller.stats()["waiting"] == 0
+        controller.release(holder)
+        # The slot freed by the holder is not handed to the caller that timed out
+        await controller.acquire()
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(scenario())
+    assert rejected.retry_after >= 1
+    assert controller.stats()["rejected_timeout"] == 1
+    assert controller.stats()["in_flight"] == 1
+
+
+def test_saturated_route_answers_503_with_retry_after():
+    controller = AdmissionController("test", max_in_flight=2, max_queue=2, queue_timeout=5)
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        # Mirrors main.run_admitted
+        try:
+            admitted_at = await controller.acquire()
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=503, detail="Server is busy, please retry shortly",
+                                headers={"Retry-After": str(e.retry_after)})
+        try:
+            await release.wait()
+            return {"ok": True}
+        finally:
+            controller.release(admitted_at)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            accepted = [asyncio.ensure_future(client.get("/work")) for _ in range(4)]
+            while controller.stats()["waiting"] < 2:
+                await asyncio.sleep(0.01)
+            shed = await client.get("/work")
+            release.set()
+            return shed, await asyncio.gather(*accepted)
+
+    shed, accepted = asyncio.run(scenario())
+    assert shed.status_code == 503
+    assert int(shed.headers["retry-after"]) >= 1
+    assert [response.status_code for response in accepted] == [200] * 4
+    assert controller.stats()["rejected_queue_full"] == 1
+    assert controller.stats()["in_flight"] == 0
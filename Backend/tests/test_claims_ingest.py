@@ -0,0 +1,44 @@
+import json
+import os
+
+import pandas as pd
+
+from claims_aggregates import parse_claims_batch
+from claims_reload import ClaimsReloader, ingest_dir_for
+
+
+def claim_row(partner_id, claim_no, approved, **overrides):
+    row = {
+        'PARTNER_ID': partner_id, 'CLAIM_NO': claim_no, 'CLAIM_YEAR': 2023, 'CLAIM_TYPE': 'CASHLESS',
+        'MEDICAL_OR_SURGICAL': 'Medical', 'ROOM_CATEGORY': 'ICU', 'FINAL_DIAGNOSIS': 'DX1',
+        'APPROVED_AMT': approved, 'CLAIMED_AMT': approved * 1.1, 'HOSPITAL': f"Hospital {partner_id}",
+        'HOSP_TYPE': 'Tier 2', 'CITY': 'Pune', 'STATE': 'MH', 'PIN': '0411001'
+    }
+    return {**row, **overrides}
+
+
+def assert_same_aggregates(left, right):
+    assert left.partner_ids == right.partner_ids
+    assert left.stats() == right.stats()
+    for partner_id in left.partner_ids:
+        pd.testing.assert_frame_equal(left.hospital_rows(partner_id), right.hospital_rows(partner_id))
+        for name, section in left.get(partner_id).items():
+            pd.testing.assert_frame_equal(section, right.get(partner_id)[name], obj=f"{partner_id} {name}")
+
+
+def test_json_batch_replays_identically_after_restart(claims_workbook):
+    reloader = ClaimsReloader(claims_workbook, incremental=True)
+    # Values CSV would re-type: zero-padded claim numbers and PINs, a new partner whose
+    # PIN only ever arrives as text, and amounts that need every digit
+    rows = [
+        claim_row(1001, '00123', 0.1 + 0.2),
+        claim_row(1001, '123', 12345.678901234567),
+        claim_row(2001, '0042', 1 / 3, MEDICAL_OR_SURGICAL='Surgical', ROOM_CATEGORY=None),
+    ]
+    reloader.ingest(parse_claims_batch(json.dumps(rows).encode(), "json"))
+    reloader.ingest(parse_claims_batch("\n".join(json.dumps(row) for row in rows).encode(), "ndjson"))
+    assert sorted(os.listdir(ingest_dir_for(claims_workbook))) == ["batch-00000001.ndjson", "batch-00000002.ndjson"]
+    assert reloader.current.aggregates.hospital_rows(2001)['PIN'].iloc[0] == '0411001'
+
+    restarted = ClaimsReloader(claims_workbook, incremental=True)
+    assert_same_aggregates(restarted.current.aggregates, reloader.current.aggregates)
@@ -0,0 +1,43 @@
+import io
+import json
+
+import pytest
+
+from claims_precompute import plan_shards, precompute_claims_analytics
+from claims_store import ClaimsStore
+from snapshot import write_snapshot
+
+
+@pytest.fixture
+def claims_snapshot(claims_df, tmp_path):
+    snapshot_dir = str(tmp_path / "claims.snapshot")
+    write_snapshot(ClaimsStore(claims_df).df, snapshot_dir)
+    return snapshot_dir
+
+
+def precompute(snapshot_dir, workers):
+    out, updates = io.StringIO(), []
+    result = precompute_claims_analytics(snapshot_dir, out, workers=workers, progress=updates.append)
+    return out.getvalue(), result, updates
+
+
+def test_output_is_identical_across_worker_counts(claims_df, claims_snapshot):
+    single, single_result, _ = precompute(claims_snapshot, 1)
+    parallel, parallel_result, updates = precompute(claims_snapshot, 2)
+    assert parallel == single
+
+    partner_ids = [json.loads(line)['partner_id'] for line in parallel.splitlines()]
+    assert partner_ids == sorted(claims_df['PARTNER_ID'].unique().tolist())
+    assert parallel_result['partners'] == single_result['partners'] == len(partner_ids)
+    assert parallel_result['rows'] == len(claims_df)
+    assert [update['shards_done'] for update in updates] == list(range(1, parallel_result['shards'] + 1))
+
+
+def test_shards_cover_whole_partners_in_order():
+    partner_slices = {1: (0, 5), 2: (5, 6), 3: (6, 20), 4: (20, 21), 5: (21, 30)}
+    shards = plan_shards(partner_slices, 3)
+    assert shards[0].start == 0 and shards[-1].stop == 30
+    assert all(left.stop == right.start for left, right in zip(shards, shards[1:]))
+    assert [shard.index for shard in shards] == list(range(len(shards)))
+    assert sum(shard.partners for shard in shards) == len(partner_slices)
+    assert all(shard.start in {0, 5, 6, 20, 21} for shard in shards)
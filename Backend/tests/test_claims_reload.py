@@ -0,0 +1,45 @@
+import pytest
+
+from claims_reload import ClaimsReloader
+
+
+def test_failed_reload_keeps_the_current_dataset(claims_df, claims_workbook):
+    reloader = ClaimsReloader(claims_workbook)
+    published = []
+    reloader.listeners.append(published.append)
+    before = reloader.current
+
+    claims_df.drop(columns=['HOSPITAL']).to_excel(claims_workbook, index=False)
+    with pytest.raises(ValueError):
+        reloader.reload("test")
+    assert reloader.current is before and reloader.current.version == 1
+    assert published == []
+    stats = reloader.stats()
+    assert stats["failures"] == 1 and stats["reloads"] == 0
+    assert "HOSPITAL" in stats["last_error"]
+
+    # The next good workbook is swapped in and clears the error
+    claims_df.to_excel(claims_workbook, index=False)
+    dataset = reloader.reload("test")
+    assert reloader.current is dataset and dataset.version == 2
+    assert published == [dataset]
+    assert reloader.stats()["last_error"] is None
+
+
+def test_requests_in_flight_keep_the_dataset_they_captured(claims_df, claims_workbook):
+    reloader = ClaimsReloader(claims_workbook)
+    # A request takes the current dataset once and reads only from it
+    captured = reloader.current
+    dropped = int(claims_df['PARTNER_ID'].iloc[0])
+    rows_before = len(captured.store.get_partner_claims(dropped))
+
+    claims_df[claims_df['PARTNER_ID'] != dropped].to_excel(claims_workbook, index=False)
+    reloaded = reloader.reload("test")
+    assert reloaded.version == captured.version + 1
+    assert dropped not in reloaded and dropped not in reloader.current
+
+    # The old dataset is untouched: same version, same partner rows
+    assert captured.version == 1 and captured.store.version == 1
+    assert dropped in captured
+    assert len(captured.store.get_partner_claims(dropped)) == rows_before
+    assert len(captured.store.df) == len(claims_df)
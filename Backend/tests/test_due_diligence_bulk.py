@@ -0,0 +1,62 @@
+import json
+
+from due_dil_utils import parse_bulk_payload
+
+BULK_URL = "/api/due-diligence/hospitals/bulk"
+
+
+def test_array_errors_point_at_array_indexes(hospital_record):
+    broken = hospital_record(2)
+    del broken["hospital_score"]
+    body = json.dumps([hospital_record(1), broken, "not a record", hospital_record(3)]).encode()
+
+    records, errors = parse_bulk_payload(body)
+    assert [index for index, _ in records] == [0, 3]
+    assert errors == [
+        {"index": 1, "error": "Missing section: hospital_score"},
+        {"index": 2, "error": "Record must be a JSON object"},
+    ]
+
+
+def test_ndjson_errors_point_at_line_numbers(hospital_record):
+    broken = hospital_record(2)
+    del broken["negative_legal"]["blacklist"]["severity"]
+    lines = [json.dumps(hospital_record(1)), "", json.dumps(broken), "{not json", json.dumps(hospital_record(3))]
+
+    records, errors = parse_bulk_payload("\n".join(lines).encode(), ndjson=True)
+    # Blank lines are skipped but still counted, so indexes are 0-based line numbers
+    assert [index for index, _ in records] == [0, 4]
+    assert [error["index"] for error in errors] == [2, 3]
+    assert errors[0]["error"] == "Missing blacklist severity"
+    assert errors[1]["error"].startswith("Invalid JSON")
+
+
+def test_last_occurrence_of_an_id_wins(due_dil_api, hospital_record):
+    client, handler = due_dil_api
+    handler.add_hospital(hospital_record(1))
+    body = [hospital_record(2, name="First"), hospital_record(1, name="Updated"), hospital_record(2, name="Last")]
+
+    response = client.post(BULK_URL, json=body)
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 1, "updated": 1, "rejected": 0, "errors": []}
+    assert handler.get_hospital_by_id(2)["hospital_info"]["HOSPITAL"] == "Last"
+    assert handler.get_hospital_by_id(1)["hospital_info"]["HOSPITAL"] == "Updated"
+    assert handler.get_hospital_by_name("First") is None
+
+
+def test_invalid_records_are_reported_or_reject_the_atomic_upload(due_dil_api, hospital_record):
+    client, handler = due_dil_api
+    broken = hospital_record(2)
+    del broken["hospital_info"]["TIER"]
+    body = "\n".join(json.dumps(record) for record in (hospital_record(1), broken, hospital_record(3)))
+    headers = {"Content-Type": "application/x-ndjson"}
+
+    rejected = client.post(BULK_URL, params={"atomic": "true"}, content=body, headers=headers)
+    assert rejected.status_code == 422
+    assert rejected.json()["detail"]["errors"] == [{"index": 1, "error": "Missing field TIER in section hospital_info"}]
+    assert handler.get_all_hospitals() == []
+
+    partial = client.post(BULK_URL, content=body, headers=headers)
+    assert partial.status_code == 200
+    assert partial.json()["inserted"] == 2 and partial.json()["rejected"] == 1
+    assert [record["hospital_info"]["ID"] for record in handler.get_all_hospitals()] == [1, 3]
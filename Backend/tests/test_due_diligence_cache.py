@@ -0,0 +1,93 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from due_dil_utils import DueDiligenceDataHandler
+from response_cache import ResponseCache, cached_response
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    return str(tmp_path / "dd.json")
+
+
+def listing_app(handler: DueDiligenceDataHandler, cache: ResponseCache) -> FastAPI:
+    """The due-diligence list route as main.py serves it, over a given store and cache"""
+    app = FastAPI()
+
+    @app.get("/api/due-diligence/hospitals")
+    async def get_all_hospitals(request: Request):
+        return await cached_response(cache, request, "due-diligence", "hospitals", handler.version,
+                                     lambda: JSONResponse(content=handler.get_all_hospitals()))
+
+    @app.post("/api/due-diligence/hospital")
+    async def add_hospital(hospital_data: dict):
+        handler.add_hospital(hospital_data)
+        cache.invalidate("due-diligence")
+        return {"message": "Hospital added successfully"}
+
+    return app
+
+
+def test_etag_revalidation_and_invalidation_after_write(data_file, hospital_record):
+    handler = DueDiligenceDataHandler(data_file, compact_every=100)
+    handler.add_hospital(hospital_record(1))
+    cache = ResponseCache()
+    client = TestClient(listing_app(handler, cache))
+
+    first = client.get("/api/due-diligence/hospitals")
+    assert first.status_code == 200 and len(first.json()) == 1
+    etag = first.headers["etag"]
+    revalidated = client.get("/api/due-diligence/hospitals", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert cache.hits == 1
+
+    client.post("/api/due-diligence/hospital", json=hospital_record(2))
+    after_write = client.get("/api/due-diligence/hospitals", headers={"If-None-Match": etag})
+    assert after_write.status_code == 200
+    assert after_write.headers["etag"] != etag
+    assert [record["hospital_info"]["ID"] for record in after_write.json()] == [1, 2]
+    handler.close()
+
+
+def test_write_by_another_worker_changes_version_and_cached_list(data_file, hospital_record):
+    # Two handlers on one file stand in for two uvicorn workers on the JSON backend
+    worker = DueDiligenceDataHandler(data_file, compact_every=3)
+    other = DueDiligenceDataHandler(data_file, compact_every=3)
+    cache = ResponseCache()
+    client = TestClient(listing_app(worker, cache))
+
+    etag = client.get("/api/due-diligence/hospitals").headers["etag"]
+    version = worker.version
+    assert other.add_hospital(hospital_record(1))
+    assert worker.version != version
+
+    # The other worker never invalidated this worker's cache; the version still moved on
+    response = client.get("/api/due-diligence/hospitals", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert [record["hospital_info"]["ID"] for record in response.json()] == [1]
+    assert not worker.add_hospital(hospital_record(1))
+
+    # Compaction by the other worker replaces the base image under this one
+    other.add_hospital(hospital_record(2))
+    other.update_hospital(2, hospital_record(2, name="Renamed"))
+    assert worker.get_hospital_by_name("renamed")["hospital_info"]["ID"] == 2
+    assert worker.add_hospital(hospital_record(3))
+    assert [record["hospital_info"]["ID"] for record in other.get_all_hospitals()] == [1, 2, 3]
+    worker.close()
+    other.close()
+
+
+def test_refresh_leaves_an_append_in_progress_alone(data_file, hospital_record):
+    writer = DueDiligenceDataHandler(data_file, compact_every=100)
+    reader = DueDiligenceDataHandler(data_file, compact_every=100)
+    writer.add_hospital(hospital_record(1))
+    with open(f"{data_file}.wal", "a") as f:
+        f.write('{"op":"put","rec')
+    partial_size = len(open(f"{data_file}.wal").read())
+
+    assert [record["hospital_info"]["ID"] for record in reader.get_all_hospitals()] == [1]
+    assert len(open(f"{data_file}.wal").read()) == partial_size
+    writer.close()
+    reader.close()
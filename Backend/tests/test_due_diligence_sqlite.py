@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+import time
+
+from due_dil_sqlite import SQLiteDueDiligenceRepository
+from due_dil_utils import DueDiligenceDataHandler
+
+
+def ids(store):
+    return [record["hospital_info"]["ID"] for record in store.get_all_hospitals()]
+
+
+def test_migrate_from_json_replays_the_write_ahead_log(tmp_path, hospital_record):
+    json_file = str(tmp_path / "dd.json")
+    handler = DueDiligenceDataHandler(json_file, compact_every=3)
+    for hospital_id in (1, 2, 3):
+        handler.add_hospital(hospital_record(hospital_id))
+    # These stay in the write-ahead log, not the base image
+    handler.update_hospital(2, hospital_record(2, name="Renamed", tier="Tier 3"))
+    handler.delete_hospital(3)
+    handler.add_hospital(hospital_record(4))
+    expected = handler.get_all_hospitals()
+    handler.close()
+
+    repository = SQLiteDueDiligenceRepository(str(tmp_path / "dd.db"))
+    assert repository.migrate_from_json(json_file) == 3
+    assert repository.get_all_hospitals() == expected
+    assert repository.get_hospital_by_name("RENAMED")["hospital_info"]["TIER"] == "Tier 3"
+    # Runs once per database
+    assert repository.migrate_from_json(json_file) == 0
+    assert ids(repository) == [1, 2, 4]
+    repository.close()
+
+
+def test_every_write_bumps_the_shared_version(tmp_path, hospital_record):
+    db_file = str(tmp_path / "dd.db")
+    repository = SQLiteDueDiligenceRepository(db_file)
+    other_worker = SQLiteDueDiligenceRepository(db_file)
+    version = repository.version
+
+    assert repository.add_hospital(hospital_record(1))
+    assert repository.version == other_worker.version == version + 1
+    assert other_worker.update_hospital(1, hospital_record(1, name="Renamed"))
+    assert repository.version == version + 2
+    repository.bulk_upsert([hospital_record(2), hospital_record(3)])
+    assert other_worker.version == version + 3
+
+    # Rejected writes roll back without a bump
+    assert not repository.add_hospital(hospital_record(1))
+    assert not repository.update_hospital(99, hospital_record(99))
+    assert not repository.delete_hospital(99)
+    assert repository.version == version + 3
+    assert repository.delete_hospital(3)
+    assert other_worker.version == version + 4
+    repository.close()
+    other_worker.close()
+
+
+def test_concurrent_writers_on_two_connections_lose_nothing(tmp_path, hospital_record):
+    db_file = str(tmp_path / "dd.db")
+    workers = [SQLiteDueDiligenceRepository(db_file), SQLiteDueDiligenceRepository(db_file)]
+    version = workers[0].version
+
+    # A writer holding BEGIN IMMEDIATE makes the others wait for the lock, not fail
+    blocker = sqlite3.connect(db_file, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    errors = []
+
+    def write(worker, start):
+        try:
+            for hospital_id in range(start, start + 20):
+                assert worker.add_hospital(hospital_record(hospital_id))
+                assert worker.update_hospital(hospital_id, hospital_record(hospital_id, infra_score=5.0))
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            worker.close()
+
+    threads = [threading.Thread(target=write, args=(worker, start)) for worker, start in zip(workers, (100, 200))]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    assert all(thread.is_alive() for thread in threads)
+    blocker.execute("COMMIT")
+    blocker.close()
+    for thread in threads:
+        thread.join(timeout=30)
+    for worker in workers:
+        worker.close()
+
+    assert errors == []
+    repository = SQLiteDueDiligenceRepository(db_file)
+    records = repository.get_all_hospitals()
+    assert sorted(ids(repository)) == list(range(100, 120)) + list(range(200, 220))
+    assert all(record["hospital_info"]["INFRA_SCORE"] == 5.0 for record in records)
+    assert repository.version == version + 80
+    repository.close()
@@ -0,0 +1,93 @@
+import json
+import os
+
+from due_dil_utils import DueDiligenceDataHandler
+
+
+def ids(handler):
+    return [record["hospital_info"]["ID"] for record in handler.get_all_hospitals()]
+
+
+def test_update_keeps_record_position(tmp_path, hospital_record):
+    handler = DueDiligenceDataHandler(str(tmp_path / "dd.json"), compact_every=100)
+    for hospital_id in (1, 2, 3):
+        assert handler.add_hospital(hospital_record(hospital_id))
+
+    assert handler.update_hospital(2, hospital_record(2, name="Renamed"))
+    assert ids(handler) == [1, 2, 3]
+    assert handler.get_hospital_by_name("renamed")["hospital_info"]["ID"] == 2
+    assert handler.get_hospital_by_name("Hospital 2") is None
+
+    # Re-keying keeps the position too, and the old ID stops resolving
+    assert handler.update_hospital(1, hospital_record(9))
+    assert ids(handler) == [9, 2, 3]
+    assert handler.get_hospital_by_id(1) is None
+    assert handler.get_hospital_by_name("Hospital 9")["hospital_info"]["ID"] == 9
+    handler.close()
+
+
+def test_wal_replay_restores_writes_in_order(tmp_path, hospital_record):
+    data_file = str(tmp_path / "dd.json")
+    handler = DueDiligenceDataHandler(data_file, compact_every=100)
+    for hospital_id in (1, 2, 3, 4):
+        handler.add_hospital(hospital_record(hospital_id))
+    handler.update_hospital(2, hospital_record(2, name="Renamed"))
+    handler.update_hospital(3, hospital_record(30))
+    handler.delete_hospital(4)
+    expected = handler.get_all_hospitals()
+    handler.close()
+
+    # Nothing has been compacted yet; the base image is still empty
+    with open(data_file) as f:
+        assert json.load(f) == []
+
+    reopened = DueDiligenceDataHandler(data_file, compact_every=100)
+    assert reopened.get_all_hospitals() == expected
+    assert ids(reopened) == [1, 2, 30]
+    assert reopened.get_hospital_by_name("RENAMED")["hospital_info"]["ID"] == 2
+    reopened.close()
+
+
+def test_torn_final_wal_line_is_discarded(tmp_path, hospital_record):
+    data_file = str(tmp_path / "dd.json")
+    handler = DueDiligenceDataHandler(data_file, compact_every=100)
+    handler.add_hospital(hospital_record(1))
+    handler.add_hospital(hospital_record(2))
+    handler.close()
+    complete_size = os.path.getsize(f"{data_file}.wal")
+
+    # A crash mid-append leaves a partial line without its newline
+    torn = json.dumps({"op": "put", "record": hospital_record(3)})[:40]
+    with open(f"{data_file}.wal", "a") as f:
+        f.write(torn)
+
+    reopened = DueDiligenceDataHandler(data_file, compact_every=100)
+    assert ids(reopened) == [1, 2]
+    assert os.path.getsize(f"{data_file}.wal") == complete_size
+
+    # Later appends start on a clean line and replay normally
+    reopened.add_hospital(hospital_record(3))
+    reopened.close()
+    again = DueDiligenceDataHandler(data_file, compact_every=100)
+    assert ids(again) == [1, 2, 3]
+    again.close()
+
+
+def test_compaction_folds_wal_into_base_image(tmp_path, hospital_record):
+    data_file = str(tmp_path / "dd.json")
+    handler = DueDiligenceDataHandler(data_file, compact_every=3)
+    handler.add_hospital(hospital_record(1))
+    handler.add_hospital(hospital_record(2))
+    handler.update_hospital(1, hospital_record(1, name="Renamed"))
+    assert os.path.getsize(f"{data_file}.wal") == 0
+    with open(data_file) as f:
+        assert json.load(f) == handler.get_all_hospitals()
+
+    # Writes after compaction go to the new log and replay over the new base image
+    handler.add_hospital(hospital_record(3))
+    expected = handler.get_all_hospitals()
+    handler.close()
+    reopened = DueDiligenceDataHandler(data_file, compact_every=3)
+    assert reopened.get_all_hospitals() == expected
+    assert ids(reopened) == [1, 2, 3]
+    reopened.close()
@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+from hospital_profiling import HospitalProfilingDataHandler
+
+
+def profile(hospital_id, name, doctors=2, photos=True):
+    hospital = {
+        "id": hospital_id,
+        "name": name,
+        "location": {"city": "Pune", "state": "Maharashtra", "coordinates": {"lat": 18.52, "lng": 73.85}},
+        "details": {"type": "Multi-Speciality Hospital", "beds": 40},
+        "rating": 4.2,
+        "doctors": [{"name": f"Dr. Mehta {i}", "specialty": "Cardiologist"} for i in range(doctors)],
+    }
+    if photos:
+        hospital["photos"] = [f"https://img.example/{hospital_id}/{i}.jpg" for i in range(3)]
+    return hospital
+
+
+def write_profiles(path, hospitals):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"hospitals": hospitals}, f, ensure_ascii=False)
+
+
+@pytest.fixture
+def profiles_file(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    write_profiles(path, [
+        profile("101", "Sahyadri Hospital"),
+        profile("102", "Ruby Hall Clinic", doctors=0, photos=False),
+        profile("103", "Jehangir Hospital – Pune", doctors=5),
+    ])
+    return path
+
+
+def sidecar_writes(monkeypatch):
+    writes = []
+    original = HospitalProfilingDataHandler._write_sidecar
+
+    def counting(self):
+        writes.append(self.data_path)
+        original(self)
+
+    monkeypatch.setattr(HospitalProfilingDataHandler, "_write_sidecar", counting)
+    return writes
+
+
+def test_lazy_records_equal_eager_ones(profiles_file):
+    eager = HospitalProfilingDataHandler(profiles_file, lazy=False)
+    lazy = HospitalProfilingDataHandler(profiles_file, lazy=True)
+
+    assert lazy.get_all_hospitals() == eager.get_all_hospitals()
+    for hospital_id in ("101", "102", "103", "999"):
+        assert lazy.get_hospital_by_id(hospital_id) == eager.get_hospital_by_id(hospital_id)
+    assert lazy.search("hospital") == eager.search("hospital")
+    # Only summaries stay resident
+    assert all("doctors" not in summary and "photos" not in summary for summary in lazy.get_hospital_summaries())
+
+
+def test_sidecar_is_reused_until_the_source_changes(profiles_file, monkeypatch):
+    writes = sidecar_writes(monkeypatch)
+    HospitalProfilingDataHandler(profiles_file, lazy=True)
+    HospitalProfilingDataHandler(profiles_file, lazy=True)
+    assert len(writes) == 1
+
+    # Same size, new mtime: the rename keeps the length but must still be picked up
+    with open(profiles_file, encoding="utf-8") as f:
+        original = f.read()
+    with open(profiles_file, "w", encoding="utf-8") as f:
+        f.write(original.replace("Ruby Hall Clinic", "Ruby Hall Clinik"))
+    stat = os.stat(profiles_file)
+    os.utime(profiles_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    renamed = HospitalProfilingDataHandler(profiles_file, lazy=True)
+    assert len(writes) == 2
+    assert renamed.get_hospital_by_id("102")["name"] == "Ruby Hall Clinik"
+
+    # A new size, with a hospital added
+    write_profiles(profiles_file, [profile("101", "Sahyadri Hospital"), profile("104", "Noble Hospital", doctors=1)])
+    grown = HospitalProfilingDataHandler(profiles_file, lazy=True)
+    assert len(writes) == 3
+    assert [hospital["id"] for hospital in grown.get_all_hospitals()] == ["101", "104"]
+    assert grown.get_all_hospitals() == HospitalProfilingDataHandler(profiles_file, lazy=False).get_all_hospitals()
+    assert len(writes) == 3
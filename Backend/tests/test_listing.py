@@ -0,0 +1,92 @@
+import pytest
+
+from due_dil_utils import DUE_DILIGENCE_LISTING, DueDiligenceDataHandler
+from listing import ListingIndex, VersionedListing, parse_fields
+
+LIST_URL = "/api/due-diligence/hospitals"
+
+
+@pytest.fixture
+def store(tmp_path, hospital_record):
+    handler = DueDiligenceDataHandler(str(tmp_path / "dd.json"), compact_every=100)
+    tiers = ["Tier 1", "Tier 2", "Tier 3"]
+    for number, hospital_id in enumerate(range(10, 110, 10)):
+        handler.add_hospital(hospital_record(hospital_id, tier=tiers[number % 3], infra_score=float(number),
+                                             nabh="Accredited" if number % 2 else "Not Accredited"))
+    yield handler
+    handler.close()
+
+
+def page_ids(page):
+    return [item["hospital_info"]["ID"] for item in page["items"]]
+
+
+def test_cursor_pages_stay_stable_across_writes(store, hospital_record):
+    listing = VersionedListing(DUE_DILIGENCE_LISTING)
+    first = listing.get(store.version, store.get_all_hospitals).query({}, limit=3)
+    assert page_ids(first) == [10, 20, 30] and first["total"] == 10
+
+    # Inserts on either side of the cursor and a delete after it, between two pages
+    store.add_hospital(hospital_record(15))
+    store.add_hospital(hospital_record(45))
+    store.delete_hospital(40)
+    second = listing.get(store.version, store.get_all_hospitals).query({}, cursor=first["next_cursor"], limit=3)
+    assert page_ids(second) == [45, 50, 60]
+
+    seen, cursor = [], None
+    while True:
+        page = listing.get(store.version, store.get_all_hospitals).query({}, cursor=cursor, limit=4)
+        seen += page_ids(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [10, 15, 20, 30, 45, 50, 60, 70, 80, 90, 100]
+
+
+def test_comma_separated_values_match_any_part(store):
+    index = ListingIndex(store.get_all_hospitals(), DUE_DILIGENCE_LISTING)
+    page = index.query({"tier": " tier 1, TIER 3 ", "category": None}, limit=50)
+    assert page_ids(page) == [10, 30, 40, 60, 70, 90, 100]
+    assert page["total"] == 7
+
+    # Filters still intersect with each other
+    both = index.query({"tier": "Tier 1,Tier 3", "accreditation": "nabh,jci"}, limit=50)
+    assert page_ids(both) == [40, 60, 100]
+    with pytest.raises(ValueError):
+        index.query({"colour": "red"})
+
+
+def test_rating_range_is_inclusive(store):
+    index = ListingIndex(store.get_all_hospitals(), DUE_DILIGENCE_LISTING)
+    assert page_ids(index.query({}, min_rating=2, max_rating=5)) == [30, 40, 50, 60]
+    assert page_ids(index.query({}, min_rating=8)) == [90, 100]
+    assert page_ids(index.query({}, max_rating=0.5)) == [10]
+    assert index.query({"tier": "Tier 2"}, min_rating=3, max_rating=6)["total"] == 1
+
+
+def test_fields_project_aliases_and_dotted_paths(store):
+    index = ListingIndex(store.get_all_hospitals(), DUE_DILIGENCE_LISTING)
+    fields = parse_fields("id, name,rating,hospital_score.score,accreditation_status.nabh.status,missing")
+    item = index.query({}, fields=fields, limit=1)["items"][0]
+    assert item == {
+        "id": 10,
+        "name": "Hospital 10",
+        "rating": 0.0,
+        "hospital_score.score": 80,
+        "accreditation_status.nabh.status": "Not Accredited",
+        "missing": None,
+    }
+
+
+def test_listing_endpoint_pages_across_an_insert(due_dil_api, hospital_record):
+    client, handler = due_dil_api
+    for hospital_id in (1, 2, 3, 4):
+        handler.add_hospital(hospital_record(hospital_id))
+
+    first = client.get(LIST_URL, params={"limit": 2, "fields": "id,name"}).json()
+    assert first["items"] == [{"id": 1, "name": "Hospital 1"}, {"id": 2, "name": "Hospital 2"}]
+    client.post("/api/due-diligence/hospital", json=hospital_record(0))
+    second = client.get(LIST_URL, params={"limit": 2, "fields": "id,name", "cursor": first["next_cursor"]}).json()
+    assert [item["id"] for item in second["items"]] == [3, 4]
+    assert second["total"] == 5 and second["next_cursor"] is None
+    assert client.get(LIST_URL, params={"cursor": "not-a-cursor"}).status_code == 400
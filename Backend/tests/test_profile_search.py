@@ -0,0 +1,28 @@
+from profile_search import ProfileSearchIndex
+
+
+def hospital(position, rating):
+    return {
+        'id': str(position),
+        'name': f"Sunrise Hospital {position}",
+        'location': {'city': 'Pune', 'state': 'Maharashtra'},
+        'details': {'type': 'Multi-Specialty'},
+        'rating': rating
+    }
+
+
+def test_ties_at_the_cut_are_decided_by_rating():
+    # Every hospital scores the same for "sunrise"; the best rated come last
+    hospitals = [hospital(position, 3.0 + (position % 40 == 39)) for position in range(200)]
+    results = ProfileSearchIndex(hospitals).search("sunrise", limit=3)
+    assert len({result['score'] for result in results}) == 1
+    assert [result['id'] for result in results] == ['39', '79', '119']
+
+
+def test_limited_results_are_a_prefix_of_the_full_ranking():
+    hospitals = [hospital(position, (position * 7) % 5) for position in range(120)]
+    hospitals += [{**hospital(position, 4.5), 'name': f"Sunrise Sunrise {position}"} for position in range(120, 125)]
+    index = ProfileSearchIndex(hospitals)
+    full = [result['id'] for result in index.search("sunrise", limit=1000)]
+    for limit in (1, 4, 5, 6, 17, 50):
+        assert [result['id'] for result in index.search("sunrise", limit=limit)] == full[:limit]
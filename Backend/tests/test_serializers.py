@@ -0,0 +1,48 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from serializers import encode_json
+
+
+def baseline_json(obj) -> str:
+    """The old path: to_dict records, NaN to None, then the stdlib encoder. Infinities
+    made that path fail outright; they are mapped to None here as encode_json does."""
+    def clean(value):
+        if isinstance(value, dict):
+            return {k: clean(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [clean(v) for v in value]
+        if isinstance(value, pd.DataFrame):
+            return clean(value.to_dict(orient="records"))
+        if isinstance(value, (float, np.floating)):
+            return float(value) if math.isfinite(value) else None
+        if isinstance(value, np.integer):
+            return int(value)
+        if not isinstance(value, str) and pd.isna(value):
+            return None
+        return value
+    return json.dumps(clean(obj), allow_nan=False)
+
+
+def test_frames_match_baseline_serialization_at_full_precision():
+    df = pd.DataFrame({
+        'YEAR': [2021, 2022, 2023, 2024],
+        'RATIO': [0.1 + 0.2, 1 / 3, np.nan, np.inf],
+        'AMOUNT': [123456789.12345679, -np.inf, 2.5e-17, 98765.4321],
+        'LABEL': ['Medical', None, 'a/b', 'Surgical'],
+    })
+    payload = {'hospital_info': {'PARTNER_ID': np.int64(1001)}, 'section': df, 'score': np.float64(2 / 3)}
+
+    encoded = json.loads(encode_json(payload))
+    assert encoded == json.loads(baseline_json(payload))
+    assert encoded['section'][0]['RATIO'] == 0.30000000000000004
+    assert encoded['section'][1]['AMOUNT'] is None
+    assert encoded['section'][3]['RATIO'] is None
+
+
+def test_integer_frames_are_exact():
+    df = pd.DataFrame({'YEAR': [2021, 2022], 'CLAIMS': [2 ** 53 + 1, 0]})
+    assert json.loads(encode_json(df)) == json.loads(baseline_json(df))
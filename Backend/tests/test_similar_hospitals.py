@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from claims_aggregates import ClaimsAggregates
+from claims_cube import build_claims_cube
+from claims_store import ClaimsStore
+from snapshot import load_snapshot, write_snapshot
+from utils import analyze_hospital_claims, get_similar_hospitals
+
+
+def baseline_similar_hospitals(df, partner_id):
+    """The original workbook-order implementation, without its random distances"""
+    df = df.dropna(subset=['PARTNER_ID', 'PIN', 'HOSP_TYPE'])
+    hospital_details = df[df['PARTNER_ID'] == partner_id]
+    if hospital_details.empty:
+        return pd.DataFrame()
+    pin = hospital_details.iloc[0]['PIN']
+    hosp_type = hospital_details.iloc[0]['HOSP_TYPE']
+    similar_hospitals = df[
+        (df['PIN'] == pin) & (df['HOSP_TYPE'] == hosp_type) & (df['PARTNER_ID'] != partner_id)
+    ].drop_duplicates(subset=['HOSPITAL']).head(5)
+    hospital_acs = df.groupby("PARTNER_ID")["APPROVED_AMT"].mean()
+    rounded_acs = {pid: round(value, 0) for pid, value in hospital_acs.items()}
+    return pd.DataFrame({
+        "name": similar_hospitals["HOSPITAL"].values,
+        "hosp_type": similar_hospitals["HOSP_TYPE"].values,
+        "acs": [rounded_acs.get(pid, 0) for pid in similar_hospitals["PARTNER_ID"].values]
+    })
+
+
+def assert_matches_baseline(df, partner_id, result):
+    expected = baseline_similar_hospitals(df, partner_id)
+    actual = result.drop(columns='distance', errors='ignore')
+    assert actual['name'].astype(str).tolist() == expected['name'].astype(str).tolist(), partner_id
+    assert actual['hosp_type'].astype(str).tolist() == expected['hosp_type'].astype(str).tolist(), partner_id
+    assert np.allclose(actual['acs'].astype(float), expected['acs'].astype(float)), partner_id
+
+
+@pytest.fixture
+def claims_store(claims_df):
+    return ClaimsStore(claims_df)
+
+
+def test_peer_index_matches_baseline(claims_df, claims_store):
+    for partner_id in claims_store.partner_ids:
+        result = analyze_hospital_claims(claims_store.df, partner_id, claims_store, sections=['Similar_Hospitals'])
+        assert_matches_baseline(claims_df, partner_id, result['Similar_Hospitals'])
+
+
+def test_frame_scan_matches_baseline(claims_df, claims_store):
+    for partner_id in claims_store.partner_ids:
+        assert_matches_baseline(claims_df, partner_id, get_similar_hospitals(claims_store.df, partner_id))
+
+
+def test_cube_matches_baseline(claims_df, claims_store):
+    claims_cube = build_claims_cube(claims_store.df)
+    for partner_id in claims_store.partner_ids:
+        result = claims_cube.analyze(claims_store.df, partner_id, claims_store.peer_index)
+        assert_matches_baseline(claims_df, partner_id, result['Similar_Hospitals'])
+
+
+def test_incremental_matches_baseline(claims_df, claims_store):
+    claims_aggregates = ClaimsAggregates.from_frame(claims_store.df.iloc[:300])
+    claims_aggregates.add(claims_store.df.iloc[300:])
+    for partner_id in claims_store.partner_ids:
+        assert_matches_baseline(claims_df, partner_id, claims_aggregates.analyze(partner_id)['Similar_Hospitals'])
+
+
+def test_appended_batches_come_after_workbook(claims_df):
+    base, appended = claims_df.iloc[:400], claims_df.iloc[400:]
+    claims_aggregates = ClaimsAggregates.from_frame(ClaimsStore(base).df)
+    claims_aggregates.add(appended.reset_index(drop=True))
+    for partner_id in ClaimsStore(claims_df).partner_ids:
+        assert_matches_baseline(claims_df, partner_id, claims_aggregates.analyze(partner_id)['Similar_Hospitals'])
+
+
+def test_snapshot_keeps_workbook_order(claims_df, claims_store, tmp_path):
+    write_snapshot(claims_store.df, str(tmp_path / "claims.snapshot"))
+    reloaded = ClaimsStore(load_snapshot(str(tmp_path / "claims.snapshot"), shared=True))
+    for partner_id in reloaded.partner_ids:
+        result = analyze_hospital_claims(reloaded.df, partner_id, reloaded, sections=['Similar_Hospitals'])
+        assert_matches_baseline(claims_df, partner_id, result['Similar_Hospitals'])
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flight, calls, release = SingleFlight(), [], asyncio.Event()
+
+        async def work():
+            calls.append(1)
+            await release.wait()
+            return {"value": 42}
+
+        callers = [asyncio.ensure_future(flight.do("key", work)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers)
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 4, "errors": 0}
+
+
+def test_callers_share_the_exception_and_later_calls_run_again():
+    async def scenario():
+        flight, release = SingleFlight(), asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise ValueError("boom")
+
+        callers = [asyncio.ensure_future(flight.do("key", failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        outcomes = await asyncio.gather(*callers, return_exceptions=True)
+        return flight, outcomes, await flight.do("key", lambda: "fresh")
+
+    flight, outcomes, fresh = asyncio.run(scenario())
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert fresh == "fresh"
+    assert flight.stats()["errors"] == 1 and flight.stats()["executed"] == 2
+
+
+def test_cancelling_the_leader_does_not_cancel_followers():
+    async def scenario():
+        flight, release = SingleFlight(), asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "done"
+
+        leader = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return flight, await follower
+
+    flight, result = asyncio.run(scenario())
+    assert result == "done"
+    assert flight.stats()["executed"] == 1
+
+
+def test_cancelling_the_last_caller_cancels_the_work():
+    async def scenario():
+        flight, started, cancelled = SingleFlight(), asyncio.Event(), asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.ensure_future(flight.do("key", work)) for _ in range(2)]
+        await started.wait()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.sleep(0)
+        return flight
+
+    flight = asyncio.run(scenario())
+    assert flight.stats()["in_flight"] == 0
+    assert flight.stats()["errors"] == 0
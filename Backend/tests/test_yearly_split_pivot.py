@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from claims_store import ClaimsStore, compact_claims_frame
+from utils import ANALYSIS_YEARS, claim_type_analysis, medical_surgical_analysis
+
+
+def lambda_claim_type_analysis(df, partner_id):
+    """The per-group lambda implementation yearly_split_pivot replaced"""
+    claims_df = df[(df['PARTNER_ID'] == partner_id) & (df['CLAIM_YEAR'].isin(ANALYSIS_YEARS))]
+    pivot1 = claims_df.groupby('CLAIM_YEAR').agg({
+        'CLAIM_NO': [
+            ('CASHLESS_Claims', lambda x: (claims_df.loc[x.index, 'CLAIM_TYPE'] == 'CASHLESS').sum()),
+            ('REIMBURSEMENT_Claims', lambda x: (claims_df.loc[x.index, 'CLAIM_TYPE'] == 'REIMBURSEMENT').sum()),
+            ('Total_Claims', 'count')
+        ],
+        'APPROVED_AMT': [
+            ('CASHLESS_Amount', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'CLAIM_TYPE'] == 'CASHLESS'], 'APPROVED_AMT'].sum()),
+            ('REIMBURSEMENT_Amount', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'CLAIM_TYPE'] == 'REIMBURSEMENT'], 'APPROVED_AMT'].sum()),
+            ('Total_Approved_Amount', 'sum')
+        ]
+    }).reset_index()
+    pivot1.columns = [
+        'claim_year',
+        'CASHLESS_Claims', 'REIMBURSEMENT_Claims', 'Total_Claims',
+        'CASHLESS_Amount', 'REIMBURSEMENT_Amount', 'Total_Approved_Amount'
+    ]
+    return pivot1
+
+
+def lambda_medical_surgical_analysis(df, partner_id):
+    """The per-group lambda implementation yearly_split_pivot replaced"""
+    claims_df = df[(df['PARTNER_ID'] == partner_id) & (df['CLAIM_YEAR'].isin(ANALYSIS_YEARS))]
+    pivot2 = claims_df.groupby('CLAIM_YEAR').agg({
+        'CLAIM_NO': [
+            ('Medical_Count_Of_Claims', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'MEDICAL_OR_SURGICAL'] == 'Medical'], 'CLAIM_NO'].nunique()),
+            ('SURGICAL_Count_Of_Claims', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'MEDICAL_OR_SURGICAL'] == 'Surgical'], 'CLAIM_NO'].nunique()),
+            ('Total_Claims', 'count')
+        ],
+        'APPROVED_AMT': [
+            ('Medical_Sum_ofApproved_Amount', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'MEDICAL_OR_SURGICAL'] == 'Medical'], 'APPROVED_AMT'].sum()),
+            ('SURGICAL_Sum_ofApproved_Amount', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'MEDICAL_OR_SURGICAL'] == 'Surgical'], 'APPROVED_AMT'].sum()),
+            ('Total_Approved_Amount', 'sum')
+        ]
+    }).reset_index()
+    pivot2.columns = [
+        'claim_year',
+        'Medical_Count_Of_Claims', 'SURGICAL_Count_Of_Claims', 'Total_Claims',
+        'Medical_Sum_ofApproved_Amount', 'SURGICAL_Sum_ofApproved_Amount', 'Total_Approved_Amount'
+    ]
+    return pivot2
+
+
+ANALYSES = [
+    (claim_type_analysis, lambda_claim_type_analysis),
+    (medical_surgical_analysis, lambda_medical_surgical_analysis),
+]
+
+
+@pytest.mark.parametrize("analysis, reference", ANALYSES)
+def test_matches_lambda_implementation(claims_df, analysis, reference):
+    for partner_id in claims_df['PARTNER_ID'].unique():
+        assert_frame_equal(analysis(claims_df, partner_id), reference(claims_df, partner_id))
+
+
+@pytest.mark.parametrize("analysis, reference", ANALYSES)
+def test_matches_lambda_implementation_on_compact_frame(claims_df, analysis, reference):
+    # The API runs on the compacted, partner-sorted frame
+    compact_df, _ = compact_claims_frame(claims_df)
+    store = ClaimsStore(compact_df)
+    for partner_id in store.partner_ids:
+        assert_frame_equal(analysis(store.df, partner_id), reference(store.df, partner_id))
+
+
+@pytest.mark.parametrize("analysis, reference", ANALYSES)
+def test_year_without_rows_for_a_category(claims_df, analysis, reference):
+    partner_id = claims_df['PARTNER_ID'].iloc[0]
+    result = analysis(claims_df, partner_id).set_index('claim_year')
+    assert 2022 in result.index
+    # 2022 only has CASHLESS Medical claims in the fixture
+    missing = 'REIMBURSEMENT' if analysis is claim_type_analysis else 'SURGICAL'
+    assert (result.loc[2022, [column for column in result.columns if column.startswith(missing)]] == 0).all()
+    assert_frame_equal(result.reset_index(), reference(claims_df, partner_id))
+
+
+def test_partner_without_rows():
+    empty = pd.DataFrame({
+        'PARTNER_ID': pd.Series([], dtype='int64'),
+        'CLAIM_YEAR': pd.Series([], dtype='int64'),
+        'CLAIM_NO': pd.Series([], dtype='int64'),
+        'CLAIM_TYPE': pd.Series([], dtype=object),
+        'MEDICAL_OR_SURGICAL': pd.Series([], dtype=object),
+        'APPROVED_AMT': pd.Series([], dtype='float64'),
+    })
+    assert claim_type_analysis(empty, 1000).empty
+    assert list(claim_type_analysis(empty, 1000).columns) == list(lambda_claim_type_analysis(empty, 1000).columns)
@@ -1,13 +1,38 @@
+from functools import cached_property
+
 import pandas as pd
 import numpy as np
 
+from claims_store import ROW_COLUMN
+
+# Claim years covered by the yearly pivots, room category and diagnosis sections
+ANALYSIS_YEARS = [2022, 2023, 2024]
+
+# Search radius for similar hospitals when real coordinates are available
+SIMILAR_HOSPITALS_RADIUS_KM = 10
+
+# Sections returned by analyze_hospital_claims, in response order
+ANALYSIS_SECTIONS = [
+    'Get_claims_summary',
+    'Average_Claim_Cost',
+    'Similar_Hospitals',
+    'Cost_Revision_Ratio',
+    'Claim_Type_Analysis',
+    'Medical_Surgical_Analysis',
+    'Type_Percentage_Analysis',
+    'Room_Category_Analysis',
+    'Diagnosis_Analysis'
+]
+
 def get_claims_summary(df, partner_id):
     """Generate summary of cashless, reimbursement, medical, and surgical claims for current year"""
     
     claims_df = df[
         (df['PARTNER_ID'] == partner_id)
     ]
-    
+    return _claims_summary(claims_df)
+
+def _claims_summary(claims_df):
     summary = {
         'cashless': {
             'amount': float(claims_df[claims_df['CLAIM_TYPE'] == 'CASHLESS']['APPROVED_AMT'].sum()),
@@ -35,7 +60,9 @@ def calculate_average_claim_cost(df, partner_id):
     """
     # Filter the DataFrame for the given partner ID
     partner_claims = df[df['PARTNER_ID'] == partner_id]
-    
+    return _average_claim_cost(partner_claims)
+
+def _average_claim_cost(partner_claims):
     # Calculate the average claim cost for total claims
     if not partner_claims.empty:
         total_acs = partner_claims['APPROVED_AMT'].mean()
@@ -67,19 +94,58 @@ def calculate_average_claim_cost(df, partner_id):
 
 def calculate_cost_revision_ratio(df, partner_id):
     claims_df = df[df['PARTNER_ID'] == partner_id]
-    
-    # Calculate ratio for each claim
-    claims_df['cost_revision_ratio'] = abs(claims_df['CLAIMED_AMT'] - claims_df['APPROVED_AMT']) / claims_df['CLAIMED_AMT']
+    return _cost_revision_ratio(claims_df)
+
+def _cost_revision_ratio(claims_df):
+    # Calculate ratio for each claim without writing into the (possibly shared) claims frame
+    cost_revision_ratio = abs(claims_df['CLAIMED_AMT'] - claims_df['APPROVED_AMT']) / claims_df['CLAIMED_AMT']
     
     # Yearly trend
-    yearly_trend = claims_df.groupby('CLAIM_YEAR')['cost_revision_ratio'].mean().reset_index()
+    yearly_trend = cost_revision_ratio.groupby(claims_df['CLAIM_YEAR']).mean().reset_index(name='cost_revision_ratio')
     
     return yearly_trend
 
-def get_similar_hospitals(df, partner_id):
+def _similar_hospitals_frame(names, hosp_types, acs):
+    return pd.DataFrame({
+        "name": names,
+        "distance": [f"{np.random.randint(1, 10)} km" for _ in range(len(names))],
+        "hosp_type": hosp_types,
+        "acs": acs
+    })
+
+def _as_partner_id(hospital_id):
+    return int(hospital_id) if str(hospital_id).isdigit() else hospital_id
+
+def get_similar_hospitals(df, partner_id, peer_index=None, geo_index=None):
     """
     Get up to 5 unique hospitals with the same 'PIN' and 'HOSP_TYPE' for a given partner ID.
+    A prebuilt PeerIndex answers the lookup without scanning the claims frame. When a
+    GeoIndex has coordinates for the partner, the nearest hospitals of the same type
+    within SIMILAR_HOSPITALS_RADIUS_KM are returned with their real distances instead.
     """
+    if geo_index is not None:
+        neighbours = geo_index.nearest_to(partner_id, k=5, radius_km=SIMILAR_HOSPITALS_RADIUS_KM)
+        if neighbours is not None:
+            if not neighbours:
+                return pd.DataFrame()
+            partner_acs = peer_index.partner_acs if peer_index is not None else {}
+            return pd.DataFrame({
+                "name": [n['name'] for n in neighbours],
+                "distance": [f"{n['distance_km']:.1f} km" for n in neighbours],
+                "hosp_type": [n['type'] for n in neighbours],
+                "acs": [partner_acs.get(_as_partner_id(n['id']), 0) for n in neighbours]
+            })
+
+    if peer_index is not None:
+        peers = peer_index.similar_hospitals(partner_id)
+        if not peers:
+            return pd.DataFrame()
+        return _similar_hospitals_frame(
+            [peer[1] for peer in peers],
+            [peer[2] for peer in peers],
+            [peer[3] for peer in peers]
+        )
+
     required_columns = {'PARTNER_ID', 'PIN', 'HOSP_TYPE', 'HOSPITAL', 'APPROVED_AMT'}
     if not required_columns.issubset(df.columns):
         raise ValueError(f"DataFrame must contain columns: {required_columns}")
@@ -87,6 +153,10 @@ def get_similar_hospitals(df, partner_id):
     # Drop rows with missing essential values
     df = df.dropna(subset=['PARTNER_ID', 'PIN', 'HOSP_TYPE'])
 
+    # Frames sorted by partner are put back in workbook order
+    if ROW_COLUMN in df.columns:
+        df = df.sort_values(ROW_COLUMN, kind='mergesort')
+
     # Get details for the given partner ID
     hospital_details = df[df['PARTNER_ID'] == partner_id]
 
@@ -111,75 +181,85 @@ def get_similar_hospitals(df, partner_id):
     num_hospitals = min(5, len(similar_hospitals))
 
     # Compute ACS (average approved amount) for each hospital
-    hospital_acs = df.groupby("PARTNER_ID")["APPROVED_AMT"].mean()
+    hospital_acs = df.groupby("PARTNER_ID", observed=True)["APPROVED_AMT"].mean()
 
     # Round ACS to 2 decimal places
     rounded_acs = {pid: round(value, 0) for pid, value in hospital_acs.items()}
 
     # Process and store results in a DataFrame
-    results = pd.DataFrame({
-        "name": similar_hospitals["HOSPITAL"].head(num_hospitals).values,
-        "distance": [f"{np.random.randint(1, 10)} km" for _ in range(num_hospitals)],
-        "hosp_type": similar_hospitals["HOSP_TYPE"].head(num_hospitals).values,
-        "acs": [rounded_acs.get(pid, 0) for pid in similar_hospitals["PARTNER_ID"].head(num_hospitals).values]
-    })
+    return _similar_hospitals_frame(
+        similar_hospitals["HOSPITAL"].head(num_hospitals).values,
+        similar_hospitals["HOSP_TYPE"].head(num_hospitals).values,
+        [rounded_acs.get(pid, 0) for pid in similar_hospitals["PARTNER_ID"].head(num_hospitals).values]
+    )
+
+# (value, count column, amount column, count mode) for the yearly split pivots. The
+# count mode is 'rows' to count matching rows or 'nunique' for distinct CLAIM_NOs.
+CLAIM_TYPE_SPLIT = [
+    ('CASHLESS', 'CASHLESS_Claims', 'CASHLESS_Amount', 'rows'),
+    ('REIMBURSEMENT', 'REIMBURSEMENT_Claims', 'REIMBURSEMENT_Amount', 'rows')
+]
+MEDICAL_SURGICAL_SPLIT = [
+    ('Medical', 'Medical_Count_Of_Claims', 'Medical_Sum_ofApproved_Amount', 'nunique'),
+    ('Surgical', 'SURGICAL_Count_Of_Claims', 'SURGICAL_Sum_ofApproved_Amount', 'nunique')
+]
+
+def yearly_split_pivot(claims_df, column, split, by=()):
+    """
+    Count claims and sum approved amounts per claim year, split by the values of one
+    column, in a single grouped pass. Extra leading group keys can be given in `by`.
+    """
+    keys = [claims_df[key] for key in by] + [claims_df['CLAIM_YEAR'].rename('claim_year')]
+    matches = {value: claims_df[column].eq(value) for value, _, _, _ in split}
+
+    columns = {}
+    for value, count_column, _, mode in split:
+        if mode == 'rows':
+            columns[count_column] = matches[value].astype('int64')
+    columns['Total_Claims'] = claims_df['CLAIM_NO'].notna().astype('int64')
+    # Whole-rupee amounts stay integers: split sums as int64 like the per-group sums they
+    # replace, the total in the column's own dtype like a grouped 'sum'
+    approved = claims_df['APPROVED_AMT']
+    integer_amounts = pd.api.types.is_integer_dtype(approved)
+    for value, _, amount_column, _ in split:
+        columns[amount_column] = approved.where(matches[value], 0).astype('int64' if integer_amounts else 'float64')
+    columns['Total_Approved_Amount'] = approved if integer_amounts else approved.astype('float64')
 
-    return results
+    pivot = pd.DataFrame(columns, index=claims_df.index).groupby(keys).sum()
+    for value, count_column, _, mode in split:
+        if mode == 'nunique':
+            matching = claims_df[matches[value]]
+            matching_keys = [matching[key] for key in by] + [matching['CLAIM_YEAR'].rename('claim_year')]
+            distinct = matching['CLAIM_NO'].groupby(matching_keys).nunique()
+            pivot[count_column] = distinct.reindex(pivot.index, fill_value=0).astype('int64')
+
+    ordered = list(by) + ['claim_year']
+    ordered += [count_column for _, count_column, _, _ in split] + ['Total_Claims']
+    ordered += [amount_column for _, _, amount_column, _ in split] + ['Total_Approved_Amount']
+    return pivot.reset_index()[ordered]
 
 def claim_type_analysis(df, partner_id):
-    claims_df = df[(df['PARTNER_ID'] == partner_id) & (df['CLAIM_YEAR'].isin([2022, 2023, 2024]))]
-    
-    pivot1 = claims_df.groupby('CLAIM_YEAR').agg({
-        'CLAIM_NO': [
-            ('CASHLESS_Claims', lambda x: (claims_df.loc[x.index, 'CLAIM_TYPE'] == 'CASHLESS').sum()),
-            ('REIMBURSEMENT_Claims', lambda x: (claims_df.loc[x.index, 'CLAIM_TYPE'] == 'REIMBURSEMENT').sum()),
-            ('Total_Claims', 'count')
-        ],
-        'APPROVED_AMT': [
-            ('CASHLESS_Amount', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'CLAIM_TYPE'] == 'CASHLESS'], 'APPROVED_AMT'].sum()),
-            ('REIMBURSEMENT_Amount', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'CLAIM_TYPE'] == 'REIMBURSEMENT'], 'APPROVED_AMT'].sum()),
-            ('Total_Approved_Amount', 'sum')
-        ]
-    }).reset_index()
-    
-    pivot1.columns = [
-        'claim_year', 
-        'CASHLESS_Claims', 'REIMBURSEMENT_Claims', 'Total_Claims',
-        'CASHLESS_Amount', 'REIMBURSEMENT_Amount', 'Total_Approved_Amount'
-    ]
-    
-    return pivot1
+    claims_df = df[(df['PARTNER_ID'] == partner_id) & (df['CLAIM_YEAR'].isin(ANALYSIS_YEARS))]
+    return _claim_type_analysis(claims_df)
+
+def _claim_type_analysis(claims_df):
+    return yearly_split_pivot(claims_df, 'CLAIM_TYPE', CLAIM_TYPE_SPLIT)
 
 def medical_surgical_analysis(df, partner_id):
-    claims_df = df[(df['PARTNER_ID'] == partner_id) & (df['CLAIM_YEAR'].isin([2022, 2023, 2024]))]
-    
-    pivot2 = claims_df.groupby('CLAIM_YEAR').agg({
-        'CLAIM_NO': [
-            ('Medical_Count_Of_Claims', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'MEDICAL_OR_SURGICAL'] == 'Medical'], 'CLAIM_NO'].nunique()),
-            ('SURGICAL_Count_Of_Claims', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'MEDICAL_OR_SURGICAL'] == 'Surgical'], 'CLAIM_NO'].nunique()),
-            ('Total_Claims', 'count')
-        ],
-        'APPROVED_AMT': [
-            ('Medical_Sum_ofApproved_Amount', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'MEDICAL_OR_SURGICAL'] == 'Medical'], 'APPROVED_AMT'].sum()),
-            ('SURGICAL_Sum_ofApproved_Amount', lambda x: claims_df.loc[x.index[claims_df.loc[x.index, 'MEDICAL_OR_SURGICAL'] == 'Surgical'], 'APPROVED_AMT'].sum()),
-            ('Total_Approved_Amount', 'sum')
-        ]
-    }).reset_index()
-    
-    pivot2.columns = [
-        'claim_year', 
-        'Medical_Count_Of_Claims', 'SURGICAL_Count_Of_Claims', 'Total_Claims',
-        'Medical_Sum_ofApproved_Amount', 'SURGICAL_Sum_ofApproved_Amount', 'Total_Approved_Amount'
-    ]
-    
-    return pivot2
+    claims_df = df[(df['PARTNER_ID'] == partner_id) & (df['CLAIM_YEAR'].isin(ANALYSIS_YEARS))]
+    return _medical_surgical_analysis(claims_df)
+
+def _medical_surgical_analysis(claims_df):
+    return yearly_split_pivot(claims_df, 'MEDICAL_OR_SURGICAL', MEDICAL_SURGICAL_SPLIT)
 
 def percentage_analysis(df, partner_id):
     claims_df = df[
         (df['PARTNER_ID'] == partner_id) & 
-        (df['CLAIM_YEAR'].isin([2022, 2023, 2024]))
+        (df['CLAIM_YEAR'].isin(ANALYSIS_YEARS))
     ]
-    
+    return _percentage_analysis(claims_df)
+
+def _percentage_analysis(claims_df):
     claims_by_type = claims_df.groupby(
         claims_df['MEDICAL_OR_SURGICAL'].str.upper().apply(
             lambda x: 'Medical' if x.startswith('MEDICAL') else 
@@ -189,7 +269,10 @@ def percentage_analysis(df, partner_id):
         'APPROVED_AMT': 'sum',
         'CLAIMED_AMT': 'sum'
     }).reset_index()
-    
+    return _percentage_pivot(claims_by_type)
+
+def _percentage_pivot(claims_by_type):
+    """Percentages and Grand Total row from approved/claimed sums per MEDICAL_OR_SURGICAL kind"""
     total_approved = claims_by_type['APPROVED_AMT'].sum()
     total_claimed = claims_by_type['CLAIMED_AMT'].sum()
     
@@ -211,10 +294,12 @@ def percentage_analysis(df, partner_id):
 def room_category_analysis(df, partner_id):
     claims_df = df[
         (df['PARTNER_ID'] == partner_id) & 
-        (df['CLAIM_YEAR'].isin([2022, 2023, 2024]))
+        (df['CLAIM_YEAR'].isin(ANALYSIS_YEARS))
     ]
-    
-    pivot4 = claims_df.groupby('ROOM_CATEGORY')['CLAIM_NO'].count().reset_index(name='Total_Claims')
+    return _room_category_analysis(claims_df)
+
+def _room_category_analysis(claims_df):
+    pivot4 = claims_df.groupby('ROOM_CATEGORY', observed=True)['CLAIM_NO'].count().reset_index(name='Total_Claims')
     pivot4 = pivot4.sort_values('Total_Claims', ascending=False)
     
     return pivot4
@@ -222,10 +307,12 @@ def room_category_analysis(df, partner_id):
 def diagnosis_analysis(df, partner_id):
     claims_df = df[
         (df['PARTNER_ID'] == partner_id) & 
-        (df['CLAIM_YEAR'].isin([2022, 2023, 2024]))
+        (df['CLAIM_YEAR'].isin(ANALYSIS_YEARS))
     ]
-    
-    pivot5 = claims_df.groupby('FINAL_DIAGNOSIS').agg({
+    return _diagnosis_analysis(claims_df)
+
+def _diagnosis_analysis(claims_df):
+    pivot5 = claims_df.groupby('FINAL_DIAGNOSIS', observed=True).agg({
         'CLAIM_NO': 'count',
         'APPROVED_AMT': 'sum',
         'CLAIMED_AMT': 'sum'
@@ -235,18 +322,9 @@ def diagnosis_analysis(df, partner_id):
     
     return pivot5
 
-def analyze_hospital_claims(df, partner_id):
-    claims_summary = get_claims_summary(df, partner_id)
-    average_claim_cost = calculate_average_claim_cost(df, partner_id)
-    similar_hospitals = get_similar_hospitals(df, partner_id)
-    cost_revision_ratio = calculate_cost_revision_ratio(df, partner_id)
-    claim_type_analysis_result = claim_type_analysis(df, partner_id)
-    medical_surgical_analysis_result = medical_surgical_analysis(df, partner_id)
-    type_percentage_analysis_result = percentage_analysis(df, partner_id)
-    room_category_analysis_result = room_category_analysis(df, partner_id)
-    diagnosis_analysis_result = diagnosis_analysis(df, partner_id)
-    
-    # Convert claims summary to DataFrame
+def _claims_summary_frame(claims_df):
+    """Flatten the claims summary into one row per claim type"""
+    claims_summary = _claims_summary(claims_df)
     summary_flat = {
         'Type': [],
         'Amount': [],
@@ -258,16 +336,62 @@ def analyze_hospital_claims(df, partner_id):
         summary_flat['Amount'].append(values['amount'])
         summary_flat['Count'].append(values['count'])
     
-    claims_summary_df = pd.DataFrame(summary_flat)
-    
-    return {
-        'Get_claims_summary': claims_summary_df,
-        'Average_Claim_Cost': average_claim_cost,
-        'Similar_Hospitals': similar_hospitals,
-        'Cost_Revision_Ratio': cost_revision_ratio,
-        'Claim_Type_Analysis': claim_type_analysis_result,
-        'Medical_Surgical_Analysis': medical_surgical_analysis_result,
-        'Type_Percentage_Analysis': type_percentage_analysis_result,
-        'Room_Category_Analysis': room_category_analysis_result,
-        'Diagnosis_Analysis': diagnosis_analysis_result
-    } 
\ No newline at end of file
+    return pd.DataFrame(summary_flat)
+
+class ClaimsAnalysis:
+    """
+    Lazily computed claims-analysis sections for one partner. The partner's claims and
+    their ANALYSIS_YEARS subset are filtered once and shared by every section, and a
+    section is only computed when it is asked for.
+    """
+
+    def __init__(self, df, partner_id, claims_store=None, geo_index=None):
+        self.df = df
+        self.partner_id = partner_id
+        self.claims_store = claims_store
+        self.geo_index = geo_index
+
+    @cached_property
+    def partner_claims(self):
+        if self.claims_store is not None:
+            return self.claims_store.get_partner_claims(self.partner_id)
+        return self.df[self.df['PARTNER_ID'] == self.partner_id]
+
+    @cached_property
+    def recent_claims(self):
+        return self.partner_claims[self.partner_claims['CLAIM_YEAR'].isin(ANALYSIS_YEARS)]
+
+    def section(self, name):
+        if name == 'Get_claims_summary':
+            return _claims_summary_frame(self.partner_claims)
+        if name == 'Average_Claim_Cost':
+            return _average_claim_cost(self.partner_claims)
+        if name == 'Similar_Hospitals':
+            peer_index = self.claims_store.peer_index if self.claims_store is not None else None
+            return get_similar_hospitals(self.df, self.partner_id, peer_index, self.geo_index)
+        if name == 'Cost_Revision_Ratio':
+            return _cost_revision_ratio(self.partner_claims)
+        if name == 'Claim_Type_Analysis':
+            return _claim_type_analysis(self.recent_claims)
+        if name == 'Medical_Surgical_Analysis':
+            return _medical_surgical_analysis(self.recent_claims)
+        if name == 'Type_Percentage_Analysis':
+            return _percentage_analysis(self.recent_claims)
+        if name == 'Room_Category_Analysis':
+            return _room_category_analysis(self.recent_claims)
+        if name == 'Diagnosis_Analysis':
+            return _diagnosis_analysis(self.recent_claims)
+        raise ValueError(f"Unknown claims analysis section: {name}")
+
+    def compute(self, sections=None):
+        """Compute the requested sections (all by default) in response order"""
+        wanted = ANALYSIS_SECTIONS if sections is None else [name for name in ANALYSIS_SECTIONS if name in sections]
+        return {name: self.section(name) for name in wanted}
+
+def analyze_hospital_claims(df, partner_id, claims_store=None, geo_index=None, sections=None):
+    """
+    Run the claims analyses for a partner, optionally only the given sections. When a
+    ClaimsStore is given, the per-partner analyses only see that partner's contiguous
+    slice of rows.
+    """
+    return ClaimsAnalysis(df, partner_id, claims_store, geo_index).compute(sections)
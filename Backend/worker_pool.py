@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+POOL_KINDS = ("thread", "process")
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a pool already holds as many running and queued tasks as it accepts"""
+
+
+class WorkerPool:
+    """Bounded executor for blocking work called from async handlers.
+
+    At most ``max_workers`` tasks run at once and at most ``queue_depth`` more wait
+    for a worker; anything beyond that is rejected with PoolSaturatedError instead
+    of piling up behind the event loop. Process pools start workers with ``spawn``
+    and prepare them with ``initializer``, so task functions and their arguments
+    must be picklable.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: Optional[int] = None, queue_depth: int = 32,
+                 initializer: Optional[Callable] = None, initargs: Tuple = (), name: str = "worker"):
+        if kind not in POOL_KINDS:
+            raise ValueError(f"Unknown pool kind {kind!r}, expected one of {POOL_KINDS}")
+        self.kind = kind
+        self.name = name
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.queue_depth = queue_depth
+        if kind == "process":
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=name,
+                initializer=initializer,
+                initargs=initargs
+            )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        logger.info(f"Started {kind} pool '{name}' with {self.max_workers} workers and queue depth {queue_depth}")
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_depth
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise PoolSaturatedError(
+                    f"Pool '{self.name}' is saturated ({self._pending} tasks running or queued)"
+                )
+            self._pending += 1
+            self.submitted += 1
+
+    def _release(self, failed: bool) -> None:
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and await its result.
+
+        The slot is released when the executor job ends, not when the caller stops
+        waiting: a cancelled caller leaves a running job holding its slot until it
+        finishes, so the pool never admits more work than it has workers and queue.
+        """
+        self._acquire()
+        try:
+            future = self._executor.submit(partial(fn, *args, **kwargs))
+        except BaseException:
+            self._release(True)
+            raise
+        future.add_done_callback(lambda done: self._release(done.cancelled() or done.exception() is not None))
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "queue_depth": self.queue_depth,
+                "pending": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)